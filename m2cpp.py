@@ -20,7 +20,7 @@ parser = argparse.ArgumentParser(
     formatter_class=argparse.RawDescriptionHelpFormatter,
     description=dedent(hstring))
 
-parser.add_argument("filename",
+parser.add_argument("filename", nargs="?",
         help="File containing valid Matlab code.").completer=\
                 lambda prefix, **kws: glob("*.m")
 
@@ -40,6 +40,14 @@ parser.add_argument("-S", '--matlab-suggest', action="store_true",
         These matlab file(s) are slightly modified so that they output data-type information of the variables \
         to file(s). This output can then be used to set the datatypes for the translation.""")
 
+parser.add_argument("--type-trace", nargs="+", dest="type_trace",
+        metavar="PATH", help="""\
+Set datatypes from variables observed while running the Matlab code, as an
+alternative to `-S` without Matlab.  Takes type traces, `whos_f` logs
+(`<file>.m.txt`) from running the instrumented copy made by `-S`, or folders
+with such files.  Observations from several runs are merged.  See
+`matlab2cpp.typetrace` for the format.""")
+
 parser.add_argument("-r", '--reset', action="store_true",
         help="""\
 Ignore the content of `<filename>.py` and make a fresh translation.""")
@@ -67,6 +75,18 @@ parser.add_argument("-p", "--paths_file", type=str, dest="paths_file",
 Flag and paths_file (-p path_to_pathsfile). m2cpp will look for matlab files in the location specified \
 in the paths_file""")
 
+parser.add_argument("--supplement", type=str, dest="supplement",
+        help="""\
+Consolidated project supplement file in JSON format.  Each key is the basename
+of a Matlab file and each value has the same content as a `<filename>.json`
+supplement.  The file is read once and applied to every loaded file.""")
+
+parser.add_argument("--prune", action="store_true",
+        help="""\
+Build a call graph over all loaded files and only configure and translate the
+functions reachable from the main file.  Pruned functions are listed in the
+log of the file they were removed from.""")
+
 parser.add_argument("-omp", '--enable-omp', action="store_true",
                     help="""\
 OpenMP code is inserted for Parfor and loops marked with the pragma %%#PARFOR (in Matlab code) when this \
@@ -83,12 +103,59 @@ input parameters in the generated code can be const references. There can be som
 const references instead of "copied by value". Note that Matlab "copies by value". \
 The Matlab code you try to translate to C++ code could try read as well as write to this input variable. \
 The code generator doesn't perform an analysis to detect this and then "copy by value" for this variable.""")
+
+parser.add_argument("--lazy", action="store_true",
+        help="""\
+Prefer forms of expressions that Armadillo evaluates without temporaries:
+`accu` for sums to a scalar, `dot` for inner products, `.t()` for real
+transposes, `zeros(size(X))` without auxiliary variables, and scalar
+`std::min`/`std::max`.""")
+
+parser.add_argument("--fixed-size", action="store_true",
+        help="""\
+Declare local vectors and matrices of small constant size, like `eye(3)` or
+`[a; b; c]`, as fixed size Armadillo types such as `mat::fixed<3,3>`.  Sizes
+can also be given in the supplement file, as `mat33` or `vec4`.""")
+
+parser.add_argument("--specialise", nargs="?", type=int, const=4, default=0,
+        help="""\
+Translate functions called with arrays of different dimensions, like `vec` and
+`mat`, once for each combination of argument types at the call sites, as C++
+overloads.  At most the given number of overloads are made per function
+(default 4), otherwise only the general version is used.  The overloads are
+recorded in the supplement file.""")
+
+parser.add_argument("--instrument", nargs="?", const="func",
+        choices=("func", "loops"),
+        help="""\
+Wrap every translated function in a scoped timer counting calls and time spent.
+With `loops`, top-level loops in each function are timed as well.  When the
+program exits, a report with file, line, calls and time is written to
+`m2cpp_profile.txt`, or the file named in the environment variable
+`M2CPP_PROFILE`.""")
+
+parser.add_argument("--profile", nargs="?", const="-",
+        help="""\
+Profile the translator.  Wall time and node counts for each phase, and the
+rules with most time and calls, are written as JSON to `<file>.profile.json`,
+or the given file name.""")
+
+parser.add_argument("--profile-top", type=int, default=25, dest="profile_top",
+        help="Number of rules listed in the profile.  Default is 25.")
+
 parser.add_argument("-l", '--line', type=int, dest="line",
         help="Only display code related to code line number `<line>`.")
 
 parser.add_argument("-n", '--nargin', action="store_true",
         help="Don't remove if and switch branches which use nargin variable.")
 
+parser.add_argument("--serve", action="store_true",
+        help="""\
+Run as a translation server reading JSON requests line by line from stdin and
+writing the generated file contents as JSON lines to stdout.  The other flags
+serve as defaults for every request.  See `matlab2cpp.server` for the
+protocol.""")
+
 
 
 
@@ -100,5 +167,11 @@ except:
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    matlab2cpp.main(args)
+    if args.serve:
+        from matlab2cpp import server
+        server.serve(args)
+    elif args.filename is None:
+        parser.error("too few arguments")
+    else:
+        matlab2cpp.main(args)
 
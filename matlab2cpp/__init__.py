@@ -35,10 +35,10 @@ functionality offered by the `m2cpp` function.
 __version__ = "1.0"
 
 import time
+import argparse
 from datetime import datetime as date
 import os
 from os.path import sep
-import imp
 
 import supplement
 import node
@@ -48,13 +48,21 @@ import qfunctions
 import collection
 import configure
 import rules
-import manual
 import re
 
 import modify
 import setpaths
+import profiler
 
-__all__ = ["main"]
+__all__ = ["main", "translate_sources"]
+
+# flags of m2cpp that affect translation, with their defaults
+OPTIONS = {"suggest": False, "matlab_suggest": False, "reset": False,
+        "comments": False, "original": False, "enable_omp": False,
+        "enable_tbb": False, "reference": False, "nargin": False,
+        "paths_file": None, "supplement": None, "prune": False,
+        "instrument": None, "type_trace": None, "lazy": False,
+        "fixed_size": False, "specialise": 0}
 
 from qfunctions import *
 __all__ += qfunctions.__all__
@@ -79,125 +87,207 @@ Args:
 
     builder = tree.builder.Builder(disp=args.disp, comments=args.comments,
                                    original=args.original, enable_omp=args.enable_omp, enable_tbb=args.enable_tbb,
-                                   reference=args.reference)
+                                   reference=args.reference, instrument=args.instrument,
+                                   lazy=args.lazy, fixed_size=args.fixed_size,
+                                   specialise=args.specialise)
 
-    paths_from_file = []
-    #read setpath.m file and return string list of paths
-    if args.paths_file:
-        if os.path.isfile(args.paths_file):
-            paths_from_file = setpaths.multiple_folder_paths(args.paths_file)
-        else:
-            raise IOError("File '" + args.paths_file + "' not found")
+    if args.profile:
+        profiler.start()
 
-    #pathOne = os.path.dirname(os.path.abspath(args.filename))
+    load(builder, args)
 
-    if os.path.isfile(args.filename):
-        paths = [os.path.abspath(os.path.dirname(args.filename))] + paths_from_file
+    builder = convert(builder, args)
+
+    with profiler.phase("write"):
+        for name, files in generate(builder, reset=args.reset):
 
+            if args.disp:
+                print "Writing files..."
+
+            if args.reset:
+                for ext in [".cpp", ".hpp", ".log", ".py"]:
+                    if os.path.isfile(name+ext):
+                        os.remove(name+ext)
+
+            for ext in [".cpp", ".hpp", ".log", ".py", ".json"]:
+                if ext in files:
+                    f = open(name+ext, "w")
+                    f.write(files[ext])
+                    f.close()
+
+            if os.path.isfile(name+".pyc"):
+                os.remove(name+".pyc")
+
+    if args.profile:
+        report = profiler.stop(args.profile_top)
+        report["filename"] = args.filename
+        filename = args.profile
+        if filename == "-":
+            filename = os.path.basename(builder[0].name) + ".profile.json"
+        profiler.write(report, filename)
         if args.disp:
-            print "building tree..."
+            print "Profile written to", filename
 
-        filenames = [os.path.abspath(args.filename)]
+    program = builder[0]
 
-        stack = []
-        while filenames:
+    if args.tree_full:
+        print program.summary(args)
 
-            filename = filenames.pop(0)
-            assert os.path.isfile(filename)
+    elif args.tree:
+        if program[1][0].cls == "Main":
+            print program[1][0][3].summary(args)
+        else:
+            print program[1].summary(args)
 
-            if filename in stack:
-                continue
+    elif args.line:
+        nodes = program[1].flatten(False, False, False)
+        for node_ in nodes:
+            if node_.line == args.line and node_.cls != "Block":
+                print node_.str.replace("__percent__", "%")
+                break
+    else:
+        print program[1].str.replace("__percent__", "%")
 
-            if args.disp:
-                print "loading", filename
 
-            stack.append(filename)
+def read_file(filename):
+    """Default reader used by :py:func:`~matlab2cpp.load`."""
+    f = open(filename, "rU")
+    code = f.read()
+    f.close()
+    return code
 
-            f = open(filename, "rU")
-            code = f.read()
-            f.close()
 
-            #code = re.sub('%#', '##', code)
+def read_files(filenames, read=read_file, threads=8):
+    """
+Read multiple files, concurrently if more than one.
 
-            #Here you have to change filename to current folder for .py files
-            #local_name = pathOne + sep + os.path.basename(filename)
-            local_name = os.getcwd() + sep + os.path.basename(filename)
-            
-            if os.path.isfile(local_name + ".py") and not args.reset:
+Args:
+    filenames (list): Files to read
+    read (callable): Function returning the content of a filename
+    threads (int): Maximum number of concurrent reads
 
-                try:
-                    cfg = imp.load_source("cfg", local_name + ".py")
+Returns:
+    list: File contents in the same order as `filenames`
+    """
+    if len(filenames) < 2:
+        return map(read, filenames)
 
-                except:
-                    raise ImportError("""Supplement file:
-    %s.py
-    is formated incorrectly. Change the format or convert with '-r' option to create
-    a new file.""" % local_name)
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(min(threads, len(filenames)))
+    try:
+        return pool.map(read, filenames)
+    finally:
+        pool.close()
 
-                if "verbatims" in cfg.__dict__ and cfg.verbatims:
-                    verbatims = cfg.verbatims
-                    code = supplement.verbatim.set(verbatims, code)
 
-                builder.load(filename, code)
-                program = builder[-1]
+def load(builder, args, read=read_file):
+    """
+Load the file given in `args.filename` and all Matlab files it depends on into
+the builder.  If `args.filename` is not a file, it is interpreted as code.
 
-                if "functions" in cfg.__dict__:
+Args:
+    builder (Builder): Tree constructor to load programs into
+    args (ArgumentParser): arguments parsed through m2cpp
+    read (callable): Function returning the content of a filename
+    """
 
-                    funcs = program.ftypes
+    paths_from_file = []
+    #read setpath.m file and return string list of paths
+    if args.paths_file:
+        if os.path.isfile(args.paths_file):
+            paths_from_file = setpaths.multiple_folder_paths(args.paths_file)
+        else:
+            raise IOError("File '" + args.paths_file + "' not found")
 
-                    for name in funcs.keys():
-                        if name in cfg.functions:
-                            for key in cfg.functions[name].keys():
-                                funcs[name][key] = cfg.functions[name][key]
+    #read consolidated project supplement once and apply per file
+    project_types = {}
+    if getattr(args, "supplement", None):
+        project_types = supplement.loader.read_project(args.supplement)
 
-                    program.ftypes = funcs
+    #pathOne = os.path.dirname(os.path.abspath(args.filename))
 
-                if "structs" in cfg.__dict__:
+    if os.path.isfile(args.filename):
+        paths = [os.path.abspath(os.path.dirname(args.filename))] + paths_from_file
 
-                    structs = program.stypes
+        # list every folder once instead of probing each unknown name
+        with profiler.phase("discover"):
+            index = setpaths.index_folders(paths)
 
-                    for name in structs.keys():
-                        if name in cfg.structs:
-                            for key in cfg.structs[name].keys():
-                                structs[name][key] = cfg.structs[name][key]
+        if args.disp:
+            print "building tree..."
 
-                    program.stypes = structs
+        # breadth first: read all files of a level concurrently, then parse
+        filenames = [os.path.abspath(args.filename)]
+        stack = set()
+        while filenames:
 
-                if "includes" in cfg.__dict__:
+            level = []
+            for filename in filenames:
+                if filename not in stack:
+                    stack.add(filename)
+                    level.append(filename)
 
-                    includes = program.itypes
+            with profiler.phase("read"):
+                codes = read_files(level, read)
+            filenames = []
 
-                    for key in cfg.includes:
-                        if key not in includes:
-                            includes.append(key)
+            for filename, code in zip(level, codes):
 
-                    includes = [i for i in includes if supplement.includes.write_to_includes(i)]
+                if args.disp:
+                    print "loading", filename
 
-                    program.itypes = includes
+                #code = re.sub('%#', '##', code)
 
-            else:
-                builder.load(filename, code)
+                #Here you have to change filename to current folder for .py files
+                #local_name = pathOne + sep + os.path.basename(filename)
+                local_name = os.getcwd() + sep + os.path.basename(filename)
+
+                types = project_types.get(os.path.basename(filename))
+                if not args.reset:
+                    types = supplement.loader.merge(types,
+                            supplement.loader.read(local_name))
+
+                if types and types.get("verbatims"):
+                    code = supplement.verbatim.set(types["verbatims"], code)
+
+                with profiler.phase("load"):
+                    builder.load(filename, code)
                 program = builder[-1]
 
-            # add unknown variables to stack if they exists as files
-            unknowns = builder.get_unknowns(filename)
+                if types:
+                    supplement.loader.apply(program, types)
 
-            for i in xrange(len(unknowns)-1, -1, -1):
-                #print i
-                for path in paths:
-                    #print path
-                    if os.path.isfile(path + sep + unknowns[i] + ".m"):
-                        unknowns[i] = unknowns[i] + ".m"
-                    if os.path.isfile(path + sep + unknowns[i]):
-                        program.include(path + sep + unknowns[i])
-                        #filenames.append(path + sep + unknowns.pop(i))
-                        filenames.append(path + sep + unknowns[i])
+                # add unknown variables to stack if they exists as files
+                with profiler.phase("discover"):
+                    unknowns = builder.get_unknowns(filename)
 
+                for i in xrange(len(unknowns)-1, -1, -1):
+                    if unknowns[i] in index:
+                        program.include(index[unknowns[i]])
+                        filenames.append(index[unknowns[i]])
 
     else:
-        builder.load("unnamed", args.filename)
+        with profiler.phase("load"):
+            builder.load("unnamed", args.filename)
         program = builder[-1]
 
+    profiler.nodes("load", builder.project)
+
+    return builder
+
+
+def convert(builder, args):
+    """
+Configure, modify and translate all programs loaded into the builder.
+
+Args:
+    builder (Builder): Tree constructor with programs loaded
+    args (ArgumentParser): arguments parsed through m2cpp
+
+Returns:
+    Builder: The (possibly replaced) tree constructor
+    """
+
     #--- work in progress ---
     #Run this mlabwrap code
     #Have this in a try-except block
@@ -210,31 +300,80 @@ Args:
     #Get data types from matlab
     if args.matlab_suggest:
         import matlab_types
-        builder = matlab_types.mtypes(builder, args)
+        with profiler.phase("matlab_suggest"):
+            builder = matlab_types.mtypes(builder, args)
     #------------------------
 
+    # datatypes observed in runs of the Matlab code elsewhere
+    type_trace = getattr(args, "type_trace", None)
+    if type_trace:
+        import typetrace
+        with profiler.phase("type_trace"):
+            if not isinstance(type_trace, dict):
+                type_trace = typetrace.read(type_trace)
+            count = typetrace.apply(builder.project, type_trace)
+        if args.disp:
+            print "%d datatypes set from type traces" % count
+
+    # remove functions not reachable from the entry point
+    if getattr(args, "prune", False):
+        import callgraph
+        with profiler.phase("prune"):
+            pruned = callgraph.prune(builder.project)
+        if args.disp:
+            print "pruned %d unreachable functions" % len(pruned)
+
     if args.disp:
         print "configure tree"
 
-    builder.configure(suggest=(2*args.suggest or args.matlab_suggest))
+    with profiler.phase("configure"):
+        builder.configure(suggest=(2*args.suggest or args.matlab_suggest or
+            bool(type_trace)))
+    profiler.nodes("configure", builder.project)
 
     #--- work in progress ---
     #Modify the Abstract Syntax Tree (AST)
-    builder.project = modify.preorder_transform_AST(builder.project, args.nargin, suggest=(2*args.suggest or args.matlab_suggest))
+    with profiler.phase("preorder"):
+        builder.project = modify.preorder_transform_AST(builder.project, args.nargin)
+    profiler.nodes("preorder", builder.project)
     #------------------------
     
     if args.disp:
         print builder.project.summary()
         print "generate translation"
 
-    builder.project.translate(args)
+    with profiler.phase("translate"):
+        builder.project.translate(args)
+    profiler.nodes("translate", builder.project)
 
     #post order modify project
-    builder.project = modify.postorder_transform_AST(builder.project)
+    with profiler.phase("postorder"):
+        builder.project = modify.postorder_transform_AST(builder.project)
+    profiler.nodes("postorder", builder.project)
+
+    return builder
+
+
+def generate(builder, stamp=None, reset=False, exists=os.path.isfile):
+    """
+Create the content of the output files for every program in the builder.
 
-    t = time.time()
-    stamp = date.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S')
+Args:
+    builder (Builder): Tree constructor with translated programs
+    stamp (str): Time stamp used in file headers. Defaults to current time.
+    reset (bool): If true, declarative supplements are not refreshed.
+    exists (callable): Check if an output file already exists
+
+Returns:
+    list: Pairs of output name (without extension) and a dictionary mapping
+    file extension to file content.
+    """
 
+    if stamp is None:
+        t = time.time()
+        stamp = date.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S')
+
+    out = []
     for program in builder.project:
 
         #name = program.name
@@ -249,67 +388,165 @@ Args:
         py = qfunctions.qpy(program, prefix=True)
         log = qfunctions.qlog(program)
 
-        if args.disp:
-            print "Writing files..."
-
-        if args.reset:
-            for ext in [".cpp", ".hpp", ".log", ".py"]:
-                if os.path.isfile(name+ext):
-                    os.remove(name+ext)
+        files = {}
 
         if cpp:
-            cpp = """// Automatically translated using m2cpp %s on %s
+            files[".cpp"] = """// Automatically translated using m2cpp %s on %s
 
 %s""" % (__version__, stamp, cpp)
-            f = open(name+".cpp", "w")
-            f.write(cpp)
-            f.close()
 
         if hpp:
-            hpp = """// Automatically translated using m2cpp %s on %s
+            files[".hpp"] = """// Automatically translated using m2cpp %s on %s
             
 %s""" % (__version__, stamp, hpp)
-            f = open(name+".hpp", "w")
-            f.write(hpp)
-            f.close()
 
         if log:
-            log = "Automatically translated using m2cpp %s on %s\n\n%s"\
+            files[".log"] = "Automatically translated using m2cpp %s on %s\n\n%s"\
                     % (__version__, stamp, log)
-            f = open(name+".log", "w")
-            f.write(log)
-            f.close()
 
         if py:
-            py = """# Automatically translated using m2cpp %s on %s
+            files[".py"] = """# Automatically translated using m2cpp %s on %s
 #
 %s""" % (__version__, stamp, py)
-            f = open(name+".py", "w")
-            f.write(py)
-            f.close()
 
-        if os.path.isfile(name+".pyc"):
-            os.remove(name+".pyc")
+        # keep declarative supplement in sync if that is the one in use
+        if exists(name+".json") and not reset:
+            itypes = [i for i in program.itypes
+                    if supplement.includes.write_to_includes(i)]
+            files[".json"] = supplement.loader.str_json(program.ftypes,
+                program.stypes, itypes, program.vtypes,
+                program.iotypes) + "\n"
 
+        out.append((name, files))
 
-    program = builder[0]
+    return out
 
-    if args.tree_full:
-        print program.summary(args)
 
-    elif args.tree:
-        if program[1][0].cls == "Main":
-            print program[1][0][3].summary(args)
-        else:
-            print program[1].summary(args)
+def translate_sources(sources, filename=None, stamp="", **options):
+    """
+Translate Matlab code in-process, without reading or writing files.  This is
+the equivalent of :py:func:`main`, taking the file contents as strings and
+returning the files `m2cpp` would write.
 
-    elif args.line:
-        nodes = program[1].flatten(False, False, False)
-        for node_ in nodes:
-            if node_.line == args.line and node_.cls != "Block":
-                print node_.str.replace("__percent__", "%")
-                break
-    else:
-        print program[1].str.replace("__percent__", "%")
+Dependencies are looked up among the other `sources` by name.  Supplements are
+given as sources named ``<file>.m.py`` or ``<file>.m.json``, and the
+consolidated supplement option as a dictionary.  Likewise `type_trace` may be
+merged traces from :py:func:`~matlab2cpp.typetrace.read`.
+
+Args:
+    sources (dict, str): Matlab code by file name, or the code of a script
+    filename (str): Main file in `sources`.  May be omitted if there is only
+        one Matlab file.
+    stamp (str): Time stamp used in file headers
+    **options: Flags from `OPTIONS`, like `suggest` and `reset`
+
+Returns:
+    dict: Generated file contents by file name, including the headers
+    `mconvert.h` and `SPlot.h` when used.
+
+Example:
+    >>> files = translate_sources({"f.m": "function y=f(x)\\ny = g(x)+1",
+    ...     "g.m": "function y=g(x)\\ny = x", "g.m.json": '{"functions": '
+    ...     '{"g": {"x": "vec", "y": "vec"}}}'}, "f.m", suggest=True)
+    >>> print sorted(files)
+    ['f.m.hpp', 'f.m.py', 'g.m.hpp', 'g.m.json', 'g.m.py']
+    >>> print files["f.m.hpp"].split("\\n", 2)[-1]
+    #ifndef F_M_HPP
+    #define F_M_HPP
+    <BLANKLINE>
+    #include "g.m.hpp"
+    #include <armadillo>
+    using namespace arma ;
+    <BLANKLINE>
+    vec f(vec x)
+    {
+      vec y ;
+      y = g(x)+1 ;
+      return y ;
+    }
+    #endif
+    """
+
+    if isinstance(sources, basestring):
+        sources = {"unnamed": sources}
+
+    if filename is None:
+        names = [name for name in sources
+                if name[-2:] == ".m" or name == "unnamed"]
+        if len(names) != 1:
+            raise ValueError("main file must be given for several sources")
+        filename = names[0]
+
+    for key in options:
+        if key not in OPTIONS:
+            raise KeyError("unknown option '%s'" % key)
 
+    args = dict(OPTIONS)
+    args.update(options)
+    args = argparse.Namespace(disp=False, line=None, filename=filename, **args)
 
+    builder = tree.builder.Builder(comments=args.comments,
+            original=args.original, enable_omp=args.enable_omp,
+            enable_tbb=args.enable_tbb, reference=args.reference,
+            instrument=args.instrument, lazy=args.lazy,
+            fixed_size=args.fixed_size, specialise=args.specialise)
+    builder.sources = sources
+    builder.headers = {}
+
+    # Matlab files by name, used for dependency discovery
+    index = {}
+    for name in sources:
+        if name[-2:] == ".m":
+            index[os.path.basename(name)[:-2]] = name
+
+    project_types = args.supplement or {}
+
+    with profiler.phase("load"):
+
+        stack = set()
+        filenames = [filename]
+        while filenames:
+
+            name = filenames.pop(0)
+            if name in stack:
+                continue
+            stack.add(name)
+
+            types = project_types.get(os.path.basename(name))
+            if not args.reset:
+                if name + ".json" in sources:
+                    local = supplement.loader.parse_json(
+                            sources[name + ".json"], name + ".json")
+                elif name + ".py" in sources:
+                    local = supplement.loader.parse_py(
+                            sources[name + ".py"], name + ".py")
+                else:
+                    local = None
+                types = supplement.loader.merge(types, local)
+
+            code = sources[name]
+            if types and types.get("verbatims"):
+                code = supplement.verbatim.set(types["verbatims"], code)
+
+            builder.load(name, code)
+            program = builder[-1]
+
+            if types:
+                supplement.loader.apply(program, types)
+
+            for unknown in builder.get_unknowns(name):
+                if unknown in index:
+                    program.include(index[unknown])
+                    filenames.append(index[unknown])
+
+    builder = convert(builder, args)
+
+    files = {}
+    exists = lambda name: os.path.basename(name) in sources
+    for name, content in generate(builder, stamp, args.reset, exists):
+        name = os.path.basename(name)
+        for ext, text in content.items():
+            files[name + ext] = text
+
+    files.update(builder.headers)
+    return files
@@ -0,0 +1,184 @@
+"""
+Call graph over all functions in a project.
+
+Every node in a function body that carries a name is resolved the same way as
+function calls are resolved by :py:func:`~matlab2cpp.configure.funcs.funcs`:
+anonymous functions first, then functions in the same file and finally the
+main function of other loaded files.  Names that are local variables in the
+calling function are not calls.  The graph can be built before the tree is
+configured, so it is a superset of the calls that end up with the backends
+`func_return`, `func_returns` or `func_lambda`.
+
+Example::
+    >>> builder = mc.Builder()
+    >>> builder.load("main.m", "a = f(4)")
+    >>> builder.load("f.m", '''function y=f(x)
+    ... y = g(x)
+    ... function y=g(x)
+    ... y = x
+    ... function y=h(x)
+    ... y = x''')
+    >>> graph = build(builder.project)
+    >>> print sorted(func.name for func in reachable(graph, entries(builder.project)))
+    ['f', 'g', 'main']
+    >>> for program, name in prune(builder.project):
+    ...     print program, name
+    f.m h
+    >>> print builder[1][1].names
+    ['f', 'g']
+"""
+
+import os
+
+import matlab2cpp as mc
+
+
+def resolve(func, name):
+    """
+Find the function a name refers to from inside a function.
+
+Args:
+    func (Func): Function where the name occurs
+    name (str): Name to resolve
+
+Returns:
+    Func, None: The function called, or None if the name is not a call
+    """
+    funcs = func.program[1]
+
+    # lambda scope
+    if "_" + name in funcs.names:
+        return funcs["_" + name]
+
+    # local variable
+    if name in func[0].names or name in func[2].names:
+        return None
+
+    # local scope
+    if name in funcs.names:
+        return funcs[name]
+
+    # external file
+    for program in func.project:
+        if program is not func.program and \
+                os.path.basename(program.name) == name + ".m":
+            if len(program[1]):
+                return program[1][0]
+            break
+
+    return None
+
+
+def build(project):
+    """
+Create call graph for all functions in project.
+
+Args:
+    project (Project): Root of node tree
+
+Returns:
+    dict: Mapping from each function to the list of functions it calls
+    """
+    graph = {}
+    for program in project:
+        for func in program[1]:
+
+            callees = []
+            names = set()
+            for node in func[3].flatten(False, False, False):
+                if node.name and node.name not in names:
+                    names.add(node.name)
+                    callee = resolve(func, node.name)
+                    if callee is not None and callee is not func:
+                        callees.append(callee)
+
+            graph[func] = callees
+
+    return graph
+
+
+def entries(project):
+    """The functions where execution starts: the first function of the first
+program loaded."""
+    if not len(project) or not len(project[0][1]):
+        return []
+    return [project[0][1][0]]
+
+
+def reachable(graph, start):
+    """
+All functions reachable from the start functions (breadth first).
+
+Args:
+    graph (dict): Call graph from :py:func:`~matlab2cpp.callgraph.build`
+    start (list): Entry functions
+
+Returns:
+    list: Reachable functions in discovery order
+    """
+    seen = set(start)
+    out = list(start)
+    for func in out:
+        for callee in graph.get(func, []):
+            if callee not in seen:
+                seen.add(callee)
+                out.append(callee)
+    return out
+
+
+def prune(project):
+    """
+Remove all functions not reachable from the entry point.  Programs without any
+reachable functions are removed from the project together with their includes
+in other programs.  The names of the removed functions are stored in the
+``pruned`` property of each program and reported in its log on translation.
+
+Args:
+    project (Project): Root of node tree
+
+Returns:
+    list: Pairs of program name and function name for each pruned function
+    """
+    graph = build(project)
+    keep = set(reachable(graph, entries(project)))
+
+    pruned = []
+    removed = []
+    for program in project[:]:
+
+        funcs, headers = program[1], program[4]
+        names = [func.name for func in funcs if func not in keep]
+        if not names:
+            continue
+
+        pruned.extend([(program.name, name) for name in names])
+
+        if len(names) == len(funcs):
+            project.children.remove(program)
+            removed.append(os.path.basename(program.name))
+            continue
+
+        funcs.children = [func for func in funcs if func in keep]
+        headers.children = [header for header in headers
+                if header.name not in names]
+        program.prop["pruned"] = names
+
+    if not removed:
+        return pruned
+
+    # includes of removed programs
+    includes = ['#include "%s.hpp"' % name for name in removed]
+    for program in project:
+        program[0].children = [include for include in program[0]
+                if include.name not in includes]
+
+    # removed files are reported in the log of the entry point
+    main = project[0]
+    main.prop["pruned"] = main.prop.get("pruned", []) + removed
+
+    return pruned
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
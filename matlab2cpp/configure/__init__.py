@@ -3,7 +3,11 @@
 import matlab2cpp as mc
 import datatypes
 import backends
-import reserved
+import promote
+import shapes
+import refine
+import memo
+import overloads
 
 def configure(root, suggest=True, **kws):
     """
@@ -18,9 +22,40 @@ See also:
     loop(root, suggest)
     loop(root, suggest)
 
+    # 1x1 arrays as scalars and unsigned loop counters
+    for _ in xrange(3):
+        if root.cls != "Project" or not refine.refine(root):
+            break
+        loop(root, suggest)
+
+    builder = getattr(root, "builder", None)
+
+    # m2cpp --specialise
+    if builder is not None:
+        overloads.configure(root, builder.specialise)
+
+    # m2cpp --fixed-size
+    if builder is not None and builder.fixed_size:
+        shapes.configure(root)
+
 def loop(root, suggest):
 
+    import reserved
+
     nodes = root.flatten(False, True, True)
+    if suggest:
+        assigns = promote.assignments(nodes)
+
+    # m2cpp --profile
+    call = None
+    if mc.profiler.active[0] is not None:
+        call = lambda module, key, rule, node: mc.profiler.call(
+                mc.profiler.name(module, key), rule, node)
+    reserved_call = call and (lambda key, rule, node:
+            call(reserved, key, rule, node))
+
+    # reserved rules computed once per signature
+    memos = memo.cache(root)
 
     while True:
         
@@ -33,7 +68,8 @@ def loop(root, suggest):
                 if isinstance(rule, str):
                     node.type = rule
                 else:
-                    rule(node)
+                    memo.apply(memos, node.cls+"_"+node.name, rule, node,
+                            reserved_call)
 
             # Datatype stuff
             if node.prop["type"] != "TYPE":
@@ -43,6 +79,8 @@ def loop(root, suggest):
                 datatype = datatypes.__dict__[node.cls]
                 if isinstance(datatype, str):
                     node.type = datatype
+                elif call:
+                    call(datatypes, node.cls, datatype, node)
                 else:
                     datatype(node)
 
@@ -54,6 +92,8 @@ def loop(root, suggest):
                 backend = backends.__dict__[node.cls]
                 if isinstance(backend, str):
                     node.backend = backend
+                elif call:
+                    call(backends, node.cls, backend, node)
                 else:
                     backend(node)
 
@@ -69,6 +109,10 @@ def loop(root, suggest):
                 program.ftypes = suggests
                 complete = complete and not any([any(v) for v in suggests.values()])
 
+            # complex and index promotion, resets the affected nodes
+            if promote.promote(assigns):
+                complete = False
+
             if complete:
                 break
 
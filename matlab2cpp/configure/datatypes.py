@@ -419,6 +419,142 @@ def Assigns(node):
     if node[-1].type != "TYPE":
         node.type = node[-1].type
 
+Cell = "cell"
+
+def Cvar(node):
+    "a{k} read from a cell with known element type"
+    if node.parent.cls == "Assign" and node.parent[0] is node:
+        return
+    type = cell_element(node)
+    if type:
+        node.type = type
+
+def cell_element(node):
+    """
+Common datatype of all elements in a cell variable.  It is found from every
+assignment to the variable in the function: cell literals ``a = {1, 2}``,
+preallocation ``a = cell(n, m)`` and element assignments ``a{k} = 3``.
+
+Args:
+    node (Node): Reference to the cell variable
+
+Returns:
+    str, None: Element datatype, or None if unknown or not shared
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(); a = {1, 2}; a{3} = 4; b = {1, 'c'}")
+    >>> builder.configure(suggest=True)
+    >>> declares = builder[0][1][0][0]
+    >>> print cell_element(declares["a"]), cell_element(declares["b"])
+    int None
+    """
+    declare = node.declare
+    if declare.parent.cls != "Declares":
+        return None
+
+    types = set()
+    for assign in declare.func[3].flatten(False, False, False):
+
+        if assign.cls != "Assign" or len(assign) != 2 or \
+                assign[0].name != declare.name:
+            continue
+
+        lhs, rhs = assign
+        if lhs.cls == "Var" and rhs.cls == "Cell":
+            types.update([elem.type for elem in rhs])
+        elif lhs.cls == "Var" and rhs.cls == "Get" and rhs.name == "cell":
+            pass
+        elif lhs.cls == "Cvar" and len(lhs):
+            types.add(rhs.type)
+        else:
+            return None
+
+    if len(types) != 1:
+        return None
+
+    type = types.pop()
+    if type == "string" or mc.datatype.get_num(type):
+        return type
+    return None
+
+
+def cell_fixed(node):
+    """
+Check if a cell variable with a common element type keeps its size.  The
+smallest size is found from every cell literal and preallocation ``cell(n, m)``
+with literal sizes, and every element assignment ``a{k} = ...`` must be to a
+literal index inside it.  Other cells can grow, and are stored in a
+`std::vector`.
+
+Args:
+    node (Node): Reference to the cell variable
+
+Returns:
+    bool: True if the cell can be an Armadillo `field`
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(n); a = {1, 2}; a{2} = 4; b = {1, 2}; "
+    ...     "b{3} = 4; c = cell(1, n); c{1} = 4")
+    >>> builder.configure(suggest=True)
+    >>> declares = builder[0][1][0][0]
+    >>> print cell_fixed(declares["a"]), cell_fixed(declares["b"]), \\
+    ...     cell_fixed(declares["c"])
+    True False False
+    """
+    declare = node.declare
+    if not cell_element(declare):
+        return False
+
+    rows = cols = None
+    indices = []
+    for assign in declare.func[3].flatten(False, False, False):
+
+        if assign.cls != "Assign" or assign[0].name != declare.name:
+            continue
+
+        lhs, rhs = assign
+        if lhs.cls == "Cvar":
+            indices.append(lhs)
+            continue
+
+        # cell literal, rows are kept by the parser
+        if rhs.cls == "Cell":
+            rows_ = int(rhs.value or 1)
+            if len(rhs) % rows_:
+                rows_ = 1
+            size = rows_, len(rhs)//rows_
+
+        # cell(n) or cell(n, m)
+        elif all([arg.cls == "Int" for arg in rhs]) and len(rhs) in (1, 2):
+            size = int(rhs[0].value), int(rhs[-1].value)
+
+        else:
+            return False
+
+        rows = size[0] if rows is None else min(rows, size[0])
+        cols = size[1] if cols is None else min(cols, size[1])
+
+    if rows is None:
+        return False
+
+    for lhs in indices:
+
+        if not all([index.cls == "Int" for index in lhs]):
+            return False
+        index = [int(index.value) for index in lhs]
+
+        if len(index) == 1 and not 1 <= index[0] <= rows*cols:
+            return False
+        if len(index) == 2 and not (1 <= index[0] <= rows and
+                1 <= index[1] <= cols):
+            return False
+        if len(index) > 2:
+            return False
+
+    return True
+
 
 if __name__ == "__main__":
     import doctest
@@ -1,31 +1,33 @@
 import os
 
-def funcs(node):
-
-    func = None
+def function(node):
+    """Function definition called by a node, or None if not a function."""
 
     # lambda scope
     if "_" + node.name in node.program[1]:
-        func = node.program[1]["_" + node.name]
+        return node.program[1]["_" + node.name]
     
     # local scope
-    elif node in node.program[1]:
-        func = node.program[1][node]
+    if node in node.program[1]:
+        return node.program[1][node]
 
     # external file in same folder
-    else:
+    for program in node.project:
+
+        # don't use the file your in as external library
+        if program is node.program:
+            continue
 
-        for program in node.project:
+        if os.path.basename(program.name) == node.name+".m":
+            return program[1][0]
 
-            # don't use the file your in as external library
-            if program is node.program:
-                continue
+    return None
+
+def funcs(node):
 
-            if os.path.basename(program.name) == node.name+".m":
-                func = program[1][0]
-                break
-        else:
-            return False
+    func = function(node)
+    if func is None:
+        return False
 
     node.backend = func.backend
 
@@ -0,0 +1,120 @@
+"""
+Memoisation of the reserved datatype rules.
+
+The rules in :py:mod:`~matlab2cpp.configure.reserved` derive the datatype of a
+call to a builtin function from its arguments, and
+:py:func:`~matlab2cpp.configure.loop` calls them for every matching node in
+every iteration, even if nothing has changed.  A rule only reads the signature
+of the call: the name, the number of arguments, their classes, datatypes and
+literal values, the current datatype of the node, and its parent and group.  The
+resulting datatype is stored by signature for the whole project and reused for
+every other node with the same signature.
+
+Rules that change other nodes, or read suggestions from the declared variables,
+are always called.  With ``m2cpp --profile`` the number of hits and misses are
+part of the report, see :py:mod:`~matlab2cpp.profiler`.
+
+The three calls to `abs` share signatures, one before and one after their
+datatype is known, while `size` is always called:
+
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(x, y)\\na = abs(x);\\nb = abs(y);\\n"
+    ...     "c = abs(x);\\nd = size(y);")
+    >>> builder[0].ftypes = {"f": {"x": "vec", "y": "vec"}}
+    >>> builder.configure()
+    >>> print len(builder.project.prop["memo"])
+    2
+    >>> print mc.qscript(builder)
+    void f(vec x, vec y)
+    {
+      urowvec d ;
+      vec a, b, c ;
+      a = abs(x) ;
+      b = abs(y) ;
+      c = abs(x) ;
+      uword _d [] = {y.n_rows, y.n_cols} ;
+      d = urowvec(_d, 2, false) ;
+    }
+"""
+
+import matlab2cpp as mc
+
+# rules changing other nodes or reading suggestions
+UNCACHED = {"Get_size", "Get_zeros", "Get_ones"}
+
+# rules reading the value of literal arguments
+VALUED = {"Get_any", "Get_all", "Get_min", "Get_max", "Get_sum"}
+
+
+def cacheable(key):
+    """Check if the result of a reserved rule can be stored by signature."""
+    return key[:4] in ("Get_", "Var_") and key not in UNCACHED
+
+
+def signature(key, node):
+    """
+Everything a reserved rule reads from a node.
+
+Args:
+    key (str): Name of the rule, like ``Get_sum``
+    node (Node): Node the rule is called on
+
+Returns:
+    tuple: Hashable signature
+    """
+
+    valued = key in VALUED
+    args = tuple([(child.cls, child.type, valued and child.value or None)
+        for child in node])
+
+    parent = node.parent
+    group = node.group
+    target = group.cls == "Assign" and len(group) and group[0].type or None
+
+    return (key, node.prop["type"], node.type, args,
+            (parent.cls, parent.backend, parent.name),
+            (group.cls, target, group.num))
+
+
+def cache(root):
+    """Memo of a project, created on first use."""
+    project = root.project
+    memo = project.prop.get("memo")
+    if memo is None:
+        memo = project.prop["memo"] = {}
+    return memo
+
+
+def apply(memo, key, rule, node, call=None):
+    """
+Apply a reserved rule to a node, through the memo if possible.
+
+Args:
+    memo (dict): Results by signature, see :py:func:`cache`
+    key (str): Name of the rule
+    rule (callable): The rule
+    node (Node): Node to configure
+    call (callable, None): Wrapper used for profiling
+    """
+
+    if not cacheable(key):
+        if call:
+            call(key, rule, node)
+        else:
+            rule(node)
+        return
+
+    sig = signature(key, node)
+    result = memo.get(sig)
+
+    if result is None:
+        if call:
+            call(key, rule, node)
+        else:
+            rule(node)
+        memo[sig] = node.prop["type"], node.prop["pointer"]
+
+    else:
+        node.prop["type"], node.prop["pointer"] = result
+
+    mc.profiler.memo("configure.reserved." + key, result is not None)
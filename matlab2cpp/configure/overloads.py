@@ -0,0 +1,377 @@
+"""
+Specialised overloads of functions by the argument types at their call sites.
+
+Parameters get the widest datatype suggested from the calls, so a function
+called with both a `vec` and a `mat` takes a `mat`, and the vector is converted
+on every call.  With the `specialise` option of
+:py:class:`~matlab2cpp.Builder` (`m2cpp --specialise`), the argument types of
+every call in the project are collected, and the function is translated once
+more for each combination that differs from the general version, as C++
+overloads of the same name.  The datatypes in the body of an overload are
+configured again from its parameters, while the return values keep the types of
+the general version, so callers are unaffected.
+
+Only the dimensions of arrays are specialised, and only where it is safe for
+C++ to pick the overload: every argument to a specialised parameter must be a
+variable, so it matches an overload exactly, and parameters assigned in the
+body keep their type.  If the calls need more overloads than the limit, only
+the general version is used.  The overloads are recorded in the supplement file
+under the key ``_overloads`` of the function, and are created from there in
+later translations, as long as the code still allows them.
+
+Calls inside an overload are not specialised further: they use the overloads
+needed by the calls in the general versions, which are usually the same.
+
+Example:
+    >>> builder = mc.Builder(specialise=4)
+    >>> builder.load("f.m", "function f(x, A)\\ns = first(x) + first(A);\\n"
+    ...     "function s=first(y)\\nz = y.*y;\\ns = z(1);")
+    >>> builder[0].ftypes = {"f": {"x": "vec", "A": "mat"}}
+    >>> print mc.qscript(builder)
+    void f(vec x, mat A)
+    {
+      double s ;
+      s = first(x)+first(A) ;
+    }
+    <BLANKLINE>
+    double first(vec y)
+    {
+      double s ;
+      vec z ;
+      z = y%y ;
+      s = z(0) ;
+      return s ;
+    }
+    <BLANKLINE>
+    double first(mat y)
+    {
+      double s ;
+      mat z ;
+      z = y%y ;
+      s = z(0) ;
+      return s ;
+    }
+    >>> print mc.qpy(builder, prefix=False)
+    functions = {
+      "f" : {
+        "A" : "mat",
+        "s" : "double",
+        "x" : "vec",
+      },
+      "first" : {
+        "s" : "double",
+        "y" : "vec",
+        "z" : "vec",
+        "_overloads" : [
+          {"y" : "mat"},
+        ],
+      },
+    }
+    includes = [
+      '#include <armadillo>',
+      'using namespace arma ;',
+    ]
+"""
+
+import matlab2cpp as mc
+import funcs
+
+# backends of functions that can be specialised
+BACKENDS = ("func_return", "func_returns")
+
+# default number of overloads per function, `m2cpp --specialise`
+LIMIT = 4
+
+
+def assigned(func):
+    """Names of variables assigned to in the body of a function."""
+
+    names = set()
+    for node in func[3].flatten(False, False, False):
+
+        if node.cls in ("Assign", "Assigns"):
+            names.update([child.name for child in node[:-1]])
+
+        elif node.cls in ("For", "Parfor"):
+            names.add(node[0].name)
+
+    return names
+
+
+def specialisable(func):
+    """Check if a function can be translated in multiple versions."""
+
+    if func.cls != "Func" or func.backend not in BACKENDS or \
+            func.name[:1] == "_" or not len(func[2]):
+        return False
+
+    if any([var.type == "TYPE" for var in func[2]]):
+        return False
+
+    # lambdas are defined in the general version
+    return not any([node.cls == "Lambda"
+        for node in func[3].flatten(False, False, False)])
+
+
+def calls(project):
+    """
+Calls of each function in a project.
+
+Returns:
+    list: Pairs of function definitions and their call nodes
+    """
+
+    out = []
+    for program in project:
+        for node in program.flatten(False, False, False):
+
+            if node.cls != "Get" or node.backend not in BACKENDS:
+                continue
+
+            func = funcs.function(node)
+            if func is None:
+                continue
+
+            for func_, nodes in out:
+                if func_ is func:
+                    nodes.append(node)
+                    break
+            else:
+                out.append((func, [node]))
+
+    return out
+
+
+def signature(node, params, fixed):
+    """
+Parameter types for a call.
+
+Args:
+    node (Get): Call of the function
+    params (Params): Parameters of the general version
+    fixed (set): Names of parameters that keep their type
+
+Returns:
+    tuple: Datatypes of the parameters, and the positions where the argument
+    is an expression, or None if the call can only use the general version.
+    """
+
+    if len(node) != len(params):
+        return None
+
+    types, inexact = [], []
+    for i in xrange(len(params)):
+
+        arg, param = node[i], params[i]
+
+        # only arrays of the same element type
+        if param.name in fixed or not param.num or param.dim not in (1, 2, 3) \
+                or not arg.num or arg.dim not in (1, 2, 3) or arg.mem != param.mem:
+            types.append(param.type)
+
+        # expressions convert to any array type
+        elif arg.cls != "Var":
+            types.append(param.type)
+            inexact.append(i)
+
+        else:
+            types.append(arg.type)
+
+    return tuple(types), inexact
+
+
+def allowed(params, types, fixed, inexact):
+    """
+Check if an overload only differs from the general version where it is safe.
+
+Args:
+    params (Params): Parameters of the general version
+    types (tuple): Datatypes of the parameters of the overload
+    fixed (set): Names of parameters that keep their type
+    inexact (set): Positions where a call passes an expression
+
+Returns:
+    bool: True if the overload can be created
+    """
+
+    if len(types) != len(params):
+        return False
+
+    for i in xrange(len(params)):
+
+        param, type = params[i], types[i]
+        if type == param.type:
+            continue
+
+        if param.name in fixed or i in inexact or not param.num or \
+                param.dim not in (1, 2, 3):
+            return False
+
+        try:
+            if not mc.datatype.get_num(type) or \
+                    mc.datatype.get_dim(type) not in (1, 2, 3) or \
+                    mc.datatype.get_mem(type) != param.mem:
+                return False
+        except ValueError:
+            return False
+
+    return True
+
+
+def overloads(func, nodes, limit):
+    """
+Argument types of the overloads needed by the calls of a function.
+
+Returns:
+    list: Datatypes of the parameters of each overload, without the general
+    version.  Empty if the calls need more than `limit` overloads.
+    """
+
+    params = func[2]
+    fixed = assigned(func)
+    general = tuple([var.type for var in params])
+
+    out, inexact = [], set()
+    for node in nodes:
+        call = signature(node, params, fixed)
+        if call is None:
+            continue
+        types, positions = call
+        inexact.update(positions)
+        if types != general and types not in out:
+            out.append(types)
+
+    if len(out) > limit:
+        return []
+
+    # expressions must not have to choose between overloads
+    for i in inexact:
+        if any([types[i] != general[i] for types in out]):
+            return []
+
+    return out
+
+
+def specialise(func, types, index):
+    """
+Create and configure an overload of a function.
+
+The function is read again from the code of the program and added after the
+general version and earlier overloads.  While it is configured, it has a unique
+name, so the suggestion engine keeps its variables apart from the general
+version.
+
+Args:
+    func (Func): General version
+    types (tuple): Datatypes of the parameters
+    index (int): Number of the overload
+
+Returns:
+    Func, None: The overload, or None if it could not be configured
+    """
+
+    program = func.program
+    builder = mc.Builder(comments=program.project.builder.comments,
+            original=program.project.builder.original)
+    builder.load(program.name, program.code[:-3])
+    funcs_ = builder[0][1]
+    overload = funcs_[funcs_.names.index(func.name)]
+
+    # move from the temporary program
+    funcs_.children.remove(overload)
+    overload.parent = program[1]
+    position = max([i for i, other in enumerate(program[1].children)
+        if other.name == func.name])
+    program[1].children.insert(position+1, overload)
+    for node in overload.flatten(False, False, False):
+        for key in ("_program", "_project", "_func", "_declare", "_group",
+                "_file", "_line"):
+            node.__dict__.pop(key, None)
+
+    name = func.name
+    overload.name = "%s_%d_" % (name, index)
+
+    for var, type in zip(overload[2], types):
+        var.type = type
+
+    # return values are fixed, other arrays are configured again
+    declares, returns = func[0], func[1]
+    for var in overload[0][:] + overload[1][:]:
+        if var.name in declares.names:
+            declare = declares[declares.names.index(var.name)]
+            if var.name in returns.names or not declare.num or not declare.dim:
+                var.type = declare.type
+
+    mc.configure.loop(overload, True)
+
+    overload.name = name
+    complete = all([var.type != "TYPE" for var in overload[0][:]+overload[2][:]])
+    if not complete:
+        program[1].children.remove(overload)
+        return None
+
+    overload.prop["overload"] = index
+    header = mc.collection.Header(program[4], name)
+    header.backend = "program"
+    header.prop["overload"] = index
+    return overload
+
+
+def configure(project, limit):
+    """
+Add specialised overloads to a configured project.
+
+Overloads listed in the supplement file are created if they are still safe,
+others only if `limit` is positive.
+
+Args:
+    project (Project): Root of the node tree
+    limit (int): Largest number of overloads per function
+
+Returns:
+    list: The overloads created
+    """
+
+    sites = calls(project)
+    out = []
+
+    for program in project:
+        for func in program[1][:]:
+
+            if not specialisable(func) or any([other.name == func.name and
+                    "overload" in other.prop for other in program[1]]):
+                continue
+
+            params = func[2]
+            nodes = [nodes for func_, nodes in sites if func_ is func]
+            nodes = nodes and nodes[0] or []
+
+            listed = func.prop.get("overloads")
+            if listed is not None:
+                types = [tuple([overload.get(var.name) or var.type
+                    for var in params]) for overload in listed]
+
+                # the code might have changed since they were listed
+                fixed = assigned(func)
+                inexact = set()
+                for node in nodes:
+                    call = signature(node, params, fixed)
+                    if call is not None:
+                        inexact.update(call[1])
+                types = [types_ for types_ in types
+                    if allowed(params, types_, fixed, inexact)]
+                if len(types) > (limit or LIMIT):
+                    types = []
+
+            elif limit:
+                types = nodes and overloads(func, nodes, limit) or []
+
+            else:
+                continue
+
+            for index, types_ in enumerate(types):
+                overload = specialise(func, types_, index+1)
+                if overload is not None:
+                    out.append(overload)
+
+    return out
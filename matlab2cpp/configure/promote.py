@@ -0,0 +1,128 @@
+"""
+Type promotion rules applied between the passes of the configuration loop.
+
+Datatypes are only assigned to nodes with type ``TYPE``, so once a variable
+is declared it keeps its datatype.  Some assignments require the declared type
+of the left hand side to change after the fact:
+
+* A real variable assigned a complex value is promoted to the complex type of
+  the same dimension.  Promotion only goes from real to complex, so repeating
+  it always terminates.
+* A variable assigned the result of `find` is an index vector, `uvec`,
+  unless it has already been promoted to complex.
+
+The `find` rule never applies to a complex declaration, and promotion to
+complex is never undone, so each declaration changes at most twice and the
+loop reaches a fixed point.
+
+When a declaration changes, only the nodes referring to the variable (and the
+expressions containing them) are reset to ``TYPE``.  The next pass of the
+loop then propagates the new type along the affected assignments, which again
+might be promoted, without reconfiguring the rest of the project.
+
+Example:
+    >>> print mc.qhpp('''function f()
+    ... a = [1, 2, 3]
+    ... b = a
+    ... b = fft(a)
+    ... c = b*2''', suggest=True)
+    #ifndef F_M_HPP
+    #define F_M_HPP
+    <BLANKLINE>
+    #include <armadillo>
+    using namespace arma ;
+    <BLANKLINE>
+    void f()
+    {
+      cx_rowvec b, c ;
+      irowvec a ;
+      sword _a [] = {1, 2, 3} ;
+      a = irowvec(_a, 3, false) ;
+      b = conv_to<cx_rowvec>::from(a) ;
+      b = arma::fft(a) ;
+      c = b*2 ;
+    }
+    #endif
+"""
+import matlab2cpp as mc
+
+
+def assignments(nodes):
+    """Single assignments that are subject to promotion."""
+    return [node for node in nodes
+            if node.cls == "Assign" and len(node) == 2]
+
+
+def declaration(node):
+    """Declaration of the variable assigned to, or None if not a variable."""
+    if node.cls not in ("Var", "Set", "Get", "Cset", "Cget"):
+        return None
+    declare = node.declare
+    if declare is node or declare.parent.cls not in ("Declares", "Params"):
+        return None
+    return declare
+
+
+def invalidate(declare):
+    """
+Reset the datatype of every node referring to a declared variable and of the
+expressions containing them.  If the variable is a return value, calls to the
+function are reset as well.
+    """
+    func = declare.func
+    nodes = [node for node in func.flatten(False, False, False)
+            if node.name == declare.name and node is not declare
+            and node.parent.cls not in ("Declares", "Params")]
+
+    # callers see a new return type
+    if declare.name in func[1].names:
+        for program in func.project:
+            nodes.extend([node for node in program.flatten(False, False, False)
+                if node.name == func.name and node.cls in ("Get", "Var")])
+
+    for node in nodes:
+        while node.cls not in ("Block", "Func", "Main", "Returns", "Program"):
+            node.prop["type"] = "TYPE"
+            node = node.parent
+
+
+def promote(assigns):
+    """
+Apply promotion rules to assignments.
+
+Args:
+    assigns (list): Assign nodes from :py:func:`assignments`
+
+Returns:
+    bool: True if any declaration was changed
+    """
+    changed = []
+
+    for node in assigns:
+
+        lhs, rhs = node
+        declare = declaration(lhs)
+        if declare is None:
+            continue
+
+        # b = find(a==3), unless already promoted to complex
+        if rhs.cls == "Get" and rhs.name == "find":
+            if lhs.cls == "Var" and declare.type != "uvec" and \
+                    declare.mem != 4:
+                declare.type = "uvec"
+                changed.append(declare)
+
+        # real lhs, complex rhs
+        elif declare.num and declare.mem != 4 and rhs.mem == 4:
+            declare.mem = 4
+            changed.append(declare)
+
+    for declare in changed:
+        invalidate(declare)
+
+    return bool(changed)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,307 @@
+"""
+Refinement of datatypes after configuration.
+
+Datatypes are only assigned to nodes with type ``TYPE``, and suggestions
+widen towards the largest dimension seen.  A node typed while its operands
+were still unknown keeps a vector or matrix type even after the operands turn
+out to be scalars, and a variable assigned from a one element literal like
+``[x]`` is declared as a matrix.  Such values are wrapped in 1x1 matrices and
+unwrapped again with `as_scalar`, which allocates on every evaluation.
+
+This pass proves values to be 1x1 and demotes them to scalars:
+
+* Operators and array indexing where every operand is a scalar.
+* Local variables where every assignment of the whole variable is a scalar
+  or a 1x1 literal, and the variable is never indexed, transposed, or passed
+  to a function that expects an array.
+
+Loop counters running from a non-negative literal with a positive literal step
+to an unsigned bound, like ``for i=1:length(x)``, and only used for indexing,
+become `uword`.  The affected nodes are reset and configured again, see
+:py:func:`~matlab2cpp.configure.promote.invalidate`.  Refined variables are
+reported in the log of the program.
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function y=f(v)\\ny = 0.;\\nfor i=1:length(v)\\n"
+    ...     "  t = [v(i)];\\n  y = y + t;\\nend")
+    >>> builder[0].ftypes = {"f": {"v": "vec"}}
+    >>> print mc.qscript(builder)
+    double f(vec v)
+    {
+      double t, y ;
+      uword i ;
+      y = 0. ;
+      {
+        const uword _i_stop = m2cpp::length(v) ;
+        for (i=1; i<=_i_stop; i++)
+        {
+          t = v(i-1) ;
+          y = y+t ;
+        }
+      }
+      return y ;
+    }
+    >>> print mc.qlog(builder)
+    Warning in class Assign on line 4:
+    <BLANKLINE>
+      t = [v(i)];
+       ^
+    Variable t is always 1x1, declared as double instead of vec
+    <BLANKLINE>
+    Warning in class For on line 3:
+    <BLANKLINE>
+    for i=1:length(v)
+     ^
+    Loop counter i only used for indexing, declared as uword instead of int
+"""
+
+import matlab2cpp as mc
+import promote
+import shapes
+
+# reserved functions that apply to scalars as well as arrays
+ELEMENTAL = {"abs", "sqrt", "exp", "log", "log2", "log10", "sin", "cos", "tan",
+        "asin", "acos", "atan", "sinh", "cosh", "tanh", "floor", "ceil",
+        "round", "fix", "sign", "real", "imag", "conj"}
+
+# classes that allow scalar operands in place of 1x1 arrays
+SCALAR_PARENTS = {"Assign", "Plus", "Minus", "Mul", "Elmul", "Elementdivision",
+        "Leftelementdivision", "Matrixdivision", "Exp", "Elexp", "Neg", "Paren",
+        "Vector", "Lt", "Le", "Gt", "Ge", "Eq", "Ne", "Land", "Lor", "Band",
+        "Bor", "Not", "Statement", "If", "Elif", "While", "Switch", "Case"}
+
+# operators that are scalar if all operands are
+OPERATORS = {"Plus", "Minus", "Mul", "Elmul", "Elementdivision",
+        "Leftelementdivision", "Exp", "Elexp", "Neg", "Paren"}
+
+# path from a loop counter to the index it is used in
+INDEX_PATH = {"Plus", "Minus", "Mul", "Paren", "Colon"}
+
+INDEXING = ("Get", "Set")
+
+
+def operands(func):
+    """
+Operators, array indexing and one element literals where every operand is
+a scalar, but the node is not.
+    """
+
+    nodes = []
+    for node in func[3].flatten(False, False, False):
+
+        if not node.num or not node.dim or not len(node):
+            continue
+
+        if node.cls in OPERATORS:
+            pass
+        elif node.cls in ("Matrix", "Vector") and len(node) == 1:
+            pass
+        elif node.cls == "Get" and node.declare is not node and \
+                node.declare.num and node.declare.dim:
+            pass
+        else:
+            continue
+
+        if all([child.num and child.dim == 0 for child in node]) and \
+                not gathered(node):
+            nodes.append(node)
+
+    return nodes
+
+
+def gathered(node):
+    """Check if an expression gathers fields from an array of structs."""
+
+    return any([child.backend == "structs"
+        for child in node.flatten(False, False, False)])
+
+
+def used_as_scalar(node):
+    """Check if a reference to a variable can be replaced by a scalar."""
+
+    if node.cls != "Var":
+        return False
+
+    parent = node.parent
+    if parent.cls in SCALAR_PARENTS:
+        return True
+
+    return parent.cls == "Get" and parent.backend == "reserved" and \
+            parent.name in ELEMENTAL
+
+
+def scalars(func):
+    """
+Local variables that only hold 1x1 values.
+
+Args:
+    func (Func): Function definition
+
+Returns:
+    list: Declarations of the variables and their first assignments
+    """
+
+    declares, returns, params = func[0], func[1], func[2]
+
+    candidates = set([var.name for var in declares
+        if var.num and var.dim and var.name not in params.names
+        and var.name not in returns.names])
+
+    values, other = shapes.assignments(func)
+    candidates.difference_update(other)
+    candidates.intersection_update(values)
+    candidates.difference_update([name for name in candidates
+        if any([gathered(value) for value in values[name]])])
+
+    for node in func[3].flatten(False, False, False):
+        if node.name in candidates and not used_as_scalar(node):
+            candidates.discard(node.name)
+
+    # variables assigned from each other are scalar together
+    known = {}
+    changed = True
+    while changed:
+        changed = False
+        for name in candidates.difference(known):
+            if all([shapes.shape(value, known) == (1, 1)
+                    for value in values[name]]):
+                known[name] = (1, 1)
+                changed = True
+
+    return [(declares[declares.names.index(name)], values[name][0].parent)
+        for name in sorted(known)]
+
+
+def indexes(node):
+    """Check if a reference to a loop counter is only used for indexing."""
+
+    while node.parent.cls in INDEX_PATH:
+        node = node.parent
+
+    parent = node.parent
+    return parent.cls in INDEXING and parent is not node and \
+            parent.declare is not parent and parent.declare.num and \
+            bool(parent.declare.dim)
+
+
+def counters(func):
+    """
+Loop counters that can be unsigned.
+
+Args:
+    func (Func): Function definition
+
+Returns:
+    list: Declarations of the counters and their first loops
+    """
+
+    declares = func[0]
+
+    loops = {}
+    for node in func[3].flatten(False, False, False):
+        if node.cls in ("For", "Parfor") and node[0].cls == "Var":
+            loops.setdefault(node[0].name, []).append(node)
+
+    values, other = shapes.assignments(func)
+    uses = {}
+    for node in func[3].flatten(False, False, False):
+        if node.name in loops and node.cls in ("Var", "Set", "Get") \
+                and node.parent.cls not in ("For", "Parfor"):
+            uses.setdefault(node.name, []).append(node)
+
+    out = []
+    for name, nodes in sorted(loops.items()):
+
+        if name in values or name not in declares.names:
+            continue
+
+        declare = declares[declares.names.index(name)]
+        if declare.type not in ("int", "double"):
+            continue
+
+        if not all([counted(node) for node in nodes]):
+            continue
+
+        if not all([node.cls == "Var" and indexes(node)
+                for node in uses.get(name, [])]):
+            continue
+
+        out.append((declare, nodes[0]))
+
+    return out
+
+
+def counted(node):
+    """Check if a loop runs a non-negative counter upwards to an unsigned
+bound."""
+
+    # parallel loops declare their own counters
+    index = node.parent.children.index(node)
+    if index and node.parent[index-1].cls in ("Pragma_for", "Tbb_for"):
+        return False
+
+    range = node[1]
+    if range.cls != "Colon" or len(range) not in (2, 3):
+        return False
+
+    start, stop = range[0], range[-1]
+    if start.cls != "Int" or int(start.value) < 0:
+        return False
+
+    if len(range) == 3 and (range[1].cls != "Int" or int(range[1].value) < 1):
+        return False
+
+    if stop.cls == "Int":
+        return int(stop.value) >= 0
+    return stop.num and stop.dim == 0 and stop.mem == 0
+
+
+def refine(project):
+    """
+Refine the datatypes of a configured project.
+
+Args:
+    project (Project): Root of the node tree
+
+Returns:
+    bool: True if any node was changed, and the project must be configured
+    again
+    """
+
+    changed = False
+
+    for program in project:
+        log = program.prop.get("refined") or []
+
+        for func in program[1]:
+            if func.cls not in ("Func", "Main") or len(func) < 4:
+                continue
+
+            # typed from operands before they were known
+            for node in operands(func):
+                while node.cls not in ("Block", "Func", "Main", "Program"):
+                    node.prop["type"] = "TYPE"
+                    node = node.parent
+                changed = True
+
+            for declare, node in scalars(func):
+                old = declare.type
+                declare.type = mc.datatype.get_name(0, declare.mem)
+                promote.invalidate(declare)
+                log.append((node, "Variable %s is always 1x1, declared as "
+                    "%s instead of %s" % (declare.name, declare.type, old)))
+                changed = True
+
+            for declare, node in counters(func):
+                old = declare.type
+                declare.type = "uword"
+                promote.invalidate(declare)
+                log.append((node, "Loop counter %s only used for "
+                    "indexing, declared as uword instead of %s" %
+                    (declare.name, old)))
+                changed = True
+
+        program.prop["refined"] = log
+
+    return changed
@@ -526,6 +526,14 @@ def Get_logspace(node):
 def Get_find(node):
     node.type = "uvec"
 
+Get_cell = "cell"
+
 Get_tic = "string"
 
 Get_toc = "string"
+
+Get_fopen = "int"
+
+Get_fclose = "int"
+
+Get_fflush = "int"
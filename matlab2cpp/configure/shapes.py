@@ -0,0 +1,263 @@
+"""
+Constant shapes of small vectors and matrices.
+
+With the `fixed_size` option of :py:class:`~matlab2cpp.Builder`
+(`m2cpp --fixed-size`), local variables that only ever hold arrays of the same
+small constant size are declared as Armadillo fixed size types, which live on
+the stack instead of the heap::
+
+    R = eye(3);             mat::fixed<3,3> R ;
+    q = [a; b; c; d];       vec::fixed<4> q ;
+
+Shapes are known from literals, `zeros`, `ones`, `eye`, `rand` and `randn`
+with constant arguments, from variables with known shapes, including
+supplement annotations like `mat33`, and from arithmetic on those.  A variable
+is fixed only if every assignment of the whole variable has the same shape.
+Variables assigned by multiple returns or used as loop variables are left
+alone, and so are parameters and multiple return values without annotation,
+since those have to match the caller.  Only annotated shapes are written to the
+supplement file, so inferred shapes follow changes to the code.
+"""
+
+import matlab2cpp as mc
+
+# largest number of elements for fixed size types
+LIMIT = 16
+
+# reserved functions creating arrays from constant sizes
+CONSTRUCTORS = {"zeros", "ones", "eye", "rand", "randn"}
+
+# element-wise operators, where scalars broadcast
+ELEMENTWISE = {"Plus", "Minus", "Elmul", "Elementdivision",
+        "Leftelementdivision", "Elexp"}
+
+
+def shape(node, shapes):
+    """
+Constant shape of an expression.
+
+Args:
+    node (Node): Expression
+    shapes (dict): Shapes of variables by name
+
+Returns:
+    tuple: Shape as `(rows, cols)`, `(1, 1)` for scalars, or None if unknown
+    """
+
+    if node.num and node.dim == 0:
+        return 1, 1
+
+    if node.cls == "Var":
+        return shapes.get(node.name)
+
+    if node.cls in ("Paren", "Neg"):
+        return shape(node[0], shapes)
+
+    if node.cls in ("Transpose", "Ctranspose"):
+        inner = shape(node[0], shapes)
+        return inner and (inner[1], inner[0])
+
+    if node.cls in ELEMENTWISE:
+        out = (1, 1)
+        for child in node:
+            child = shape(child, shapes)
+            if child is None:
+                return None
+            if child != (1, 1):
+                if out != (1, 1) and out != child:
+                    return None
+                out = child
+        return out
+
+    if node.cls == "Mul":
+        out = shape(node[0], shapes)
+        for child in node[1:]:
+            child = shape(child, shapes)
+            if out is None or child is None:
+                return None
+            if child == (1, 1):
+                continue
+            if out == (1, 1):
+                out = child
+            elif out[1] == child[0]:
+                out = out[0], child[1]
+            else:
+                return None
+        return out
+
+    if node.cls == "Matrixdivision" and shape(node[1], shapes) == (1, 1):
+        return shape(node[0], shapes)
+
+    if node.cls == "Matrix":
+        return concatenate(node, shapes)
+
+    if node.cls == "Get" and node.backend == "reserved" and \
+            node.name in CONSTRUCTORS:
+        if not node or not all([child.cls == "Int" for child in node]):
+            return None
+        sizes = [int(child.value) for child in node]
+        if len(sizes) == 1:
+            return sizes[0], sizes[0]
+        if len(sizes) == 2:
+            return sizes[0], sizes[1]
+
+    return None
+
+
+def concatenate(node, shapes):
+    """Shape of a matrix literal, rows stacked from concatenated elements."""
+
+    rows, cols = 0, None
+    for vector in node:
+
+        height, width = None, 0
+        for element in vector:
+            element = shape(element, shapes)
+            if element is None or height not in (None, element[0]):
+                return None
+            height = element[0]
+            width += element[1]
+
+        # empty row
+        if height is None:
+            continue
+
+        if cols not in (None, width):
+            return None
+        rows += height
+        cols = width
+
+    if not rows:
+        return None
+    return rows, cols
+
+
+def assignments(func):
+    """
+Values assigned to the whole of each variable in a function.
+
+Returns:
+    tuple: dictionary of assigned values by name, and set of names assigned
+    in other ways
+    """
+
+    values = {}
+    other = set()
+
+    for node in func[3].flatten(False, False, False):
+
+        if node.cls == "Assign" and node[0].cls == "Var":
+            values.setdefault(node[0].name, []).append(node[-1])
+
+        elif node.cls == "Assigns":
+            other.update([child.name for child in node[:-1]
+                if child.cls == "Var"])
+
+        elif node.cls in ("For", "Parfor") and node[0].cls == "Var":
+            other.add(node[0].name)
+
+    return values, other
+
+
+def infer(func):
+    """
+Set shapes of variables in a function with constant size.
+
+Shapes are guessed from the first assignment with a known shape, which lets
+variables be updated from themselves like `R = R*Rz`.  Guesses not
+confirmed by all assignments are removed until the rest are consistent.
+
+Args:
+    func (Func): Function definition
+
+Returns:
+    list: Names of the variables given a shape
+    """
+
+    declares, returns, params = func[0], func[1], func[2]
+
+    known = {}
+    for var in declares[:] + params[:]:
+        if var.num and var.shape:
+            known[var.name] = var.shape
+
+    candidates = set([var.name for var in declares
+        if var.num and var.dim in (1, 2, 3) and not var.shape])
+    candidates.difference_update(params.names)
+    if len(returns) > 1:
+        candidates.difference_update(returns.names)
+
+    values, other = assignments(func)
+    candidates.difference_update(other)
+    candidates.intersection_update(values)
+
+    guesses = {}
+    changed = True
+    while changed:
+        changed = False
+        for name in candidates.difference(guesses):
+            shapes = dict(known, **guesses)
+            for value in values[name]:
+                guess = shape(value, shapes)
+                var = declares[declares.names.index(name)]
+                if guess and guess[0]*guess[1] <= LIMIT and \
+                        mc.datatype.fits_shape(var.type, guess):
+                    guesses[name] = guess
+                    changed = True
+                    break
+
+    while True:
+        shapes = dict(known, **guesses)
+        wrong = [name for name in guesses
+            if any([shape(value, shapes) != guesses[name]
+                for value in values[name]])]
+        if not wrong:
+            break
+        for name in wrong:
+            del guesses[name]
+
+    # inferred shapes are not written to the supplement file
+    for name in guesses:
+        var = declares[declares.names.index(name)]
+        var.shape = guesses[name]
+        var.prop["inferred"] = True
+
+    return sorted(guesses)
+
+
+def configure(project):
+    """
+Set shapes in all functions of a configured project.
+
+Example:
+    >>> builder = mc.Builder(fixed_size=True)
+    >>> builder.load("f.m", "function y=f(a)\\nR = eye(3);\\nx = [a; 2.; 3.];\\n"
+    ...     "for i=1:4\\n  R = R*R;\\nend\\ny = R*x + 1;\\nA = zeros(5,5);")
+    >>> builder[0].ftypes = {"f": {"a": "double"}}
+    >>> print mc.qscript(builder)
+    mat::fixed<3,1> f(double a)
+    {
+      mat A ;
+      mat::fixed<3,1> y ;
+      mat::fixed<3,3> R ;
+      uword i ;
+      vec::fixed<3> x ;
+      R = arma::eye<mat>(3, 3) ;
+      double _x [] = {a, 2., 3.} ;
+      x = vec(_x, 3, false) ;
+      for (i=1; i<=4; i++)
+      {
+        R = R*R ;
+      }
+      y = R*x+1 ;
+      A = arma::zeros<mat>(5, 5) ;
+      return y ;
+    }
+    >>> print builder[0].ftypes["f"]["R"], builder[0].ftypes["f"]["x"]
+    mat vec
+    """
+
+    for program in project:
+        for func in program[1]:
+            if func.cls in ("Func", "Main"):
+                infer(func)
@@ -12,10 +12,14 @@ The follwing constructor classes exists here:
 +------------------------------------------+---------------------------------------+
 | :py:class:`~matlab2cpp.datatype.Num`     | Numerical value indicator             |
 +------------------------------------------+---------------------------------------+
+| :py:class:`~matlab2cpp.datatype.Shape`   | Constant size of vectors and matrices |
++------------------------------------------+---------------------------------------+
 | :py:class:`~matlab2cpp.datatype.Suggest` | Frontend for suggested datatype       |
 +------------------------------------------+---------------------------------------+
 """
 
+import re
+
 import supplement
 import matlab2cpp as mc
 
@@ -177,6 +181,104 @@ def get_name(dim, mem):
     return dims[dim].intersection(mems[mem]).pop()
 
 
+# fixed size annotations, like mat33, cx_vec4 or mat12x12
+fixed_pattern = re.compile(r"^((?:cx_|[uif])?(?:mat|vec|rowvec))(\d+)(?:x(\d+))?$")
+
+
+def split_shape(name):
+    """
+Split a fixed size annotation into datatype and shape.
+
+Args:
+    name (str): Datatype, possibly with a size postfix
+
+Returns:
+    tuple: Datatype name and shape as `(rows, cols)`, or None if not fixed
+
+Example:
+    >>> print split_shape("mat33"), split_shape("cx_vec4"), split_shape("rowvec2")
+    ('mat', (3, 3)) ('cx_vec', (4, 1)) ('rowvec', (1, 2))
+    >>> print split_shape("mat12x3"), split_shape("mat")
+    ('mat', (12, 3)) ('mat', None)
+    """
+
+    match = fixed_pattern.match(name)
+    if not match:
+        return name, None
+
+    type, size, cols = match.groups()
+    if type[-3:] == "mat":
+        if cols:
+            shape = int(size), int(cols)
+        elif len(size) == 2:
+            shape = int(size[0]), int(size[1])
+        else:
+            return name, None
+    elif cols:
+        return name, None
+    elif type[-6:] == "rowvec":
+        shape = 1, int(size)
+    else:
+        shape = int(size), 1
+
+    if 0 in shape:
+        return name, None
+    return type, shape
+
+
+def fits_shape(type, shape):
+    """Check if a shape is valid for a vector or matrix datatype."""
+
+    if not shape or type in others or type[-1] == "*":
+        return False
+    dim = get_dim(type)
+    return dim == 3 or dim == 1 and shape[1] == 1 or dim == 2 and shape[0] == 1
+
+
+def shape_name(type, shape):
+    """
+Fixed size annotation, the inverse of :py:func:`split_shape`.
+
+Example:
+    >>> print shape_name("mat", (3, 3)), shape_name("vec", (4, 1)), shape_name("mat", (3, 10))
+    mat33 vec4 mat3x10
+    """
+
+    if not fits_shape(type, shape):
+        return type
+
+    rows, cols = shape
+    if get_dim(type) == 1:
+        return type + str(rows)
+    if get_dim(type) == 2:
+        return type + str(cols)
+    if rows < 10 and cols < 10:
+        return "%s%d%d" % (type, rows, cols)
+    return "%s%dx%d" % (type, rows, cols)
+
+
+def fixed_type(type, shape):
+    """
+Armadillo fixed size type, that lives on the stack without heap allocation.
+
+Example:
+    >>> print fixed_type("mat", (3, 3)), fixed_type("cx_vec", (4, 1))
+    mat::fixed<3,3> cx_vec::fixed<4>
+    >>> print fixed_type("mat", None)
+    mat
+    """
+
+    if not fits_shape(type, shape):
+        return type
+
+    rows, cols = shape
+    if get_dim(type) == 1:
+        return "%s::fixed<%d>" % (type, rows)
+    if get_dim(type) == 2:
+        return "%s::fixed<%d>" % (type, cols)
+    return "%s::fixed<%d,%d>" % (type, rows, cols)
+
+
 def get_type(instance):
 
     if instance.prop["type"] == "TYPE":
@@ -285,6 +387,34 @@ a boolean values which is true given that the datatype is of numerical type.
             raise AttributeError("num can not be set True consistently")
 
 
+class Shape(object):
+    """
+The `node.shape` is the constant size of a vector or matrix as `(rows,
+cols)`, or None if the size is not known.  It is stored with the declared
+variable and makes it a fixed size Armadillo type (see
+:py:func:`~matlab2cpp.rules.function.type_string`).  The shape is set from
+datatypes with a size postfix, like `mat33`:
+
+    >>> node = mc.Var(None, "name")
+    >>> node.type = "vec4"
+    >>> print node.type, node.shape
+    vec (4, 1)
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        shape = instance.prop.get("shape")
+        if shape is None and instance.parent is not None:
+            shape = instance.declare.prop.get("shape")
+        return shape
+
+    def __set__(self, instance, value):
+        if instance.parent is not None:
+            instance = instance.declare
+        instance.prop["shape"] = value
+
+
 class Type(object):
     """
 Datatypes can be roughly split into two groups: **numerical** and
@@ -338,6 +468,9 @@ inserted as placeholder through `%(type)s`.
         if isinstance(value, str):
             p, value = pointer_split(value)
             instance.pointer = p
+            value, shape = split_shape(value)
+            if shape:
+                instance.prop["shape"] = shape
         else:
             value = common_strict(value)
         instance.prop["type"] = value
@@ -2,6 +2,25 @@ code = r"""#ifndef MCONVERT_H
 #define MCONVERT_H
 
 #include <armadillo>
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <limits>
+#include <new>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#if defined(__unix__) || defined(__APPLE__)
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <unistd.h>
+#define M2CPP_MMAP
+#endif
+
 using namespace arma;
 
 namespace m2cpp {
@@ -21,6 +40,24 @@ namespace m2cpp {
         return arma::Mat<eT>(&a, 1, 1, true);
     }
 
+    // complex scalars compare as in Matlab: by magnitude, then by angle
+    template<typename cxT>
+    inline bool cx_less(const cxT& a, const cxT& b) {
+        if (std::abs(a) != std::abs(b))
+            return std::abs(a) < std::abs(b);
+        return std::arg(a) < std::arg(b);
+    }
+
+    template<typename cxT>
+    inline cxT cx_min(const cxT a, const cxT b) {
+        return cx_less(b, a) ? b : a;
+    }
+
+    template<typename cxT>
+    inline cxT cx_max(const cxT a, const cxT b) {
+        return cx_less(a, b) ? b : a;
+    }
+
 
     inline arma::uvec span(int a, int b) {
         arma::uvec s;
@@ -242,7 +279,7 @@ namespace m2cpp {
     }
 
     template <typename eT, typename fT>
-    inline typename arma::enable_if2 < arma::is_complex<typename eT::elem_type>::value || arma::is_complex<typename fT::elem_type>::value,
+    inline typename arma::enable_if2 < arma::is_cx<typename eT::elem_type>::value || arma::is_cx<typename fT::elem_type>::value,
                                        arma::Mat<typename std::complex< typename arma::get_pod_type<eT>::result > > >::result
         conv2(const arma::Mat<typename eT::elem_type>& A, const arma::Mat<typename fT::elem_type>& B) {
         uword n = A.n_rows + B.n_rows - 1;
@@ -260,7 +297,7 @@ namespace m2cpp {
     template<typename T>
     inline void intersect(arma::Col<typename T::elem_type>& C, arma::uvec& ia, arma::uvec& ib, const T& a, const T& b) {
 
-       typedef typename eT T::elem_type;
+       typedef typename T::elem_type eT;
 
        arma::uvec sa = arma::sort_index(a);
        arma::uvec sb = arma::sort_index(b);
@@ -419,8 +456,539 @@ namespace m2cpp {
            unique_rows(a, tmp);
         }
         else {
-           fprintf(stderr, "m2pp::unique(): Unrecognized option %s\n", m);
+           std::fprintf(stderr, "m2pp::unique(): Unrecognized option %s\n", m);
+        }
+    }
+
+    // x(mask) = value, in place without creating an index vector
+    template<typename T, typename T1, typename eT>
+    inline void mask_fill(T& x, const arma::Base<arma::uword, T1>& mask, const eT value) {
+        const arma::Proxy<T1> P(mask.get_ref());
+        if (P.get_n_elem() != x.n_elem) {
+            std::fprintf(stderr, "m2cpp::mask_fill(): Mask and array differ in size\n");
+            return;
+        }
+        typename T::elem_type* mem = x.memptr();
+        for (arma::uword i = 0; i < x.n_elem; i++) {
+            if (P[i])
+                mem[i] = value;
+        }
+    }
+
+    // a{k} = value for a cell that may grow, with one-based k
+    template<typename T>
+    inline T& element(std::vector<T>& c, arma::uword k) {
+        if (k > c.size())
+            c.resize(k);
+        return c[k-1];
+    }
+
+    // Stepped ranges a(first:step:last) of a vector, of a matrix in linear
+    // order, or of a row or column of a matrix.  strided<T>() copies the
+    // selected elements straight into the result and strided_view() writes
+    // them in place, without creating an index vector.  Indices are zero-based
+    // and signed, so an empty range like 0:2:-1 selects nothing.
+
+    inline arma::uword strided_n_(arma::sword first, arma::sword step, arma::sword last) {
+        return last < first ? 0 : arma::uword((last - first)/step + 1);
+    }
+
+    template<typename T, typename T1>
+    inline T strided(const T1& x, arma::sword first, arma::sword step, arma::sword last) {
+        const arma::uword n = strided_n_(first, step, last);
+        T out(n);
+        for (arma::uword i = 0; i < n; i++)
+            out[i] = x(arma::uword(first + arma::sword(i)*step));
+        return out;
+    }
+
+    template<typename eT>
+    class strided_view_ {
+    public:
+        // elements (first + i*step)*stride of mem, for i < n_elem
+        strided_view_(eT* mem, arma::uword size, arma::uword stride,
+                arma::sword first, arma::sword step, arma::sword last)
+            : mem(mem), inc(step*stride), n_elem(strided_n_(first, step, last)) {
+            if (n_elem && (first < 0 ||
+                    arma::uword(first + arma::sword(n_elem-1)*step) >= size))
+                throw std::out_of_range("m2cpp::strided_view(): index out of bounds");
+            if (n_elem)
+                this->mem += first*stride;
+        }
+
+        void fill(const eT value) {
+            for (arma::uword i = 0; i < n_elem; i++)
+                mem[i*inc] = value;
+        }
+
+        template<typename T1>
+        void operator=(const arma::Base<eT, T1>& expr) {
+            // evaluated first, as the expression may read the viewed elements
+            const arma::Mat<eT> values(expr.get_ref());
+            if (values.n_elem != n_elem)
+                throw std::logic_error("m2cpp::strided_view(): size mismatch");
+            for (arma::uword i = 0; i < n_elem; i++)
+                mem[i*inc] = values[i];
+        }
+
+    private:
+        eT* mem;
+        arma::uword inc, n_elem;
+    };
+
+    template<typename eT>
+    inline strided_view_<eT> strided_view(arma::Mat<eT>& x,
+            arma::sword first, arma::sword step, arma::sword last) {
+        return strided_view_<eT>(x.memptr(), x.n_elem, 1, first, step, last);
+    }
+
+    template<typename eT>
+    inline strided_view_<eT> strided_view(arma::subview_col<eT> x,
+            arma::sword first, arma::sword step, arma::sword last) {
+        return strided_view_<eT>(x.colptr(0), x.n_elem, 1, first, step, last);
+    }
+
+    template<typename eT>
+    inline strided_view_<eT> strided_view(arma::subview_row<eT> x,
+            arma::sword first, arma::sword step, arma::sword last) {
+        return strided_view_<eT>(x.colptr(0), x.n_elem, x.m.n_rows, first, step, last);
+    }
+
+    // Binary data I/O.  Files are in Armadillo's arma_binary format: a text
+    // header "ARMA_MAT_BIN_<type>\n<n_rows> <n_cols>\n" followed by the
+    // elements in column major order.
+
+    // header type id of the element type, e.g. FN008 for double
+    template<typename eT>
+    inline std::string bin_header_() {
+        char header[32];
+        std::snprintf(header, sizeof(header), "ARMA_MAT_BIN_%s%03d",
+                arma::is_cx<eT>::value ? "FC" :
+                !std::numeric_limits<eT>::is_integer ? "FN" :
+                std::numeric_limits<eT>::is_signed ? "IS" : "IU", int(sizeof(eT)));
+        return header;
+    }
+
+    template<typename eT>
+    inline bool read_bin_header(std::istream& f, const arma::Mat<eT>& x,
+            arma::uword& n_rows, arma::uword& n_cols) {
+        std::string header;
+        f >> header >> n_rows >> n_cols;
+        f.get();
+        return f.good() && header == bin_header_<eT>();
+    }
+
+    // Save in arma_binary format with the header padded by spaces before the
+    // size to a multiple of 16 bytes, so the elements are aligned in the file
+    // and it can be memory mapped by load_mapped.  Armadillo skips the padding
+    // when reading, so the file can be loaded by all binary backends.
+    template<typename T>
+    inline bool save_aligned(const T& x, const std::string& filename) {
+        typedef typename T::elem_type eT;
+        char size[64];
+        std::snprintf(size, sizeof(size), "%llu %llu\n",
+                (unsigned long long) x.n_rows, (unsigned long long) x.n_cols);
+        std::string header = bin_header_<eT>() + '\n';
+        std::size_t length = header.size() + std::strlen(size);
+        header += std::string((16 - length % 16) % 16, ' ') + size;
+
+        std::ofstream f(filename.c_str(), std::ios::binary);
+        f.write(header.data(), header.size());
+        f.write(reinterpret_cast<const char*>(x.memptr()), sizeof(eT)*x.n_elem);
+        return f.good();
+    }
+
+    // (re)construct object over external memory
+    template<typename eT>
+    inline void construct_(arma::Mat<eT>& x, eT* mem, arma::uword n_rows, arma::uword n_cols) {
+        x.~Mat<eT>();
+        new (&x) arma::Mat<eT>(mem, n_rows, n_cols, false, false);
+    }
+
+    template<typename eT>
+    inline void construct_(arma::Col<eT>& x, eT* mem, arma::uword n_rows, arma::uword n_cols) {
+        x.~Col<eT>();
+        new (&x) arma::Col<eT>(mem, n_rows*n_cols, false, false);
+    }
+
+    template<typename eT>
+    inline void construct_(arma::Row<eT>& x, eT* mem, arma::uword n_rows, arma::uword n_cols) {
+        x.~Row<eT>();
+        new (&x) arma::Row<eT>(mem, n_rows*n_cols, false, false);
+    }
+
+    // Read arma_binary file straight into the matrix memory, without
+    // temporary copies.  Other formats are left to Armadillo.
+    template<typename T>
+    inline bool load_direct(T& x, const std::string& filename) {
+        typedef typename T::elem_type eT;
+        std::ifstream f(filename.c_str(), std::ios::binary);
+        arma::uword n_rows, n_cols;
+        if (!f.is_open() || !read_bin_header(f, x, n_rows, n_cols))
+            return x.load(filename);
+
+        x.set_size(n_rows, n_cols);
+        f.read(reinterpret_cast<char*>(x.memptr()), sizeof(eT)*x.n_elem);
+        if (!f) {
+            x.reset();
+            return false;
+        }
+        return true;
+    }
+
+    // Memory mapping of a file.  The translation declares one next to each
+    // matrix loaded with load_mapped, so the mapping is released when the
+    // matrix goes out of scope.
+    class mapping {
+        void* addr_;
+        std::size_t size_;
+        mapping(const mapping&);
+        mapping& operator=(const mapping&);
+      public:
+        mapping() : addr_(NULL), size_(0) {}
+        ~mapping() { reset(); }
+
+        // release the current mapping and take over a new one
+        void reset(void* addr = NULL, std::size_t size = 0) {
+#ifdef M2CPP_MMAP
+            if (addr_ != NULL)
+                munmap(addr_, size_);
+#endif
+            addr_ = addr;
+            size_ = size;
+        }
+
+        bool mapped() const { return addr_ != NULL; }
+    };
+
+    // Memory map arma_binary file and let the matrix use the mapped memory
+    // without copying (copy_aux_mem=false).  The mapping is private, so
+    // writing to the matrix never changes the file.  `m` keeps the mapping
+    // and must live as long as the matrix.  Only files with an aligned header,
+    // as written by save_aligned, can be mapped.  Others, like the files
+    // written by Armadillo's save, are read with load_direct instead, as are
+    // all files where mapping is unavailable.
+    template<typename T>
+    inline bool load_mapped(T& x, const std::string& filename, mapping& m) {
+        // detach from the previous mapping before it is released
+        x.reset();
+        m.reset();
+#ifdef M2CPP_MMAP
+        typedef typename T::elem_type eT;
+
+        std::ifstream f(filename.c_str(), std::ios::binary);
+        arma::uword n_rows, n_cols;
+        if (!f.is_open() || !read_bin_header(f, x, n_rows, n_cols))
+            return x.load(filename);
+        std::size_t offset = f.tellg();
+        std::size_t size = offset + sizeof(eT)*n_rows*n_cols;
+        f.seekg(0, std::ios::end);
+        std::size_t length = f.tellg();
+        f.close();
+
+        // a truncated file is reported by load_direct
+        if (offset % sizeof(eT) || n_rows*n_cols == 0 || length < size)
+            return load_direct(x, filename);
+
+        int fd = open(filename.c_str(), O_RDONLY);
+        if (fd < 0)
+            return false;
+        void* addr = mmap(NULL, size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+        close(fd);
+        if (addr == MAP_FAILED)
+            return load_direct(x, filename);
+
+        m.reset(addr, size);
+        construct_(x, reinterpret_cast<eT*>(static_cast<char*>(addr) + offset),
+                n_rows, n_cols);
+        return true;
+#else
+        return load_direct(x, filename);
+#endif
+    }
+
+    // File handles.  Identifiers follow Matlab: 1 is stdout, 2 is stderr and
+    // fopen returns -1 on failure.  Files are fully buffered, so output is
+    // only written when the buffer is full, on fflush or on fclose.
+
+    static const std::size_t io_buffer_ = std::size_t(1) << 16;
+
+    inline std::vector<FILE*>& files_() {
+        static std::vector<FILE*> files;
+        if (files.empty()) {
+            files.push_back(stdin);
+            files.push_back(stdout);
+            files.push_back(stderr);
+        }
+        return files;
+    }
+
+    inline FILE* file_(int fid) {
+        std::vector<FILE*>& files = files_();
+        if (fid < 0 || fid >= int(files.size()))
+            return NULL;
+        return files[fid];
+    }
+
+    inline int fopen(const std::string& filename, const std::string& mode = "r") {
+        std::string m = mode;
+        if (m.find('b') == std::string::npos && m.find('t') == std::string::npos)
+            m += 'b';
+        FILE* f = std::fopen(filename.c_str(), m.c_str());
+        if (f == NULL)
+            return -1;
+        std::setvbuf(f, NULL, _IOFBF, io_buffer_);
+
+        std::vector<FILE*>& files = files_();
+        for (std::size_t fid = 3; fid < files.size(); fid++) {
+            if (files[fid] == NULL) {
+                files[fid] = f;
+                return fid;
+            }
+        }
+        files.push_back(f);
+        return files.size() - 1;
+    }
+
+    inline int fclose(int fid) {
+        FILE* f = file_(fid);
+        if (f == NULL || fid < 3)
+            return -1;
+        files_()[fid] = NULL;
+        return std::fclose(f) == 0 ? 0 : -1;
+    }
+
+    inline int fclose(const std::string& all) {
+        if (all != "all")
+            return -1;
+        int status = 0;
+        std::vector<FILE*>& files = files_();
+        for (std::size_t fid = 3; fid < files.size(); fid++)
+            if (files[fid] != NULL && fclose(fid) != 0)
+                status = -1;
+        return status;
+    }
+
+    inline int fflush(int fid) {
+        FILE* f = file_(fid);
+        return f == NULL ? -1 : std::fflush(f);
+    }
+
+    // Formatted output with Matlab semantics: all arguments are flattened in
+    // column major order and the format is recycled until every value is
+    // used.  The text is formatted into one string and written with a single
+    // call, instead of one printf per element.
+
+    struct fmt_arg_ {
+        bool text;
+        double num;
+        std::string str;
+        fmt_arg_(double num) : text(false), num(num) {}
+        fmt_arg_(const std::string& str) : text(true), num(0), str(str) {}
+    };
+
+    inline void fmt_push_(std::vector<fmt_arg_>& args, double x) {
+        args.push_back(fmt_arg_(x));
+    }
+
+    inline void fmt_push_(std::vector<fmt_arg_>& args, const char* x) {
+        args.push_back(fmt_arg_(std::string(x)));
+    }
+
+    inline void fmt_push_(std::vector<fmt_arg_>& args, const std::string& x) {
+        args.push_back(fmt_arg_(x));
+    }
+
+    template<typename eT, typename T1>
+    inline void fmt_push_(std::vector<fmt_arg_>& args, const arma::Base<eT, T1>& x) {
+        const arma::Mat<eT> X(x.get_ref());
+        args.reserve(args.size() + X.n_elem);
+        for (arma::uword i = 0; i < X.n_elem; i++)
+            args.push_back(fmt_arg_(double(X[i])));
+    }
+
+    inline void fmt_args_(std::vector<fmt_arg_>& args) {}
+
+    template<typename T, typename... Ts>
+    inline void fmt_args_(std::vector<fmt_arg_>& args, const T& x, const Ts&... xs) {
+        fmt_push_(args, x);
+        fmt_args_(args, xs...);
+    }
+
+    template<typename V>
+    inline void fmt_append_(std::string& out, const std::string& spec, V value) {
+        char buf[128];
+        int n = std::snprintf(buf, sizeof(buf), spec.c_str(), value);
+        if (n < 0)
+            return;
+        if (n < int(sizeof(buf))) {
+            out.append(buf, n);
+            return;
+        }
+        std::size_t size = out.size();
+        out.resize(size + n + 1);
+        std::snprintf(&out[size], n + 1, spec.c_str(), value);
+        out.resize(size + n);
+    }
+
+    // append one conversion, `spec` is the specification without the type
+    inline void fmt_one_(std::string& out, const std::string& spec, char conv, const fmt_arg_& arg) {
+        bool integer = conv == 'd' || conv == 'i' || conv == 'u' ||
+                       conv == 'x' || conv == 'X' || conv == 'o' || conv == 'c';
+        if (arg.text) {
+            // text given to a numeric conversion is written as is
+            if (conv == 's' || conv == 'c')
+                fmt_append_(out, spec + 's', arg.str.c_str());
+            else
+                out += arg.str;
+        }
+        // non-integer values in integer conversions are written as %e
+        else if (integer && arg.num != double((long long) arg.num))
+            fmt_append_(out, spec + 'e', arg.num);
+        else if (conv == 'c')
+            fmt_append_(out, spec + 'c', int(arg.num));
+        else if (conv == 'd' || conv == 'i')
+            fmt_append_(out, spec + "lld", (long long) arg.num);
+        else if (integer)
+            fmt_append_(out, spec + "ll" + conv, (unsigned long long) arg.num);
+        else if (conv == 's')
+            fmt_append_(out, spec + 'g', arg.num);
+        else
+            fmt_append_(out, spec + conv, arg.num);
+    }
+
+    inline std::string sprintf(const std::string& format, const std::vector<fmt_arg_>& args) {
+
+        std::string out;
+        std::size_t next = 0;
+
+        do {
+            bool used = false;
+            std::size_t pos = 0;
+            while (pos < format.size()) {
+
+                std::size_t start = format.find('%', pos);
+                if (start == std::string::npos) {
+                    out.append(format, pos, std::string::npos);
+                    break;
+                }
+                out.append(format, pos, start - pos);
+
+                // literal percent
+                if (start + 1 < format.size() && format[start+1] == '%') {
+                    out += '%';
+                    pos = start + 2;
+                    continue;
+                }
+
+                std::size_t end = format.find_first_of("diuoxXfFeEgGcs", start + 1);
+                if (end == std::string::npos) {
+                    out.append(format, start, std::string::npos);
+                    break;
+                }
+
+                // out of values: stop at the first conversion without data
+                if (next == args.size() && !args.empty())
+                    return out;
+
+                if (next < args.size()) {
+                    fmt_one_(out, format.substr(start, end - start), format[end], args[next++]);
+                    used = true;
+                }
+                pos = end + 1;
+            }
+            if (!used)
+                break;
+        } while (next < args.size());
+
+        return out;
+    }
+
+    template<typename... Ts>
+    inline std::string sprintf(const std::string& format, const Ts&... xs) {
+        std::vector<fmt_arg_> args;
+        fmt_args_(args, xs...);
+        return sprintf(format, args);
+    }
+
+    template<typename... Ts>
+    inline int fprintf(int fid, const std::string& format, const Ts&... xs) {
+        FILE* f = file_(fid);
+        if (f == NULL)
+            return -1;
+        std::string out = sprintf(format, xs...);
+        return std::fwrite(out.data(), 1, out.size(), f);
+    }
+
+    // Instrumentation (m2cpp --instrument).  Every timed function or loop has
+    // a static `timing` with its Matlab file and line.  A `scope_timer` counts
+    // a call on construction and adds the elapsed time on destruction.  Time
+    // is inclusive and recursive calls are only timed at the outermost level.
+    // The report is written when the program exits.
+
+    struct timing;
+
+    inline void write_timings_();
+
+    inline std::vector<timing*>& timings_() {
+        // never destroyed, the report is written after static destruction
+        static std::vector<timing*>* timings = NULL;
+        if (timings == NULL) {
+            timings = new std::vector<timing*>();
+            std::atexit(write_timings_);
+        }
+        return *timings;
+    }
+
+    struct timing {
+        const char* file;
+        int line;
+        const char* name;
+        unsigned long long calls;
+        int depth;
+        double seconds;
+
+        timing(const char* file, int line, const char* name)
+            : file(file), line(line), name(name), calls(0), depth(0), seconds(0) {
+            timings_().push_back(this);
+        }
+    };
+
+    class scope_timer {
+        timing& timing_;
+        std::chrono::steady_clock::time_point start_;
+      public:
+        explicit scope_timer(timing& t) : timing_(t) {
+            timing_.calls++;
+            if (timing_.depth++ == 0)
+                start_ = std::chrono::steady_clock::now();
+        }
+        ~scope_timer() {
+            if (--timing_.depth == 0)
+                timing_.seconds += std::chrono::duration<double>(
+                        std::chrono::steady_clock::now() - start_).count();
+        }
+    };
+
+    inline bool timing_order_(const timing* a, const timing* b) {
+        return a->seconds > b->seconds;
+    }
+
+    inline void write_timings_() {
+        std::vector<timing*> timings = timings_();
+        std::sort(timings.begin(), timings.end(), timing_order_);
+
+        const char* filename = std::getenv("M2CPP_PROFILE");
+        FILE* f = std::fopen(filename ? filename : "m2cpp_profile.txt", "w");
+        if (f == NULL)
+            return;
+        std::fprintf(f, "# file\tline\tname\tcalls\tseconds\tseconds/call\n");
+        for (std::size_t i = 0; i < timings.size(); i++) {
+            const timing& t = *timings[i];
+            std::fprintf(f, "%s\t%d\t%s\t%llu\t%.6f\t%.3e\n", t.file, t.line,
+                    t.name, t.calls, t.seconds, t.calls ? t.seconds/t.calls : 0.);
         }
+        std::fclose(f);
     }
 
     static arma::wall_clock timer_;
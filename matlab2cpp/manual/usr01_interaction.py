@@ -49,6 +49,124 @@ In Matlab the script and function files have to be in the same folder for the fu
 
 The flag option `-p paths_file` can be set to parse such a file. Then Matlab as well as m2cpp can find function scripts that are located in other directories.
     
+Supplement files, --supplement
+------------------------------
+
+Besides the `<filename>.py` supplement file, datatypes can be given in
+a declarative `<filename>.json` file with the same keys (`functions`,
+`structs`, `includes` and `verbatims`).  The JSON file is parsed without
+executing any code and takes precedence over the `.py` file if both exist.
+For larger projects all supplements can be collected in a single file, where
+each key is the basename of a Matlab file::
+
+    {
+      "main.m" : {"functions" : {"main" : {"a" : "int"}}},
+      "f.m"    : {"functions" : {"f" : {"x" : "vec"}}}
+    }
+
+The flag `--supplement project.json` reads the file once and applies the
+content to every loaded file.  Per-file supplements override its entries.
+
+The section `io` selects how each file used in `load` and `save` is read and
+written, see :py:mod:`~matlab2cpp.supplement.dataio`.  For large data sets
+`"binary"` skips Armadillo's format detection, `"mmap"` maps the file into
+memory without copying it and `"direct"` reads it straight into the matrix.
+Only files with an aligned header can be mapped, as written by `save` with the
+`"mmap"` backend; other files are read as with `"direct"`::
+
+    {
+      "functions" : {"main" : {"data" : "mat"}},
+      "io" : {"data.bin" : "mmap", "result.bin" : "binary"}
+    }
+
+Translation server, --serve
+---------------------------
+
+Build systems that call `m2cpp` once per file pay for starting the interpreter
+and importing the library every time.  With `m2cpp --serve` a single process
+reads translation requests as JSON lines from standard input and answers with
+the content of the `.cpp`, `.hpp`, `.py` and `.log` files as JSON lines on
+standard output, together with the time spent on the request.  See
+:py:mod:`~matlab2cpp.server` for the protocol.
+
+From Python, :py:func:`~matlab2cpp.translate_sources` does the same without a
+separate process and without touching the file system: it takes the Matlab
+code, and the supplement files, as strings by file name, and returns the
+generated files as strings, including `mconvert.h` and `SPlot.h` when used::
+
+    files = matlab2cpp.translate_sources({"f.m": code}, suggest=True)
+    cpp = files["f.m.cpp"]
+
+Dead function pruning, --prune
+------------------------------
+
+Large code bases often contain helper functions, and whole files, that the
+program being translated never calls.  With `--prune` a call graph is built
+over every loaded file (see :py:mod:`~matlab2cpp.callgraph`) before the
+datatypes are configured, and only the functions reachable from the main file
+are configured, translated and written.  The removed functions are listed in
+the `.log` file of the file they were removed from, and removed files in the
+log of the main file.
+
+Instrumentation, --instrument
+-----------------------------
+
+To find hot spots in the translated program without an external profiler, use
+`--instrument`.  Every translated function gets a scoped timer counting calls
+and time spent, and with `--instrument loops` the top-level loops of each
+function are timed as well.  The timers are part of `mconvert.h`.  When the
+program exits, a report is written to `m2cpp_profile.txt`, or the file named in
+the environment variable `M2CPP_PROFILE`, with one line per function or loop
+sorted by time::
+
+    # file  line  name   calls   seconds   seconds/call
+    f.m     1     main   1       0.007380  7.380e-03
+    f.m     2     for i  1       0.007377  7.377e-03
+    f.m     3     fib    437820  0.007372  1.684e-08
+
+The file and line refer to the original Matlab code.  Time is inclusive, so a
+function's time contains the time of the functions it calls.
+
+Translator profiling, --profile
+-------------------------------
+
+For performance work on the translator itself, `--profile` writes a JSON report
+to `<file>.profile.json`, or to the file name given after the flag.  The
+report contains the wall time and number of nodes after each phase (``discover``,
+``read``, ``load``, ``configure``, ``preorder``, ``translate``, ``postorder`` and
+``write``), and the rules in :py:mod:`~matlab2cpp.rules` and
+:py:mod:`~matlab2cpp.configure` with the most cumulative time (``rules``) and the
+most calls (``rules_by_calls``).  The datatype rules of builtin functions are
+computed once per signature (see :py:mod:`~matlab2cpp.configure.memo`), and
+``memo`` holds the hits and misses of that cache.  The number of rules listed
+is set with `--profile-top`.  See :py:mod:`~matlab2cpp.profiler`.
+
+Delayed evaluation, --lazy
+--------------------------
+
+Armadillo evaluates expressions lazily, but some translations force a
+temporary to be created, like `arma::as_scalar(arma::sum(x))` for `sum(x)` or
+`arma::as_scalar(a*b)` for an inner product.  With `--lazy` such expressions
+are written as `arma::accu(x)`, `arma::dot(a, b)` and `A.t()*x`, `sum(sum(A))`
+becomes `arma::accu(A)`, `zeros(size(A))` inside an expression is created from
+`arma::size(A)`, and `min` and `max` of scalars are compared without creating
+1x1 matrices.  The benchmark :py:mod:`matlab2cpp.testsuite.lazy_benchmark`
+times kernels translated with and without the flag.
+
+Specialised overloads, --specialise
+-----------------------------------
+
+A function called with arrays of different dimensions, like a `vec` in one
+place and a `mat` in another, gets a single C++ signature with the widest type.
+With `--specialise`, the argument types at all calls in the project are
+collected, and the function is translated once more for each combination, as
+overloads of the same name, so every call runs code configured for its own
+arguments.  The number of overloads per function is limited to 4, or the
+number given after the flag.  The overloads are listed in the supplement file
+under `"_overloads"` and are translated from there also without the flag, as
+long as the code still allows them.  Calls inside an overload are not
+specialised further.  See :py:mod:`~matlab2cpp.configure.overloads`.
+
 .. _parallel_flags:
 
 Parallel flags, -omp, -tbb
@@ -100,5 +218,15 @@ the generated code with:
 `g++ my_cpp_file.cpp -o runfile -I /usr/include/python2.7/ -lpython2.7 -larmadillo -std=c++11`
 
 Additional flags could be -O3 (optimization) -ltbb (in case of TBB parallelization)
+
+By default every plotting call runs matplotlib before the program continues.
+Setting the environment variable `SPLOT_MODE=queued` when running the program
+instead queues the calls for a separate rendering thread, so the computations
+never wait for the figures. As GUI backends expect to run on the main thread,
+matplotlib uses the non-interactive Agg backend in this mode, so figures are
+saved with `savefig` rather than shown. With `SPLOT_MODE=recorded` the calls are written to the file given by
+`SPLOT_FILE` (default `splot.pickle`) without loading matplotlib, and can be
+rendered afterwards with `matlab2cpp.pyplot.replay("splot.pickle")`. Both modes
+need the flag -pthread.
 """
 import matlab2cpp as mc
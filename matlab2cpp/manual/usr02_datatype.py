@@ -83,6 +83,36 @@ For example::
       // Empty block
     }
 
+Fixed sizes
+-----------
+
+Vectors and matrices are allocated on the heap.  For small arrays of constant
+size, like rotation matrices and quaternions, Armadillo has fixed size types
+that are kept on the stack.  A size postfix on a vector or matrix datatype
+declares the variable with such a type, as `vec4` for a vector with four
+elements, `rowvec3` for a row vector with three, and `mat33` or `mat3x3` for
+a three by three matrix::
+
+    >>> tree = mc.build("function y=f(q); y = 2*q")
+    >>> tree.ftypes = {"f": {"q": "vec4", "y": "vec4"}}
+    >>> print mc.qscript(tree)
+    vec::fixed<4> f(vec::fixed<4> q)
+    {
+      vec::fixed<4> y ;
+      y = 2*q ;
+      return y ;
+    }
+
+With the flag `--fixed-size`, local variables that only hold arrays of one
+small constant size are found automatically, see
+:py:mod:`~matlab2cpp.configure.shapes`.  These shapes are found again in every
+run and are not written to the supplement file.
+
+After configuration, local variables that only ever hold 1x1 values are
+declared as scalars, and loop counters like `i` in ``for i=1:length(x)`` that
+are only used for indexing are declared as `uword`.  Each such change is
+reported in the `.log` file, see :py:mod:`~matlab2cpp.configure.refine`.
+
 .. _func_lambda:
 
 Anonymous functions
@@ -249,6 +279,24 @@ file specifies the number of elements in the integer ``_size``:
       'using namespace arma ;',
     ]
 
+Struct tables are by default stored as an array of structs, which scatters
+the values of a single field across memory.  If every field is a numerical
+scalar, the supplement can instead ask for a structure of arrays through the
+``_layout`` key::
+
+    structs = {
+      "a" : {
+        "_layout" : "soa",
+          "_size" : 100,
+              "b" : "double",
+      },
+    }
+
+Each field then becomes an Armadillo vector of length ``_size``, ``a(k).b``
+is translated to ``a.b(k-1)``, and ``[a.b]`` refers to the field vector
+directly instead of copying it element by element.  Structs with other field
+types keep the default layout and a warning is written to the log.
+
 .. _usr02_suggestion_engine:
 
 Suggestion engine
@@ -2,7 +2,7 @@ import os
 import shutil #copy files from current dir to m2cpp_temp
 #import re
 import matlab2cpp.mwhos
-from matlab2cpp.datatype import get_mem
+import matlab2cpp.typetrace
 
 from itertools import takewhile
 
@@ -111,27 +111,8 @@ def mtypes(builder, args):
         print "matlab did not load correctly, check that you have matlab engine API for python installed"
 
     ##Process .m.txt files to extract data types
-    #I could have this under the previous loop,
-    #but then the loop becomes so long
-    program_number = 0
-
-    for program in builder.project:
-        #reset funcs_types dictionary for each iteration
-        funcs_types = {}
-        file_path = dst_dir + program.name.split(os.path.sep)[-1] + ".txt"
-        #print file_path
-        funcs_types = extract_ftypes(program, funcs_types, file_path)
-    
-        ##Copy data types to program.ftypes
-        funcs = program.ftypes
-
-        for func_key in funcs_types.keys():
-            for var_key in funcs_types[func_key].keys():
-                funcs[func_key][var_key] = funcs_types[func_key][var_key]
-        
-        #set ftypes for the current program
-        builder[program_number].ftypes = funcs
-        program_number += 1
+    traces = matlab2cpp.typetrace.read(dst_dir)
+    matlab2cpp.typetrace.apply(builder.project, traces)
 
     return builder
         
@@ -145,121 +126,21 @@ def extract_ftypes(program, funcs_types, file_path):
 
     #Read file
     f = open(file_path, "r")
-    lines = f.read().splitlines() #change to read, and then splitlines
+    text = f.read()
     f.close()
 
-    #while line
-    j = 0
-    while j < len(lines):
-        line = lines[j]
-
-        #print str(j) + ":" + line
-        #When function is found, loop over variables and
-        cols = line.split(":")
-        #add them to dict funcs_types
-        if cols[0] == "#function_name":
-            #print line
-            #funcs_name = cols[1].split(",")[0]
-
-            f_names = cols[1].split(",")
-
-            #funcs_name = f_names[0].lstrip() if not len(f_names) == 2 else f_names[1].lstrip()
-            funcs_name = f_names[0].lstrip() if program[1][0].cls != "Main" else f_names[1].lstrip()
-            
-            #skip next line
-            j += 2
-
-            #make double indexed dictionary
-            if not funcs_types.get(funcs_name):
-                funcs_types[funcs_name] = {}
-            while j < len(lines) and lines[j] != "":
-                cols = lines[j].split(", ")
-
-                #cols contain: name, size, class, complex, integer
-                #extract variables to be more readable
-                var_name = cols[0]
-                
-                #print lines[j]
-                #extract the type in string format
-                data_type = datatype_string(cols)
-
-                #print var_name + ": " + data_type
-
-                #insert in dictionary
-                #check if entry in dictionary exist
-                data_type_old = funcs_types[funcs_name].get(var_name)
-
-                #complex type should stay complex type
-                if data_type_old:
-                    #get if datatype is comples, then mem_value should be 4
-                    #mem_value_old = get_mem(data_type_old)
-                    mem_value_new = get_mem(data_type)
-                    #print "mem_value_new: "
-                    #print mem_value_new
-                    if mem_value_new == 4:
-                        funcs_types[funcs_name][var_name] = data_type
-                else:
-                    funcs_types[funcs_name][var_name] = data_type
-
-                j += 1
-                
-        j += 1
-    
+    #Datatypes are merged as in the type traces, complex stays complex
+    name = os.path.basename(file_path)[:-4]
+    traces = matlab2cpp.typetrace.parse_whos(text, name)
+    for funcs_name, variables in traces.get(name, {}).items():
+        funcs_types.setdefault(funcs_name, {}).update(variables)
+
     return funcs_types
 
 def datatype_string(cols):
     #Convert data from cols to a string, representing the datatype
-    M, N = [int(s) for s in cols[1].split("x")]
-    var_type = cols[2]
-    complex_number = int(cols[3])
-    integer = int(cols[4])
-
-    data_type = ""
-    if var_type == "double":
-        #non complex
-        if not complex_number:
-            #scalar
-            if M == 1 and N == 1:
-                if integer:
-                    data_type = "int"
-                else:
-                    data_type = "double"
-                    
-            #vec
-            if M > 1 and N == 1:
-                #data_type = "mat"
-                data_type = "vec"
-                    
-            #rowvec
-            if M == 1 and N > 1:
-                #data_type = "mat"
-                data_type = "rowvec"
-                    
-            #matrix
-            if (M > 1 and N > 1) or M == 0 or N == 0: #if empty matrix, set to mat
-                data_type = "mat"
-                    
-        #complex value
-        elif complex_number:
-            #scalar
-            if M == 1 and N == 1:
-                data_type = "cx_double"
-
-            #vec
-            if M > 1 and N == 1:
-                #data_type = "cx_mat"
-                data_type = "cx_vec"
-                
-            #rowvec
-            if M == 1 and N > 1:
-                #data_type = "cx_mat"
-                data_type = "cx_rowvec"
-                
-            #matrix
-            if M > 1 and N > 1 or M == 0 or N == 0: #if empty matrix, set to mat:
-                data_type = "cx_mat"
-                
-    return data_type
+    return matlab2cpp.typetrace.datatype(cols[1], cols[2], int(cols[3]) == 1,
+            int(cols[4]) == 1)
     
 def detect_string(code, k):
 
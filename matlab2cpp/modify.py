@@ -1,7 +1,7 @@
 import matlab2cpp
 import matlab2cpp.node as nmodule
 
-def preorder_transform_AST(node, nargin = False, suggest = False):
+def preorder_transform_AST(node, nargin = False):
     # Modify the abstract syntax tree (AST), also try to overload funtions
     # node is project node
     project = node.project
@@ -10,15 +10,6 @@ def preorder_transform_AST(node, nargin = False, suggest = False):
     # remove the nodes for clear, close and clc so they are not included in the translation
     nodes = remove_close_clear_clc(nodes)
 
-    # Change right hand side variable to uvec if assigned with find, b = find(a==3)
-    if suggest:
-        nodes = modify_find(nodes)
-
-    #a multiplication with a complex double results in complex double
-    #works with fx_decon_demo.m needs more testing and maybe a refactoring
-    if suggest:
-        nodes = complex_mul(nodes)
-
     # remove nargin if args.nargin == False, Thus by default. Use -n flag to keep nargin
     if nargin == False:
         project = remove_nargin(project)
@@ -26,9 +17,7 @@ def preorder_transform_AST(node, nargin = False, suggest = False):
     # add temporary variables for multiple return function
     project = add_parameters(project)
 
-    # change data type from real to complex, if left hand side is real and right hand side is complex in assignment
-    if suggest:
-        change_to_complex(project)
+    # complex promotion and find results are handled by configure.promote
 
     return project
 
@@ -45,76 +34,6 @@ def postorder_transform_AST(node):
     return project
 
 
-# node is project node
-def change_to_complex(project):
-
-    # for each program in project
-    for idx, program in enumerate(project):
-        dictionary = program.ftypes
-        new_complex_types = {}
-        new_complex_dim = {}
-
-        # for each function (in Funcs) in program
-        for func in program[1]:
-            func_name = func.name
-
-            # flatten nodes in the function
-            nodes = func.flatten(False, False, False)
-
-            #look for assignment
-            for n in nodes:
-                if n.cls in "Assign" and len(n) == 2:
-                    lhs, rhs = n
-                    if lhs.mem and lhs.mem != 4 and rhs.mem == 4:
-                        lhs.mem = 4
-
-                        # add variable name as key and complex type as type
-                        if (lhs.name in new_complex_dim) and (new_complex_dim[lhs.name] < lhs.dim):
-
-                            new_complex_dim[lhs.name] = lhs.dim
-
-                            lhs.type = (lhs.dim, lhs.mem)
-                            new_complex_types[lhs.name] = lhs.type
-
-                        else:
-                            new_complex_dim[lhs.name] = lhs.dim
-                            lhs.type = (lhs.dim, lhs.mem)
-                            new_complex_types[lhs.name] = lhs.type
-
-                        dictionary[func_name][lhs.name] = new_complex_types[lhs.name]
-
-        # clear the types in the program
-        nodes = program.flatten(False, False, False)
-        for idy, node in enumerate(nodes):
-            node.type = "TYPE"
-
-        # use dictionary to set ftypes
-        program.ftypes = dictionary
-
-    # unset the configured flag
-    project.builder.configured = False
-
-    # configure again
-    project.builder.configure(True)
-
-    #print dictionary
-
-
-def complex_mul(nodes):
-    for node in nodes:
-        if node.cls == "Assign":
-            lhs, rhs = node
-
-            if rhs.cls == "Mul":
-                if rhs[0].type == "cx_double":
-                    declares = node.func[0]
-
-                    for var in declares:
-                        if var.name == lhs.name:
-                            var.type = "cx_double"
-    return nodes
-
-
 # remove the nodes for clear, close and clc so they are not included in the translation
 def remove_close_clear_clc(nodes):
     for n in nodes:
@@ -124,20 +43,6 @@ def remove_close_clear_clc(nodes):
     return nodes
 
 
-# Change right hand side variable to uvec if assigned with find, b = find(a==3)
-def modify_find(nodes):
-    for n in nodes:
-        if n.cls == "Assign":
-            lhs, rhs = n
-            if rhs.name == "find":
-                declares = n.func[0]
-                #print declares.cls
-                for var in declares:
-                    if var.name == lhs.name:
-                        var.type = "uvec"
-    return nodes
-
-
 # move the "using namespace arma ;" node last in the includes list
 def modify_define_first(project):
     for program in project:
@@ -4,8 +4,6 @@ from os.path import sep
 
 import reference
 import matlab2cpp
-import matlab2cpp.m2cpp
-import matlab2cpp.pyplot
 
 def flatten(node, ordered=False, reverse=False, inverse=False):
     """
@@ -515,12 +513,15 @@ See also:
     """
 
     # e.g. Get_a from user
-    value = node.program.parent.kws.get(node.cls+"_"+node.name, None)
+    key = node.cls+"_"+node.name
+    value = node.program.parent.kws.get(key, None)
 
     # e.g. Get from user
     if value is None:
-        value = node.program.parent.kws.get(node.cls, None)
+        key = node.cls
+        value = node.program.parent.kws.get(key, None)
 
+    target = None
     if value is None:
         
         backend = node.backend
@@ -528,7 +529,7 @@ See also:
             backend = "unknown"
 
         try:
-            target = matlab2cpp.rules.__dict__["_"+backend]
+            target = matlab2cpp.rules.get(backend)
         except KeyError as err:
             err_str = "\'" + err.message + "\', File: %s. Data type set in .py file could be wrong." % (str(node.file))
             raise KeyError(err_str)
@@ -537,10 +538,12 @@ See also:
 
         # e.g. Get_a (reserved typically)
         if specific_name in target.__dict__:
+            key = specific_name
             value = target.__dict__[specific_name]
 
         # e.g. Get (normal behavior)
         elif node.cls in target.__dict__:
+            key = node.cls
             value = target.__dict__[node.cls]
 
         else:
@@ -554,7 +557,15 @@ See also:
     if not isinstance(value, (unicode, str, list, tuple)):
         #print node.code
         #print "\n\n"
-        value = value(node)
+        if matlab2cpp.profiler.active[0] is None:
+            value = value(node)
+
+        # m2cpp --profile
+        elif target is None:
+            value = matlab2cpp.profiler.call("kws." + key, value, node)
+        else:
+            value = matlab2cpp.profiler.call(
+                    matlab2cpp.profiler.name(target, key), value, node)
 
     # not quite right format
     if isinstance(value, (unicode, matlab2cpp.node.frontend.Node)):
@@ -635,7 +646,9 @@ See also:
     :py:func:`~matlab2cpp.Node.include`
     """
 
-    if os.path.isfile(name):
+    builder = node.project.builder
+
+    if os.path.isfile(name) or name in builder.sources:
 
         #name = os.path.relpath(name, os.path.dirname(node.program.name))
         name = os.path.basename(name)
@@ -651,41 +664,55 @@ See also:
         if name == "SPlot":
             include_code = '#include "SPlot.h"'
 
+            # in-process translation, returned with the other files
+            if builder.headers is not None:
+                from matlab2cpp import pyplot
+                builder.headers["SPlot.h"] = pyplot.code
+
             #check if file in directory
-            try:
-                #file_path = node.program[1].name
-                #index = file_path.rindex(sep)
-                #output_file_path = file_path[:index] + sep + "SPlot.h"
-                output_file_path = os.getcwd() + sep + "SPlot.h"
-
-                #if mconvert.h not found in directory, create the file
-                if not os.path.isfile(output_file_path) or "SPlot.h" not in created_file:
-                    f = open(output_file_path, "w")
-                    f.write(matlab2cpp.pyplot.code)
-                    f.close()
-                    created_file.append("SPlot.h")
-            except:
-                pass
+            else:
+                try:
+                    #file_path = node.program[1].name
+                    #index = file_path.rindex(sep)
+                    #output_file_path = file_path[:index] + sep + "SPlot.h"
+                    output_file_path = os.getcwd() + sep + "SPlot.h"
+
+                    #if mconvert.h not found in directory, create the file
+                    if not os.path.isfile(output_file_path) or "SPlot.h" not in created_file:
+                        from matlab2cpp import pyplot
+                        f = open(output_file_path, "w")
+                        f.write(pyplot.code)
+                        f.close()
+                        created_file.append("SPlot.h")
+                except:
+                    pass
                 
 
         elif name == "m2cpp":
             include_code = '#include "mconvert.h"'
 
+            # in-process translation, returned with the other files
+            if builder.headers is not None:
+                from matlab2cpp import m2cpp
+                builder.headers["mconvert.h"] = m2cpp.code
+
             #check if file in directory
-            try:
-                #file_path = node.program[1].name
-                #index = file_path.rindex(sep)
-                #output_file_path = file_path[:index] + sep + "mconvert.h"
-                output_file_path = os.getcwd() + sep + "mconvert.h"
-
-                #if mconvert.h not found in directory, create the file
-                if not os.path.isfile(output_file_path) or "mconvert.h" not in created_file:
-                    f = open(output_file_path, "w")
-                    f.write(matlab2cpp.m2cpp.code)
-                    f.close()
-                    created_file.append("mconvert.h")
-            except:
-                pass
+            else:
+                try:
+                    #file_path = node.program[1].name
+                    #index = file_path.rindex(sep)
+                    #output_file_path = file_path[:index] + sep + "mconvert.h"
+                    output_file_path = os.getcwd() + sep + "mconvert.h"
+
+                    #if mconvert.h not found in directory, create the file
+                    if not os.path.isfile(output_file_path) or "mconvert.h" not in created_file:
+                        from matlab2cpp import m2cpp
+                        f = open(output_file_path, "w")
+                        f.write(m2cpp.code)
+                        f.close()
+                        created_file.append("mconvert.h")
+                except:
+                    pass
                 
         elif name == "arma":
             include_code = "#include <armadillo>"
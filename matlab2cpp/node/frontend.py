@@ -62,6 +62,9 @@ Attributes:
         attribute to that function. Use `hasattr` to  ensure it is the case.
     ret (tuple): The raw translation of the node. Same     as (str):
         `node.str`, but on the exact form the tranlsation  rule returned it.
+    shape (tuple): Constant size `(rows, cols)` of a vector or matrix, or
+        None if unknown.  Stored with the declared variable, and makes the
+        variable a fixed size Armadillo type.
     str (str): The translation of the node. Note that the code is  translated
         leaf to root, and parents will not be  translated before after current
         node is translated.  Current and all ancestors will have an empty
@@ -77,6 +80,7 @@ Attributes:
     value (str): A free variable resereved for content. The use  varies from
         node to node.  Available in the string  format as `%(value)s`.
     vtypes (dict): Verbatim translation in tree (read-only)
+    iotypes (dict): I/O backend per file used in `load` and `save`.
     """
     backend = ref.Property_reference("backend")
 
@@ -94,6 +98,7 @@ Attributes:
     num = dt.Num()
     pointer = ref.Property_reference("pointer")
     ret = ref.Property_reference("ret")
+    shape = dt.Shape()
     str = ref.Property_reference("str")
     suggest = dt.Suggest()
     type = dt.Type()
@@ -109,6 +114,7 @@ Attributes:
     itypes = sup.Itypes()
     stypes = sup.Stypes()
     vtypes = sup.Vtypes()
+    iotypes = sup.Iotypes()
 
     def __init__(self, parent=None, name="", value="", pointer=0,
             line=None, cur=None, code=None):
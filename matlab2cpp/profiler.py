@@ -0,0 +1,197 @@
+"""
+Profiling of the translator itself, activated through ``m2cpp --profile``.
+
+The phases of :py:func:`~matlab2cpp.main` are timed with :py:func:`phase`, and
+the rules called from :py:func:`~matlab2cpp.node.backend.translate_one` and
+:py:func:`~matlab2cpp.configure.loop` through :py:func:`call`.  Phases with the
+same name accumulate.  Reserved rules answered from the memo of
+:py:mod:`~matlab2cpp.configure.memo` are counted with :py:func:`memo`.  When no
+profile is active, the hooks cost a single test.
+
+Example:
+    >>> profile = start()
+    >>> with phase("translate"):
+    ...     code = mc.qscript("a = 4")
+    >>> report = stop()
+    >>> print [p["name"] for p in report["phases"]]
+    ['translate']
+    >>> rules = dict((r["rule"], r["calls"]) for r in report["rules"])
+    >>> print rules["rules._int.Var"], rules["configure.datatypes.Var"] > 0
+    2 True
+    >>> profile = start()
+    >>> code = mc.qscript("a = abs(1); b = abs(2); c = abs(3.)")
+    >>> memo = stop()["memo"]
+    >>> print memo["hits"], memo["misses"], memo["rules"][0]["rule"]
+    5 4 configure.reserved.Get_abs
+    >>> print stop()
+    None
+"""
+
+import contextlib
+import json
+from timeit import default_timer as timer
+
+import matlab2cpp as mc
+
+# number of rules in report
+TOP = 25
+
+# the profile currently collecting, if any
+active = [None]
+
+
+class Profile(object):
+    """Timings collected between :py:func:`start` and :py:func:`stop`."""
+
+    def __init__(self):
+        self.begin = timer()
+        self.phases = []
+        self.rules = {}
+        self.memo = {}
+
+    def phase(self, name):
+        """Entry of a phase, created on first use."""
+        for entry in self.phases:
+            if entry["name"] == name:
+                return entry
+        entry = {"name": name, "seconds": 0., "nodes": None}
+        self.phases.append(entry)
+        return entry
+
+    def report(self, top=TOP):
+        """
+Summary of the profile.
+
+Args:
+    top (int): Number of rules to include
+
+Returns:
+    dict: Total time, the phases in order of first use, the `top` rules by
+    cumulative time (`rules`) and by number of calls (`rules_by_calls`), and
+    hits and misses of the reserved rule memo (`memo`).
+        """
+        rules = [{"rule": name, "calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in self.rules.items()]
+
+        by_time = sorted(rules, key=lambda r: (-r["seconds"], r["rule"]))
+        by_calls = sorted(rules, key=lambda r: (-r["calls"], r["rule"]))
+
+        memo = [{"rule": name, "hits": hits, "misses": misses}
+                for name, (hits, misses) in self.memo.items()]
+        memo.sort(key=lambda r: (-r["hits"]-r["misses"], r["rule"]))
+        hits = sum([r["hits"] for r in memo])
+        misses = sum([r["misses"] for r in memo])
+
+        return {"seconds": timer() - self.begin,
+                "phases": [dict(entry) for entry in self.phases],
+                "rules": by_time[:top],
+                "rules_by_calls": by_calls[:top],
+                "memo": {"hits": hits, "misses": misses,
+                    "rate": hits and float(hits)/(hits+misses) or 0.,
+                    "rules": memo[:top]}}
+
+
+def start():
+    """Start collecting a new profile."""
+    active[0] = Profile()
+    return active[0]
+
+
+def stop(top=TOP):
+    """
+Stop collecting.
+
+Returns:
+    dict, None: Report of the active profile, see :py:meth:`Profile.report`
+    """
+    profile = active[0]
+    active[0] = None
+    if profile is None:
+        return None
+    return profile.report(top)
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Add the wall time of a `with` block to a phase."""
+    profile = active[0]
+    if profile is None:
+        yield
+        return
+
+    begin = timer()
+    try:
+        yield
+    finally:
+        profile.phase(name)["seconds"] += timer() - begin
+
+
+def nodes(name, root):
+    """Record the number of nodes below `root` for a phase."""
+    profile = active[0]
+    if profile is not None:
+        profile.phase(name)["nodes"] = len(root.flatten(False, False, False))
+
+
+def call(name, rule, node):
+    """
+Call a rule and add its time to the rule's entry.
+
+Args:
+    name (str): Name of the rule in the report, like ``rules._mat.Get``
+    rule (callable): The rule
+    node (Node): Argument to the rule
+
+Returns:
+    The return value of the rule.
+    """
+    profile = active[0]
+    if profile is None:
+        return rule(node)
+
+    begin = timer()
+    try:
+        return rule(node)
+    finally:
+        entry = profile.rules.get(name)
+        if entry is None:
+            entry = profile.rules[name] = [0, 0.]
+        entry[0] += 1
+        entry[1] += timer() - begin
+
+
+def memo(name, hit):
+    """
+Count a lookup in the memo of reserved rules.
+
+Args:
+    name (str): Name of the rule in the report
+    hit (bool): True if the result was found in the memo
+    """
+    profile = active[0]
+    if profile is not None:
+        entry = profile.memo.get(name)
+        if entry is None:
+            entry = profile.memo[name] = [0, 0]
+        entry[not hit] += 1
+
+
+def name(module, key):
+    """Name of a rule in the report, relative to the matlab2cpp package."""
+    module = module.__name__
+    if module.startswith("matlab2cpp."):
+        module = module[len("matlab2cpp."):]
+    return module + "." + key
+
+
+def write(report, filename):
+    """Write a report as JSON."""
+    f = open(filename, "w")
+    json.dump(report, f, indent=2, sort_keys=True)
+    f.write("\n")
+    f.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
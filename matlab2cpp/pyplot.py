@@ -1,3 +1,245 @@
+"""
+C++ plotting header `SPlot.h` and its Python counterparts.
+
+Translated code using plotting functions includes `SPlot.h`, which calls
+matplotlib through an embedded interpreter running `script`.  With
+``SPLOT_MODE=recorded`` the header instead writes the plot commands to a file
+using `recorder`, to be rendered later with :py:func:`replay`.
+"""
+import pickle
+import importlib
+
+script = r"""
+from __future__ import division
+
+import matplotlib as mpl
+qt_backend = None
+
+# queued plots are drawn on a worker thread, where GUI toolkits can not run
+if globals().get('_splot_gui', True):
+    try:
+        from PyQt4 import QtCore, QtGui, QtGui as QtWidgets
+        qt_backend = 4
+    except ImportError:
+        try:
+            from PyQt5 import QtCore, QtGui, QtWidgets
+            qt_backend = 5
+        except ImportError:
+            pass
+else:
+    mpl.use('agg')
+if qt_backend:
+    try:
+        mpl.use('qt%dagg'%qt_backend)
+    except:
+        pass
+
+from pylab import *
+import numpy as np
+
+pylab_show = show
+def show(interactive):
+    if qt_backend:
+        pylab_show(block=False)
+        if interactive:
+            QtWidgets.QApplication.instance().exec_()
+    else:
+        pylab_show(block=interactive)
+
+def wigb(a, scale=1.0, x=None, z=None, amx=None, xshift=0.0, **kwargs):
+    kwargs.setdefault('color', 'black')
+    kwargs.setdefault('linewidth', 0.2)
+
+    n,m = a.shape
+
+    if amx is None or amx==0:
+        #amx = np.mean(np.max(np.abs(a), axis=1))
+        amx = np.max(np.max(np.abs(a), axis=1))
+
+    if x is None or len(x)==0:
+        x = np.arange(m)
+    if z is None or len(z)==0:
+        z = np.arange(n)
+
+    dx = np.median(np.abs(x[1:]-x[:-1]))
+    dz = z[1]-z[0]
+    a *= scale*dx/amx
+
+    #set display ranges
+    (xmin,xmax) = np.min(x), np.max(x)
+    (zmin,zmax) = np.min(z), np.max(z)
+    xlim(xmin-2*dx, xmax+2*dx)
+    ylim(zmin-dz, zmax+dz)
+    gca().invert_yaxis()
+
+    transData = gca().transData
+    plots = []
+    for i,xi in enumerate(x):
+        trace = a[:,i]
+        if trace.any(): # skip zero traces
+            plot_lines = plot(xi+trace, z, **kwargs)
+            plot_fill = fill_betweenx(z, xi-dx, xi+trace, **kwargs)
+            plots.append((plot_lines,plot_fill))
+
+            # Create clipping path for fill (instead of calculating zero-crossings)
+            x0 = xi+xshift
+            x1 = xi+dx if i+1<len(x) else xi+np.max(trace)
+            #x1 = xi+np.max(trace)
+            path = mpl.path.Path([(x0,zmin), (x0,zmax), (x1,zmax), (x1,zmin), (x0,zmin)])
+            plot_fill.set_clip_path(path, transData)
+
+    return plots
+
+
+if not qt_backend:
+    def table(*args, **kwargs):
+        print 'Failed to import Qt, no table support. Please install pyqt4 or pyqt5.'
+else:
+    class TableModel(QtCore.QAbstractTableModel):
+        def __init__(self, mat):
+            QtCore.QAbstractTableModel.__init__(self)
+            self.mat = mat
+
+        def data(self, index, role):
+            if role == QtCore.Qt.DisplayRole:
+                value = self.mat[index.row(), index.column()]
+                return '{: f}'.format(value)
+            return None
+
+        def rowCount(self, index):
+            return self.mat.shape[0]
+
+        def columnCount(self, index):
+            return self.mat.shape[1]
+
+        def headerData(self, section, orientation, role):
+            if role == QtCore.Qt.DisplayRole:
+                return str(section+1)
+            return None
+
+    class TableView(QtWidgets.QTableView):
+        _views = {} # references to live windows, to prevent early deletion
+
+        def __init__(self):
+            QtWidgets.QTableView.__init__(self)
+            if qt_backend == 4:
+                self.horizontalHeader().setResizeMode(QtWidgets.QHeaderView.Fixed)
+                self.verticalHeader().setResizeMode(QtWidgets.QHeaderView.Fixed)
+            else:
+                self.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+                self.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+            self.pt = self.font().pointSize()
+            self.chars = 9
+
+            if qt_backend == 4:
+                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.ZoomIn, self), QtCore.SIGNAL('activated()'), self.zoom_in)
+                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.ZoomOut, self), QtCore.SIGNAL('activated()'), self.zoom_out)
+                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.Close, self), QtCore.SIGNAL('activated()'), self.close)
+            else:
+                QtWidgets.QShortcut(QtGui.QKeySequence.ZoomIn, self).activated.connect(self.zoom_in)
+                QtWidgets.QShortcut(QtGui.QKeySequence.ZoomOut, self).activated.connect(self.zoom_out)
+                QtWidgets.QShortcut(QtGui.QKeySequence.Close, self).activated.connect(self.close)
+
+            TableView._views[self] = self
+
+        def _getMonospaceFont(self):
+            font = QtGui.QFont('monospace')
+            if font.fixedPitch(): return font
+            font.setStyleHint(QtGui.QFont.Monospace)
+            if font.fixedPitch(): return font
+            font.setStyleHint(QtGui.QFont.TypeWriter)
+            if font.fixedPitch(): return font
+            font.setFamily('courier')
+            if font.fixedPitch(): return font
+            font.setKerning(False)
+            font.setFixedPitch(True)
+            return font
+
+        def setMonospaceFont(self):
+            self.setFont(self._getMonospaceFont())
+
+        def setFontSize(self, pt):
+            font = self.font()
+            font.setPointSize(pt)
+            self.setFont(font)
+            self.pt = pt
+
+            metrics = QtGui.QFontMetrics(font)
+            padding = 1.5
+            width = 2*padding + self.chars*metrics.width('X')
+            width = width*1.3
+            height = metrics.height() + 4*padding
+
+            header = self.verticalHeader()
+            header.setFont(font)
+            for i in xrange(header.length()):
+                header.resizeSection(i, height)
+
+            header = self.horizontalHeader()
+            header.setFont(font)
+            for i in xrange(header.length()):
+                header.resizeSection(i, width)
+
+        def zoom_in(self):
+            self.setFontSize(self.pt + 1)
+
+        def zoom_out(self):
+            if self.pt > 1:
+                self.setFontSize(self.pt - 1)
+
+        def wheelEvent(self, event):
+            if event.modifiers() == QtCore.Qt.ControlModifier:
+                delta = event.delta() if qt_backend==4 else event.angleDelta().y()
+                if delta > 1:
+                    self.zoom_in()
+                else:
+                    self.zoom_out()
+            else:
+                QtWidgets.QTableView.wheelEvent(self, event)
+
+        def closeEvent(self, event):
+            del TableView._views[self]
+            QtWidgets.QTableView.closeEvent(self, event)
+
+
+    def table(mat, title=None):
+        if QtWidgets.QApplication.instance() is None:
+            import sys
+            table.app = QtWidgets.QApplication(sys.argv)
+        table.seq += 1
+        if title is None:
+            title = 'Table %d '%table.seq
+        title += ' (%dx%d %s)'%(mat.shape+(mat.dtype.name,))
+
+        model = TableModel(mat)
+        view = TableView()
+        view.setMonospaceFont()
+        if np.iscomplexobj(mat):
+            view.chars *= 2
+        view.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        view.setModel(model)
+        view.setFontSize(8)
+        view.resize(600, 400)
+        view.setWindowTitle(title)
+        view.show()
+    table.seq = 0
+"""
+
+# Pickles every command with an id, returning a reference to its result
+recorder = r"""
+import pickle
+import types
+
+_splot_file = open(_splot_filename, "wb")
+
+def _splot_record(_id, _obj, _name, *args, **kwargs):
+    if isinstance(_obj, types.ModuleType):
+        _obj = ("splot.module", _obj.__name__)
+    pickle.dump((_id, _obj, _name, args, kwargs), _splot_file, pickle.HIGHEST_PROTOCOL)
+    _splot_file.flush()
+    return ("splot.ref", _id)
+"""
+
 code = r"""
 /*
  * SPlot.h
@@ -15,10 +257,25 @@ code = r"""
 #define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
 #include <numpy/arrayobject.h>
 #include <map>
-//DGRIM #include "armadillo/armadillo"
+#include <memory>
+#include <deque>
+#include <functional>
+#include <thread>
+#include <mutex>
+#include <condition_variable>
+#include <cstdlib>
+#include <fstream>
+#include <sstream>
+#include <vector>
+#include <armadillo>
 
 class PyEngine
 {
+	static bool &_borrow() {
+		static bool borrow = false;
+		return borrow;
+	}
+
 	static void _initialize() {
 		static bool initialized = false;
 		if (!initialized) {
@@ -29,25 +286,80 @@ class PyEngine
 		}
 	}
 
+	class renderer;
+
+	static std::unique_ptr<renderer> &_active() {
+		static std::unique_ptr<renderer> active;
+		return active;
+	}
+
+	static bool &_recording() {
+		static bool recording = false;
+		return recording;
+	}
+
+	static bool &_rendering() {
+		static thread_local bool rendering = false;
+		return rendering;
+	}
+
+	// Commands are queued instead of run when a renderer is active, except on
+	// its own thread
+	static bool _deferring() {
+		return !_rendering() && _active();
+	}
+
  public:
 
+	// Plot commands are run when called (immediate), replayed in order by a
+	// rendering thread which owns the interpreter (queued), or written to a
+	// file by the rendering thread for offline replay with
+	// matlab2cpp.pyplot.replay (recorded).  In the last two modes, arguments
+	// are captured without Python, named arrays by copy unless borrowed, and
+	// returned handles are placeholders filled in when the call is replayed.
+	enum render_mode { immediate, queued, recorded };
+
+	// Arrays are handed to NumPy without copying when the wrapper owns them,
+	// which is the case for temporaries (moved) and for subviews and
+	// expressions (evaluated once).  Named Armadillo objects are borrowed by
+	// the wrappers and copied once into NumPy, as matplotlib keeps references
+	// to its input after the call returns.  With borrow_arrays(true) they are
+	// wrapped in place as well; the program must then keep them alive and
+	// unchanged until the figures are drawn.
+	static bool borrow_arrays(bool onoff)
+	{
+		const bool previous = _borrow();
+		_borrow() = onoff;
+		return previous;
+	}
+
 	// Wrapper class which takes both row/col vectors, as well as initializer lists
 	template <class T>
 	class arma_vec
 	{
 	public:
-		const std::vector<T> v;
-		arma_vec() : v() {}
-		arma_vec(const std::initializer_list<T> &c) : v(c) {}
-		arma_vec(const std::vector<T> &vec) : v(vec) {}
-		arma_vec(const arma::Col<T> &vec) : v(vec.begin(), vec.end()) {}
-		arma_vec(const arma::Row<T> &vec) : v(vec.begin(), vec.end()) {}
-		arma_vec(const arma::subview_col<T> &vec) : arma_vec(arma::Col<T>{vec}) {}
-		arma_vec(const arma::subview_row<T> &vec) : arma_vec(arma::Row<T>{vec}) {}
+		std::shared_ptr<const arma::Mat<T> > owned;
+		const T *mem;
+		size_t n_elem;
+		arma_vec() : mem(nullptr), n_elem(0) {}
+		arma_vec(const std::initializer_list<T> &c) : arma_vec(arma::Col<T>(c)) {}
+		arma_vec(const std::vector<T> &vec) : mem(vec.data()), n_elem(vec.size()) {}
+		arma_vec(const arma::Col<T> &vec) : mem(vec.memptr()), n_elem(vec.n_elem) {}
+		arma_vec(const arma::Row<T> &vec) : mem(vec.memptr()), n_elem(vec.n_elem) {}
+		arma_vec(arma::Col<T> &&vec) : owned(std::make_shared<const arma::Mat<T> >(std::move(vec))),
+									   mem(owned->memptr()), n_elem(owned->n_elem) {}
+		arma_vec(arma::Row<T> &&vec) : owned(std::make_shared<const arma::Mat<T> >(std::move(vec))),
+									   mem(owned->memptr()), n_elem(owned->n_elem) {}
+		arma_vec(const arma::subview_col<T> &vec) : arma_vec(arma::Col<T>(vec)) {}
+		arma_vec(const arma::subview_row<T> &vec) : arma_vec(arma::Row<T>(vec)) {}
 		template <class U>
-			arma_vec(const arma::eOp<arma::Col<T>, U> &vec) : arma_vec(arma::Col<T>{vec}) {}
+			arma_vec(const arma::eOp<arma::Col<T>, U> &vec) : arma_vec(arma::Col<T>(vec)) {}
 		template <class U>
-			arma_vec(const arma::eOp<arma::Row<T>, U> &vec) : arma_vec(arma::Row<T>{vec}) {}
+			arma_vec(const arma::eOp<arma::Row<T>, U> &vec) : arma_vec(arma::Row<T>(vec)) {}
+
+		size_t size() const { return n_elem; }
+		bool empty() const { return n_elem == 0; }
+		const T &operator[](size_t i) const { return mem[i]; }
 	};
 
 	// Wrapper class to limit arma::Mat implicit conversions (from string, for example).
@@ -55,13 +367,14 @@ class PyEngine
 	template <class T>
 	class arma_mat
 	{
-		const arma::Mat<T> _m;
 	public:
+		std::shared_ptr<const arma::Mat<T> > owned;
 		const arma::Mat<T> &m;
 		arma_mat(const arma::Mat<T> &mat) : m(mat) {}
-		arma_mat(const arma::subview<T> &view) : _m(view), m(_m) {}
+		arma_mat(arma::Mat<T> &&mat) : owned(std::make_shared<const arma::Mat<T> >(std::move(mat))), m(*owned) {}
+		arma_mat(const arma::subview<T> &view) : arma_mat(arma::Mat<T>(view)) {}
 		template <class U>
-			arma_mat(const arma::eOp<arma::Mat<T>, U> &op) : _m(op), m(_m) {}
+			arma_mat(const arma::eOp<arma::Mat<T>, U> &op) : arma_mat(arma::Mat<T>(op)) {}
 	};
 
 	class py_obj
@@ -69,9 +382,12 @@ class PyEngine
 		friend class PyEngine;
 		PyObject *obj;
 
+		// Conversion postponed until the command is replayed
+		std::shared_ptr<const std::function<PyObject*()> > make;
+
 		template <class T> static int npy_typenum();
 		template <class NPY_T, class InputIt>
-		static PyObject *create(const std::initializer_list<size_t> &in_dims, const InputIt &data, int flags=0)
+		static PyObject *create(const std::vector<size_t> &in_dims, const InputIt &data, int flags=0)
 		{
 			std::vector<npy_intp> dims;
 			for (auto it=in_dims.begin(); it!=in_dims.end(); ++it)
@@ -83,6 +399,93 @@ class PyEngine
 			return obj;
 		}
 
+		// Read-only NumPy array over existing memory, kept alive by owner if given
+		template <class NPY_T>
+		static PyObject *wrap(const std::vector<size_t> &in_dims, const NPY_T *data,
+							  const std::shared_ptr<const arma::Mat<NPY_T> > &owner, int flags=0)
+		{
+			std::vector<npy_intp> dims;
+			for (auto it=in_dims.begin(); it!=in_dims.end(); ++it)
+				dims.push_back((npy_intp)*it);
+			PyObject *obj = PyArray_New(&PyArray_Type, dims.size(), (npy_intp*)dims.data(),
+										npy_typenum<NPY_T>(), /*strides*/nullptr, (void*)data, /*itemsize*/0,
+										flags ? NPY_ARRAY_FARRAY_RO : NPY_ARRAY_CARRAY_RO, /*obj*/nullptr);
+			if (obj && owner)
+			{
+				PyObject *capsule = PyCapsule_New(new std::shared_ptr<const arma::Mat<NPY_T> >(owner),
+												  nullptr, release<NPY_T>);
+				PyArray_SetBaseObject((PyArrayObject*)obj, capsule); // Steals reference
+			}
+			return obj;
+		}
+
+		template <class NPY_T>
+		static void release(PyObject *capsule)
+		{
+			delete (std::shared_ptr<const arma::Mat<NPY_T> >*)PyCapsule_GetPointer(capsule, nullptr);
+		}
+
+		// Owned and borrowed arrays are wrapped, others are copied once
+		template <class NPY_T>
+		static PyObject *from_arma(const std::vector<size_t> &dims, const NPY_T *data,
+								   const std::shared_ptr<const arma::Mat<NPY_T> > &owned, int flags=0)
+		{
+			if (owned || (_borrow() && data))
+				return wrap<NPY_T>(dims, data, owned, flags);
+			return create<NPY_T>(dims, data, flags);
+		}
+
+		// Converted now, or captured for the rendering thread
+		template <class F>
+		static py_obj defer(F make)
+		{
+			if (!_deferring())
+				return py_obj(make(), true);
+			py_obj deferred;
+			deferred.make = std::make_shared<const std::function<PyObject*()> >(make);
+			return deferred;
+		}
+
+		// Arrays captured for the rendering thread are copied, unless owned by
+		// the wrapper or borrowed, since the program may change them before
+		// the command is replayed
+		template <class NPY_T>
+		static py_obj array(const std::vector<size_t> &dims, const NPY_T *data,
+							std::shared_ptr<const arma::Mat<NPY_T> > owned, bool borrowed, int flags=0)
+		{
+			if (!_deferring())
+			{
+				if (borrowed)
+					return py_obj(from_arma<NPY_T>(dims, data, owned, flags), true);
+				return py_obj(create<NPY_T>(dims, data, flags), true);
+			}
+			if (!owned && !(borrowed && _borrow() && data))
+			{
+				size_t n_elem = 1;
+				for (auto n : dims)
+					n_elem *= n;
+				owned = std::make_shared<const arma::Mat<NPY_T> >(data, n_elem, 1);
+				data = owned->memptr();
+			}
+			return defer([=]() { return wrap<NPY_T>(dims, data, owned, flags); });
+		}
+
+		// New reference, converting a deferred object
+		PyObject *ref() const
+		{
+			if (make)
+				return (*make)();
+			Py_XINCREF(obj);
+			return obj;
+		}
+
+		PyObject *steal()
+		{
+			PyObject *o = obj;
+			obj = nullptr;
+			return o;
+		}
+
 	    explicit py_obj(PyObject *o, bool steal_reference) : obj(o)
 		{
 			if (!steal_reference)
@@ -94,52 +497,56 @@ class PyEngine
 		/* Basic constructors */
 
 	    py_obj() : obj(nullptr) {}
-		py_obj(const py_obj &other) : obj(other.obj)
+		py_obj(const py_obj &other) : obj(other.obj), make(other.make)
 		{
 			Py_XINCREF(obj);
 		}
+		py_obj(py_obj &&other) : obj(other.obj), make(std::move(other.make))
+		{
+			other.obj = nullptr;
+		}
 
 	    py_obj(const void *); // Trigger link error, to avoid implicit cast to bool
 
 		/* Construct from primitive types, strings */
 
-		py_obj(bool const& b) : obj(PyBool_FromLong(b)) {}
-		py_obj(int const& i) : obj(PyInt_FromLong(i)) {}
-		py_obj(double const& d) : obj(PyFloat_FromDouble(d)) {}
-		py_obj(const char* const& s) : obj(PyString_FromString(s)) {}
-		py_obj(std::string const& s) : obj(PyString_FromString(s.c_str())) {}
+		py_obj(bool const& b) : py_obj(defer([=]() { return PyBool_FromLong(b); })) {}
+		py_obj(int const& i) : py_obj(defer([=]() { return PyInt_FromLong(i); })) {}
+		py_obj(double const& d) : py_obj(defer([=]() { return PyFloat_FromDouble(d); })) {}
+		py_obj(const char* const& s) : py_obj(std::string(s)) {}
+		py_obj(std::string const& s) : py_obj(defer([=]() { return PyString_FromString(s.c_str()); })) {}
 
 		/* Construct from various sequences of double/float/int type */
 
-	    py_obj(std::initializer_list<double> c) : obj(create<double>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<double> const& vec) : obj(create<double>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<double> const& vec) : py_obj(vec.v) {}
-	    py_obj(arma_mat<double> const& mat) : obj(create<double>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<double> c) : py_obj(array<double>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<double> const& vec) : py_obj(array<double>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<double> const& vec) : py_obj(array<double>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+	    py_obj(arma_mat<double> const& mat) : py_obj(array<double>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
-	    py_obj(std::initializer_list<float> c) : obj(create<float>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<float> const& vec) : obj(create<float>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<float> const& vec) : py_obj(vec.v) {}
-		py_obj(arma_mat<float> const& mat) : obj(create<float>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<float> c) : py_obj(array<float>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<float> const& vec) : py_obj(array<float>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<float> const& vec) : py_obj(array<float>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+		py_obj(arma_mat<float> const& mat) : py_obj(array<float>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
-	    py_obj(std::initializer_list<arma::cx_double> c) : obj(create<arma::cx_double>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<arma::cx_double> const& vec) : obj(create<arma::cx_double>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<arma::cx_double> const& vec) : py_obj(vec.v) {}
-		py_obj(arma_mat<arma::cx_double> const& mat) : obj(create<arma::cx_double>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<arma::cx_double> c) : py_obj(array<arma::cx_double>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<arma::cx_double> const& vec) : py_obj(array<arma::cx_double>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<arma::cx_double> const& vec) : py_obj(array<arma::cx_double>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+		py_obj(arma_mat<arma::cx_double> const& mat) : py_obj(array<arma::cx_double>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
-	    py_obj(std::initializer_list<arma::cx_float> c) : obj(create<arma::cx_float>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<arma::cx_float> const& vec) : obj(create<arma::cx_float>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<arma::cx_float> const& vec) : py_obj(vec.v) {}
-		py_obj(arma_mat<arma::cx_float> const& mat) : obj(create<arma::cx_float>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<arma::cx_float> c) : py_obj(array<arma::cx_float>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<arma::cx_float> const& vec) : py_obj(array<arma::cx_float>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<arma::cx_float> const& vec) : py_obj(array<arma::cx_float>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+		py_obj(arma_mat<arma::cx_float> const& mat) : py_obj(array<arma::cx_float>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
-	    py_obj(std::initializer_list<arma::sword> c) : obj(create<arma::sword>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<arma::sword> const& vec) : obj(create<arma::sword>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<arma::sword> const& vec) : py_obj(vec.v) {}
-		py_obj(arma_mat<arma::sword> const& mat) : obj(create<arma::sword>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<arma::sword> c) : py_obj(array<arma::sword>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<arma::sword> const& vec) : py_obj(array<arma::sword>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<arma::sword> const& vec) : py_obj(array<arma::sword>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+		py_obj(arma_mat<arma::sword> const& mat) : py_obj(array<arma::sword>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
-	    py_obj(std::initializer_list<arma::uword> c) : obj(create<arma::uword>({c.size()}, c.begin())) {}
-	    py_obj(std::vector<arma::uword> const& vec) : obj(create<arma::uword>({vec.size()}, vec.begin())) {}
-		py_obj(arma_vec<arma::uword> const& vec) : py_obj(vec.v) {}
-		py_obj(arma_mat<arma::uword> const& mat) : obj(create<arma::uword>({mat.m.n_rows, mat.m.n_cols}, mat.m.begin(), NPY_ARRAY_F_CONTIGUOUS)) {}
+	    py_obj(std::initializer_list<arma::uword> c) : py_obj(array<arma::uword>({c.size()}, c.begin(), nullptr, false)) {}
+	    py_obj(std::vector<arma::uword> const& vec) : py_obj(array<arma::uword>({vec.size()}, vec.data(), nullptr, false)) {}
+		py_obj(arma_vec<arma::uword> const& vec) : py_obj(array<arma::uword>({vec.n_elem}, vec.mem, vec.owned, true)) {}
+		py_obj(arma_mat<arma::uword> const& mat) : py_obj(array<arma::uword>({mat.m.n_rows, mat.m.n_cols}, mat.m.memptr(), mat.owned, true, NPY_ARRAY_F_CONTIGUOUS)) {}
 
 		/* Destructor */
 
@@ -152,20 +559,21 @@ class PyEngine
 
 		py_obj &operator=(const py_obj &other)
 		{
+			Py_XINCREF(other.obj);
 			Py_XDECREF(obj);
 			obj = other.obj;
-			Py_XINCREF(obj);
+			make = other.make;
 			return *this;
 		}
 
 		bool operator==(const py_obj &other) const
 		{
-			return obj==other.obj;
+			return obj==other.obj && make==other.make;
 		}
 
 		bool valid() const
 		{
-			return (obj!=nullptr);
+			return (obj!=nullptr || make);
 		}
 
 	private:
@@ -180,33 +588,127 @@ class PyEngine
 
 	static py_obj None()
 	{
-		return py_obj(Py_None, false);
+		return py_obj::defer([]() { Py_INCREF(Py_None); return Py_None; });
 	}
 
 	typedef std::vector<py_obj> args_t;
 	typedef std::map<const char*, py_obj> kwargs_t;
 
- protected:
+ private:
 
-	PyObject *main_module;
+	// Result of a queued call, set when the call is replayed
+	struct result_t
+	{
+		PyObject *obj = nullptr;
+		~result_t();
+	};
 
-	py_obj py_call_object(py_obj object, const char *func, const args_t &args={}, const kwargs_t &kwargs={})
+	// Queue of commands from the computing threads, replayed in batches by a
+	// thread holding the interpreter lock
+	class renderer
 	{
-		py_obj pyFunc(PyObject_GetAttrString(object, func), true);
-		if (!pyFunc.valid()) {
-			std::cerr << "No such method: " << func << std::endl;
-			return py_obj(nullptr, true);
+		std::deque<std::function<void()> > commands;
+		std::vector<PyObject*> garbage;
+		std::mutex mutex;
+		std::condition_variable changed;
+		bool busy = false;
+		bool done = false;
+		PyThreadState *main_state;
+		std::thread thread;
+
+		void run()
+		{
+			_rendering() = true;
+			std::unique_lock<std::mutex> lock(mutex);
+			while (!done || !commands.empty() || !garbage.empty())
+			{
+				changed.wait(lock, [this]() { return done || !commands.empty() || !garbage.empty(); });
+				std::deque<std::function<void()> > batch;
+				std::vector<PyObject*> dead;
+				batch.swap(commands);
+				dead.swap(garbage);
+				busy = true;
+				lock.unlock();
+
+				PyGILState_STATE gil = PyGILState_Ensure();
+				for (auto &command : batch)
+					command();
+				batch.clear(); // Arguments are released with the lock held
+				for (auto obj : dead)
+					Py_DECREF(obj);
+				PyGILState_Release(gil);
+
+				lock.lock();
+				busy = false;
+				changed.notify_all();
+			}
 		}
 
+	public:
+		const PyEngine *owner;
+		int calls = 0;
+
+		renderer(const PyEngine *engine) : owner(engine)
+		{
+			PyEval_InitThreads();
+			main_state = PyEval_SaveThread();
+			thread = std::thread(&renderer::run, this);
+		}
+
+		// Replays the remaining commands
+		~renderer()
+		{
+			{
+				std::lock_guard<std::mutex> lock(mutex);
+				done = true;
+			}
+			changed.notify_all();
+			thread.join();
+			PyEval_RestoreThread(main_state);
+		}
+
+		void push(std::function<void()> command)
+		{
+			std::lock_guard<std::mutex> lock(mutex);
+			commands.push_back(std::move(command));
+			changed.notify_all();
+		}
+
+		void dispose(PyObject *obj)
+		{
+			std::lock_guard<std::mutex> lock(mutex);
+			garbage.push_back(obj);
+			changed.notify_all();
+		}
+
+		void flush()
+		{
+			std::unique_lock<std::mutex> lock(mutex);
+			changed.wait(lock, [this]() { return commands.empty() && !busy; });
+		}
+	};
+
+	// Functions in __main__, looked up once
+	static std::map<std::string, py_obj> &_functions() {
+		static auto functions = new std::map<std::string, py_obj>();
+		return *functions;
+	}
+
+	static py_obj _resolve(const py_obj &object)
+	{
+		return py_obj(object.ref(), true);
+	}
+
+	py_obj _call(const py_obj &pyFunc, const args_t &args, const kwargs_t &kwargs)
+	{
 		py_obj pyArgs(PyTuple_New(args.size()), true);
 		for (size_t i=0; i<args.size(); i++) {
-			Py_INCREF(args[i].obj);
-			PyTuple_SetItem(pyArgs.obj, i, args[i].obj); // Steals reference
+			PyTuple_SetItem(pyArgs.obj, i, args[i].ref()); // Steals reference
 		}
 
 		py_obj pyKwArgs(PyDict_New(), true);
 		for (const auto &item : kwargs)
-			PyDict_SetItem(pyKwArgs.obj, py_obj(item.first).obj, item.second.obj);
+			PyDict_SetItem(pyKwArgs.obj, py_obj(item.first).obj, _resolve(item.second).obj);
 
 		py_obj ret(PyObject_Call(pyFunc.obj, pyArgs.obj, pyKwArgs.obj), true);
 		if (!ret.obj)
@@ -216,9 +718,72 @@ class PyEngine
 		return ret;
 	}
 
+	// Queue a call, returning a placeholder for its result
+	py_obj _queue(const py_obj &object, const char *func, const args_t &args, const kwargs_t &kwargs)
+	{
+		auto result = std::make_shared<result_t>();
+		const std::string name(func);
+		const std::vector<std::pair<std::string, py_obj> > named(kwargs.begin(), kwargs.end());
+		const int id = ++_active()->calls;
+
+		_active()->push([=]() {
+			kwargs_t keywords;
+			for (const auto &item : named)
+				keywords[item.first.c_str()] = item.second;
+
+			py_obj ret;
+			if (_recording())
+			{
+				args_t record = {id, object.valid() ? object : None(), name};
+				record.insert(record.end(), args.begin(), args.end());
+				ret = py_call("_splot_record", record, keywords);
+			}
+			else if (object.valid())
+				ret = py_call_object(object, name.c_str(), args, keywords);
+			else
+				ret = py_call(name.c_str(), args, keywords);
+			result->obj = ret.steal();
+		});
+
+		return py_obj::defer([=]() {
+			PyObject *obj = result->obj ? result->obj : Py_None;
+			Py_INCREF(obj);
+			return obj;
+		});
+	}
+
+ protected:
+
+	PyObject *main_module;
+
+	py_obj py_call_object(py_obj object, const char *func, const args_t &args={}, const kwargs_t &kwargs={})
+	{
+		if (_deferring())
+			return _queue(object, func, args, kwargs);
+
+		py_obj pyFunc(PyObject_GetAttrString(_resolve(object).obj, func), true);
+		if (!pyFunc.valid()) {
+			std::cerr << "No such method: " << func << std::endl;
+			PyErr_Clear();
+			return py_obj(nullptr, true);
+		}
+		return _call(pyFunc, args, kwargs);
+	}
+
 	py_obj py_call(const char *func, const args_t &args={}, const kwargs_t &kwargs={})
 	{
-		return py_call_object(py_obj(main_module, false), func, args, kwargs);
+		if (_deferring())
+			return _queue(py_obj(), func, args, kwargs);
+
+		py_obj &pyFunc = _functions()[func];
+		if (!pyFunc.valid())
+			pyFunc = py_obj(PyObject_GetAttrString(main_module, func), true);
+		if (!pyFunc.valid()) {
+			std::cerr << "No such method: " << func << std::endl;
+			PyErr_Clear();
+			return py_obj(nullptr, true);
+		}
+		return _call(pyFunc, args, kwargs);
 	}
 
 	py_obj error(const char *msg)
@@ -227,6 +792,15 @@ class PyEngine
 		return py_obj(nullptr, false);
 	}
 
+	// Start replaying commands on a rendering thread
+	void render(render_mode mode)
+	{
+		if (mode == immediate || _active())
+			return;
+		_recording() = (mode == recorded);
+		_active().reset(new renderer(this));
+	}
+
  public:
 	PyEngine()
 	{
@@ -236,6 +810,15 @@ class PyEngine
 
 	virtual ~PyEngine()
 	{
+		if (_active() && _active()->owner == this)
+			_active().reset();
+	}
+
+	// Wait until the queued commands are replayed
+	void flush()
+	{
+		if (_deferring())
+			_active()->flush();
 	}
 
 	bool py_code(const char *str, const kwargs_t &data={})
@@ -244,6 +827,13 @@ class PyEngine
 		{
 			py_put_variable(item.first, item.second);
 		}
+		if (_deferring())
+		{
+			const std::string code(str);
+			_active()->push([=]() { py_code(code.c_str()); });
+			return true;
+		}
+		_functions().clear();
 		if (PyRun_SimpleString(str) != 0)
 		{
 			std::cerr << "Error from Python interpreter:" << std::endl;
@@ -255,247 +845,98 @@ class PyEngine
 
 	void py_put_variable(const char *name, const py_obj &val)
 	{
-		Py_INCREF(val.obj);
-		PyModule_AddObject(main_module, name, val.obj); // Steals reference
+		if (_deferring())
+		{
+			const std::string key(name);
+			_active()->push([=]() { py_put_variable(key.c_str(), val); });
+			return;
+		}
+		_functions().erase(name);
+		PyModule_AddObject(main_module, name, val.ref()); // Steals reference
 	}
 
 	py_obj py_get_variable(const char *name)
 	{
-		return py_obj(PyDict_GetItemString(main_module, name), false); // Borrowed reference
+		const std::string key(name);
+		PyObject *module = main_module;
+		return py_obj::defer([=]() {
+			PyObject *obj = PyDict_GetItemString(module, key.c_str()); // Borrowed reference
+			Py_XINCREF(obj);
+			return obj;
+		});
 	}
 
 	py_obj py_get_module(const char *name)
 	{
-		return py_obj(PyImport_AddModule(name), false); // Borrowed reference
+		const std::string key(name);
+		return py_obj::defer([=]() {
+			PyObject *obj = PyImport_AddModule(key.c_str()); // Borrowed reference
+			Py_XINCREF(obj);
+			return obj;
+		});
 	}
 };
 
+// Handles dropped by the computing thread are released by the renderer
+inline PyEngine::result_t::~result_t()
+{
+	if (!obj)
+		return;
+	if (_deferring())
+		_active()->dispose(obj);
+	else
+		Py_DECREF(obj);
+}
+
 
 class SPlot : public PyEngine
 {
  public:
-	SPlot()
+	// The mode is read from the environment variable SPLOT_MODE (immediate,
+	// queued or recorded), the file for recorded commands from SPLOT_FILE.
+	// Matplotlib is not loaded when recording, and uses the non-GUI Agg
+	// backend when queued, so figures are saved rather than shown.
+	SPlot(render_mode mode=default_mode(), const std::string &filename=default_file())
 		: PyEngine()
 	{
+		if (mode == recorded)
+		{
+			py_put_variable("_splot_filename", filename);
+			py_code(R"(""" + recorder + r""")");
+			render(mode);
+			return;
+		}
+
 		std::string splot_py;
 		std::ifstream in("splot.py");
 		if (in.fail())
 		{
 			// May be copied to separate file "splot.py" in current directory
-			splot_py = R"(
-from __future__ import division
-
-import matplotlib as mpl
-qt_backend = None
-try:
-    from PyQt4 import QtCore, QtGui, QtGui as QtWidgets
-    qt_backend = 4
-except ImportError:
-    try:
-        from PyQt5 import QtCore, QtGui, QtWidgets
-        qt_backend = 5
-    except ImportError:
-        pass
-if qt_backend:
-    try:
-        mpl.use('qt%dagg'%qt_backend)
-    except:
-        pass
-
-from pylab import *
-import numpy as np
-
-pylab_show = show
-def show(interactive):
-    if qt_backend:
-        pylab_show(block=False)
-        if interactive:
-            QtWidgets.QApplication.instance().exec_()
-    else:
-        pylab_show(block=interactive)
-
-def wigb(a, scale=1.0, x=None, z=None, amx=None, xshift=0.0, **kwargs):
-    kwargs.setdefault('color', 'black')
-    kwargs.setdefault('linewidth', 0.2)
-
-    n,m = a.shape
-
-    if amx is None or amx==0:
-        #amx = np.mean(np.max(np.abs(a), axis=1))
-        amx = np.max(np.max(np.abs(a), axis=1))
-
-    if x is None or len(x)==0:
-        x = np.arange(m)
-    if z is None or len(z)==0:
-        z = np.arange(n)
-
-    dx = np.median(np.abs(x[1:]-x[:-1]))
-    dz = z[1]-z[0]
-    a *= scale*dx/amx
-
-    #set display ranges
-    (xmin,xmax) = np.min(x), np.max(x)
-    (zmin,zmax) = np.min(z), np.max(z)
-    xlim(xmin-2*dx, xmax+2*dx)
-    ylim(zmin-dz, zmax+dz)
-    gca().invert_yaxis()
-
-    transData = gca().transData
-    plots = []
-    for i,xi in enumerate(x):
-        trace = a[:,i]
-        if trace.any(): # skip zero traces
-            plot_lines = plot(xi+trace, z, **kwargs)
-            plot_fill = fill_betweenx(z, xi-dx, xi+trace, **kwargs)
-            plots.append((plot_lines,plot_fill))
-
-            # Create clipping path for fill (instead of calculating zero-crossings)
-            x0 = xi+xshift
-            x1 = xi+dx if i+1<len(x) else xi+np.max(trace)
-            #x1 = xi+np.max(trace)
-            path = mpl.path.Path([(x0,zmin), (x0,zmax), (x1,zmax), (x1,zmin), (x0,zmin)])
-            plot_fill.set_clip_path(path, transData)
-
-    return plots
-
-
-if not qt_backend:
-    def table(*args, **kwargs):
-        print 'Failed to import Qt, no table support. Please install pyqt4 or pyqt5.'
-else:
-    class TableModel(QtCore.QAbstractTableModel):
-        def __init__(self, mat):
-            QtCore.QAbstractTableModel.__init__(self)
-            self.mat = mat
-
-        def data(self, index, role):
-            if role == QtCore.Qt.DisplayRole:
-                value = self.mat[index.row(), index.column()]
-                return '{: f}'.format(value)
-            return None
-
-        def rowCount(self, index):
-            return self.mat.shape[0]
-
-        def columnCount(self, index):
-            return self.mat.shape[1]
-
-        def headerData(self, section, orientation, role):
-            if role == QtCore.Qt.DisplayRole:
-                return str(section+1)
-            return None
-
-    class TableView(QtWidgets.QTableView):
-        _views = {} # references to live windows, to prevent early deletion
-
-        def __init__(self):
-            QtWidgets.QTableView.__init__(self)
-            if qt_backend == 4:
-                self.horizontalHeader().setResizeMode(QtWidgets.QHeaderView.Fixed)
-                self.verticalHeader().setResizeMode(QtWidgets.QHeaderView.Fixed)
-            else:
-                self.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
-                self.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
-            self.pt = self.font().pointSize()
-            self.chars = 9
-
-            if qt_backend == 4:
-                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.ZoomIn, self), QtCore.SIGNAL('activated()'), self.zoom_in)
-                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.ZoomOut, self), QtCore.SIGNAL('activated()'), self.zoom_out)
-                self.connect(QtWidgets.QShortcut(QtWidgets.QKeySequence.Close, self), QtCore.SIGNAL('activated()'), self.close)
-            else:
-                QtWidgets.QShortcut(QtGui.QKeySequence.ZoomIn, self).activated.connect(self.zoom_in)
-                QtWidgets.QShortcut(QtGui.QKeySequence.ZoomOut, self).activated.connect(self.zoom_out)
-                QtWidgets.QShortcut(QtGui.QKeySequence.Close, self).activated.connect(self.close)
-
-            TableView._views[self] = self
-
-        def _getMonospaceFont(self):
-            font = QtGui.QFont('monospace')
-            if font.fixedPitch(): return font
-            font.setStyleHint(QtGui.QFont.Monospace)
-            if font.fixedPitch(): return font
-            font.setStyleHint(QtGui.QFont.TypeWriter)
-            if font.fixedPitch(): return font
-            font.setFamily('courier')
-            if font.fixedPitch(): return font
-            font.setKerning(False)
-            font.setFixedPitch(True)
-            return font
-
-        def setMonospaceFont(self):
-            self.setFont(self._getMonospaceFont())
-
-        def setFontSize(self, pt):
-            font = self.font()
-            font.setPointSize(pt)
-            self.setFont(font)
-            self.pt = pt
-
-            metrics = QtGui.QFontMetrics(font)
-            padding = 1.5
-            width = 2*padding + self.chars*metrics.width('X')
-            width = width*1.3
-            height = metrics.height() + 4*padding
-
-            header = self.verticalHeader()
-            header.setFont(font)
-            for i in xrange(header.length()):
-                header.resizeSection(i, height)
-
-            header = self.horizontalHeader()
-            header.setFont(font)
-            for i in xrange(header.length()):
-                header.resizeSection(i, width)
-
-        def zoom_in(self):
-            self.setFontSize(self.pt + 1)
-
-        def zoom_out(self):
-            if self.pt > 1:
-                self.setFontSize(self.pt - 1)
-
-        def wheelEvent(self, event):
-            if event.modifiers() == QtCore.Qt.ControlModifier:
-                delta = event.delta() if qt_backend==4 else event.angleDelta().y()
-                if delta > 1:
-                    self.zoom_in()
-                else:
-                    self.zoom_out()
-            else:
-                QtWidgets.QTableView.wheelEvent(self, event)
-
-        def closeEvent(self, event):
-            del TableView._views[self]
-            QtWidgets.QTableView.closeEvent(self, event)
-
-
-    def table(mat, title=None):
-        if QtWidgets.QApplication.instance() is None:
-            import sys
-            table.app = QtWidgets.QApplication(sys.argv)
-        table.seq += 1
-        if title is None:
-            title = 'Table %d '%table.seq
-        title += ' (%dx%d %s)'%(mat.shape+(mat.dtype.name,))
-
-        model = TableModel(mat)
-        view = TableView()
-        view.setMonospaceFont()
-        if np.iscomplexobj(mat):
-            view.chars *= 2
-        view.setAttribute(QtCore.Qt.WA_DeleteOnClose)
-        view.setModel(model)
-        view.setFontSize(8)
-        view.resize(600, 400)
-        view.setWindowTitle(title)
-        view.show()
-    table.seq = 0
-)";
+			splot_py = R"(""" + script + r""")";
 		} else {
-			splot_py = static_cast<std::stringstream&>(std::stringstream() << in.rdbuf()).str();
+			std::stringstream buffer;
+			buffer << in.rdbuf();
+			splot_py = buffer.str();
 		}
+		py_put_variable("_splot_gui", mode != queued);
 		py_code(splot_py.c_str());
+		render(mode);
+	}
+
+	static render_mode default_mode()
+	{
+		const std::string mode(std::getenv("SPLOT_MODE") ? std::getenv("SPLOT_MODE") : "");
+		if (mode == "queued")
+			return queued;
+		if (mode == "recorded")
+			return recorded;
+		return immediate;
+	}
+
+	static std::string default_file()
+	{
+		const char *filename = std::getenv("SPLOT_FILE");
+		return filename ? filename : "splot.pickle";
 	}
 
 	py_obj figure(const py_obj &figno)
@@ -523,6 +964,11 @@ else:
 		return py_call("show", {block});
 	}
 
+	py_obj savefig(const std::string &filename)
+	{
+		return py_call("savefig", {filename});
+	}
+
 	py_obj xlabel(const char *label)
 	{
 		return py_call("xlabel", {label});
@@ -576,13 +1022,13 @@ else:
 
 	py_obj imagesc(const arma_vec<double> &x, const arma_vec<double> &y, const arma_mat<double> &A, const kwargs_t &kwargs={})
 	{
-		if (x.v.empty() && y.v.empty())
+		if (x.empty() && y.empty())
 			return imagesc(A, kwargs);
-		if ((x.v.size() != 2 && x.v.size() != A.m.n_cols) || (y.v.size() != 2 && y.v.size() != A.m.n_rows))
+		if ((x.size() != 2 && x.size() != A.m.n_cols) || (y.size() != 2 && y.size() != A.m.n_rows))
 			return error("imagesc: length of x/y bounds must be 2 or matrix dimensions");
 
 		kwargs_t new_kwargs(kwargs);
-		new_kwargs["extent"] = {x.v[0], x.v[x.v.size()-1], y.v[0], y.v[y.v.size()-1]};
+		new_kwargs["extent"] = {x[0], x[x.size()-1], y[0], y[y.size()-1]};
 		return imagesc(A, new_kwargs);
 	}
 
@@ -593,10 +1039,10 @@ else:
 
 	py_obj imagesc(const arma_vec<double> &x, const arma_vec<double> &y, const arma_mat<double> &A, const arma_vec<double> &clims, const kwargs_t &kwargs={})
 	{
-		if (clims.v.empty())
+		if (clims.empty())
 			return imagesc(x, y, A, kwargs);
 
-		if (clims.v.size() != 2)
+		if (clims.size() != 2)
 			return error("imagesc: length of c bounds must be 2");
 
 		kwargs_t new_kwargs(kwargs);
@@ -715,3 +1161,63 @@ template <> int PyEngine::py_obj::npy_typenum<arma::cx_double>() { return NPY_CO
 
 #endif /* SPLOT_H_ */
 """
+
+
+def replay(filename, namespace=None):
+    """
+Render plot commands recorded by `SPlot.h` in recorded mode.
+
+Args:
+    filename (str): File written by the C++ program, see ``SPLOT_FILE``.
+    namespace (dict, optional): Plot functions by name.  Defaults to the
+        functions the C++ program would call, which requires matplotlib.
+
+Returns:
+    dict: Result of every command by its id.
+
+Example:
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), "splot.pickle")
+    >>> namespace = {"_splot_filename": filename}
+    >>> exec(recorder, namespace)
+    >>> ref = namespace["_splot_record"](1, None, "gci")
+    >>> ref = namespace["_splot_record"](2, ref, "set_cmap", "jet")
+    >>> class Image(object):
+    ...     def set_cmap(self, name):
+    ...         return "cmap " + name
+    >>> print replay(filename, {"gci": Image})[2]
+    cmap jet
+    """
+
+    if namespace is None:
+        namespace = {}
+        exec(script, namespace)
+
+    results = {}
+
+    def resolve(value):
+        if isinstance(value, tuple) and len(value) == 2:
+            if value[0] == "splot.ref":
+                return results[value[1]]
+            if value[0] == "splot.module":
+                return importlib.import_module(value[1])
+        return value
+
+    f = open(filename, "rb")
+    while True:
+        try:
+            id_, obj, name, args, kwargs = pickle.load(f)
+        except EOFError:
+            break
+
+        if obj is None:
+            func = namespace[name]
+        else:
+            func = getattr(resolve(obj), name)
+
+        args = [resolve(arg) for arg in args]
+        kwargs = dict((key, resolve(val)) for key, val in kwargs.items())
+        results[id_] = func(*args, **kwargs)
+    f.close()
+
+    return results
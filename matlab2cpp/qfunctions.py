@@ -367,6 +367,7 @@ See also:
     itypes = [i for i in itypes if supplement.includes.write_to_includes(i)]
 
     vtypes = supplement.verbatim.get(tree_)
+    iotypes = supplement.dataio.get(tree_)
     suggestions = supplement.suggests.get(tree_)
 
     #print "ITYPASDASDA"
@@ -375,7 +376,8 @@ See also:
     #print ".........;;;;;;;;-----"
     #itypes = [itype.split(os.path.sep)[-1] if ".hpp" in itype else itype for itype in itypes]
 
-    out = supplement.str_variables(ftypes, stypes, itypes, suggestions, prefix, vtypes)
+    out = supplement.str_variables(ftypes, stypes, itypes, suggestions, prefix,
+            vtypes, iotypes)
     out = out.replace("__percent__", "%")
 
     return out
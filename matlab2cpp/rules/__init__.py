@@ -96,17 +96,69 @@ These basic types are then glued together through the following:
 """
 
 import matlab2cpp as mc
-import glob
+import importlib
 import os
-sep = os.path.sep
 
-for name in glob.glob(os.path.dirname(__file__)+sep+"*.py"):
+# List of function names that should be handled by _reserved.py:
+reserved = {
+"and", "or", "not", "all", "any", "isequal",
+"false", "true", "pi", "inf", "Inf", "nan", "NaN",
+"eps", "exp", "log", "log2", "log10", "power", "floor", "ceil", "fix",
+"cos", "acos", "cosh", "acosh",
+"sin", "asin", "sinh", "asinh", "mod",
+"eye", "fliplr", "flipud", "length", "max", "min", "size", "chol",
+"trace", "transpose", "ctranspose",
+"abs", "sqrt", "nextpow2", "fft", "ifft", "fft2", "ifft2", "hankel",
+"zeros", "ones", "round", "return", "rand",
+"qr",
+"clear", "close", "clc", "clf", "more", "format",
+"_conv_to", "_reshape", "reshape",
+"interp1", "linspace", "varargin",
+"sum", "cumsum", "conj", "real", "imag",
+"tic", "toc", "diag", "tril", "triu",
+"disp", "fprintf", "fopen", "fclose", "fflush", "error", "convmtx", "conv2",
+"figure", "clf", "cla", "show", "xlabel", "ylabel", "hold", "load", "save",
+"title", "plot", "imshow", "imagesc", "wigb", "colorbar",
+"xlim", "ylim", "caxis", "axis", "grid", "subplot", "colormap",
+"_splot", "logspace", "find", "cell", "unique", "intersect", "isempty", "sortrows",
+}
 
-    name = name.split(sep)[-1]
-    if name != "__init__":
-        exec("import %s" % name[:-3])
+# rule modules available on disk, imported on first use through `get`
+available = set(os.path.splitext(name)[0]
+        for name in os.listdir(os.path.dirname(__file__))
+        if name[:1] == "_" and name[-3:] in (".py", "pyc"))
+available.discard("__init__")
+
+
+def get(backend):
+    """
+Retrieve the rule module for a backend, importing it on first use.
+
+Args:
+    backend (str): Name of backend (without leading underscore)
+
+Returns:
+    module: The rule module ``matlab2cpp.rules._<backend>``
+
+Raises:
+    KeyError: If no rule module exists for the backend
+
+Example:
+    >>> print get("int").__name__
+    matlab2cpp.rules._int
+    >>> get("nonexisting")
+    Traceback (most recent call last):
+        ...
+    KeyError: '_nonexisting'
+    """
+    name = "_" + backend
+    module = globals().get(name)
+    if module is None:
+        if name not in available:
+            raise KeyError(name)
+        module = importlib.import_module(__name__ + "." + name)
+    return module
 
-from _reserved import reserved
 
 if __name__ == "__main__":
     import doctest
@@ -1,4 +1,6 @@
 from variables import *
+import variables
+import matlab2cpp as mc
 
 def Cell(node):
 
@@ -8,15 +10,93 @@ def Cell(node):
 
     return "{", ",", "}"
 
+def Cvar(node):
+    "a{k}"
+
+    if mc.configure.datatypes.cell_element(node):
+
+        # element of Armadillo field
+        if mc.configure.datatypes.cell_fixed(node):
+            return "%(name)s(", "-1, ", "-1)"
+
+        # element of vector, grown on assignment
+        if len(node) == 1:
+            if node.parent.cls == "Assign" and node.parent[0] is node:
+                node.include("m2cpp")
+                return "m2cpp::element(%(name)s, ", "", ")"
+            return "%(name)s[", "", "-1]"
+
+    return variables.Cvar(node)
+
 def Assign(node):
+    """
+Assignment of cells.  The size of a cell literal is known, so the container is
+sized before the elements are inserted.  If all elements share a datatype and
+the cell never grows, it is an Armadillo `field` filled in place, otherwise the
+elements are appended to a reserved container.
+
+Examples:
+    >>> print mc.qscript("a = {1, 2; 3, 4}; b = a{2}")
+    a.set_size(2, 2) ;
+    a(0, 0) = 1 ;
+    a(0, 1) = 2 ;
+    a(1, 0) = 3 ;
+    a(1, 1) = 4 ;
+    b = a(1) ;
+    >>> print mc.qscript("a = {[1, 2], 'c'}")
+    sword __aux_irowvec_1 [] = {1, 2} ;
+    _aux_irowvec_1 = irowvec(__aux_irowvec_1, 2, false) ;
+    a.clear() ;
+    a.reserve(2) ;
+    a.emplace_back(std::move(_aux_irowvec_1)) ;
+    a.emplace_back("c") ;
+    >>> print mc.qscript("a = {1, 2}; a{end+1} = 3")
+    a.clear() ;
+    a.reserve(2) ;
+    a.emplace_back(1) ;
+    a.emplace_back(2) ;
+    m2cpp::element(a, a.size()+1) = 3 ;
+    """
+
+    lhs, rhs = node
 
     if node.name == 'varargin':
-        out = "%(0)s = va_arg(varargin, " + node[0].type + ") ;"
-    else:
-        out = "%(0)s.clear() ;"
+        return "%(0)s = va_arg(varargin, " + node[0].type + ") ;"
+
+    # b = a, b = a{k}
+    if rhs.cls != "Cell":
+        return "%(0)s = %(1)s ;"
+
+    elems = []
+    for elem in rhs:
+        value = str(elem)
+        if value[:5] == "_aux_":
+            value = "std::move(" + value + ")"
+        elems.append(value)
+
+    # typed field with known shape
+    if lhs.cls == "Var" and mc.configure.datatypes.cell_fixed(lhs):
+
+        rows = int(rhs.value or 1)
+        if len(elems) % rows:
+            rows = 1
+        cols = len(elems)//rows
+
+        if rows == 1:
+            out = "%(0)s.set_size(1, " + str(cols) + ") ;"
+            for i, value in enumerate(elems):
+                out += "\n%(0)s(" + str(i) + ") = " + value + " ;"
+        else:
+            out = "%(0)s.set_size(" + str(rows) + ", " + str(cols) + ") ;"
+            for i, value in enumerate(elems):
+                out += "\n%(0)s(" + str(i//cols) + ", " + str(i%cols) + \
+                        ") = " + value + " ;"
+        return out
+
+    out = "%(0)s.clear() ;\n%(0)s.reserve(" + str(len(elems)) + ") ;"
 
-        # append to cell, one by one
-        for elem in node[1]:
-            out = out + "\n%(0)s.push_back(" + str(elem) + ") ;"
+    # append to cell, one by one
+    for value in elems:
+        out = out + "\n%(0)s.emplace_back(" + value + ") ;"
 
     return out
@@ -9,6 +9,7 @@ import matlab2cpp as mc
 import argparse
 
 import parallel
+import hoist
 import os
 
 def Statement(node):
@@ -456,15 +457,79 @@ Examples:
     if not len(node):
         return "// Empty block"
 
-    out = str(node[0])
-    for child in node[1:]:
+    instrument = node.project.builder.instrument
+    if node.parent.cls not in ("Func", "Main") or \
+            node.parent.backend == "func_lambda":
+        instrument = None
+
+    children = []
+    for child in node:
+
+        # time top-level loops in own scope
+        if instrument == "loops" and child.cls in ("For", "Parfor", "While"):
+            name = child.cls.lower()
+            if child.cls != "While":
+                name = name + " " + child[0].name
+            children.append("{\n" + timer(child, name) + "\n" + str(child) + "\n}")
+
+        else:
+            children.append(str(child))
+
+    out = children[0]
+    for child, text in zip(node[1:], children[1:]):
         if child.cls == "Ecomment":
-            out = out + " " + str(child)
+            out = out + " " + text
         else:
-            out = out + "\n" + str(child)
+            out = out + "\n" + text
+
+    # time function body
+    if instrument:
+        out = timer(node.parent, node.parent.name) + "\n" + out
 
     return out
 
+def timer(node, name):
+    """
+Scoped timer for instrumentation.  The timing statistics are static, one per
+location, and are reported together with the Matlab file and line number when
+the program exits.
+
+Args:
+    node (Node): Function or loop to time
+    name (str): Label in the report
+
+Returns:
+    str : Timer declarations
+
+Examples:
+    >>> print mc.qcpp("for i=1:3; a; end", instrument="loops")
+    #include "mconvert.h"
+    #include <armadillo>
+    using namespace arma ;
+    <BLANKLINE>
+    int main(int argc, char** argv)
+    {
+      uword i ;
+      static m2cpp::timing _timing_("unamed", 1, "main") ;
+      m2cpp::scope_timer _timer_(_timing_) ;
+      {
+        static m2cpp::timing _timing_("unamed", 1, "for i") ;
+        m2cpp::scope_timer _timer_(_timing_) ;
+        for (i=1; i<=3; i++)
+        {
+          a ;
+        }
+      }
+      return 0 ;
+    }
+    """
+    node.include("m2cpp")
+    filename = os.path.basename(node.program.name)
+    filename = filename.replace("\\", "\\\\").replace('"', '\\"')
+    return 'static m2cpp::timing _timing_("%s", %d, "%s") ;\n' % \
+            (filename, node.line, name) + \
+            "m2cpp::scope_timer _timer_(_timing_) ;"
+
 def Assigns(node):
     """
 Multiple assignment
@@ -634,10 +699,22 @@ Examples:
       a ;
     }
     >>> print mc.qscript("for i=a; b")
-    for (int _i=0; _i<length(a); _i++)
     {
-      i = a[_i] ;
-      b ;
+      const int _i_n = length(a) ;
+      for (int _i=0; _i<_i_n; _i++)
+      {
+        i = a[_i] ;
+        b ;
+      }
+    }
+    >>> print mc.qscript("n = 4; for i=1:n; n = n-1; end")
+    n = 4 ;
+    {
+      const int _i_stop = n ;
+      for (i=1; i<=_i_stop; i++)
+      {
+        n = n-1 ;
+      }
     }
     """
     var, range = node[:2]
@@ -656,6 +733,24 @@ Examples:
         # <start>:<step>:<stop>
         elif len(range) == 3:
             start, step, stop = range
+
+        # bounds evaluated once, as in Matlab
+        declarations = []
+        if not (tbb and parallel_loop):
+            names = hoist.written(node)
+            for role in ("step", "stop"):
+                value = locals()[role]
+                if isinstance(value, str):
+                    continue
+                value, declaration = hoist.bound(node, value, role, names)
+                if role == "step":
+                    step = value
+                else:
+                    stop = value
+                if declaration:
+                    declarations.append(declaration)
+            declarations.extend(hoist.body(node, names))
+
         start, step, stop = map(str, [start, step, stop])
 
         if omp and parallel_loop:
@@ -686,7 +781,7 @@ Examples:
 
         out += ")\n{\n%(2)s\n}"
 
-        return out
+        return hoist.scope(declarations, out)
 
     # i = [1, 2, 3, 4]
     if len(node) == 3:
@@ -697,10 +792,13 @@ Examples:
 }
 """
     # default
-    return """for (int _%(0)s=0; _%(0)s<length(%(1)s); _%(0)s++)
+    return """{
+const int _%(0)s_n = length(%(1)s) ;
+for (int _%(0)s=0; _%(0)s<_%(0)s_n; _%(0)s++)
 {
 %(0)s = %(1)s[_%(0)s] ;
 %(2)s
+}
 }"""
 
 def Pragma_for(node):
@@ -1,5 +1,6 @@
 import matlab2cpp as mc
 from assign import Assign
+import armadillo as arma
 
 def Paren(node):
     """Parenthesis surounding expression.
@@ -23,7 +24,7 @@ Examples:
     # find context for what end refers to
     pnode = node
     while pnode.parent.cls not in \
-            ("Get", "Cget", "Nget", "Fget", "Sget",
+            ("Get", "Cget", "Nget", "Fget", "Sget", "Cvar",
             "Set", "Cset", "Nset", "Fset", "Sset", "Block"):
         pnode = pnode.parent
 
@@ -33,7 +34,13 @@ Examples:
         return "end"
 
     index = pnode.parent.children.index(pnode)
-    name = pnode = pnode.parent.name
+    name = pnode.parent.name
+
+    # last element of a cell
+    if pnode.parent.cls == "Cvar" and len(pnode.parent) == 1:
+        if mc.configure.datatypes.cell_fixed(pnode.parent):
+            return name + ".n_elem"
+        return name + ".size()"
 
     if len(node.group) == 1:
         if node.group.dim == 1:
@@ -161,6 +168,13 @@ Examples:
                 dim = 2
             elif child.dim == 1:
 
+                # inner product without the 1x1 temporary
+                if arma.lazy(node) and index == 2 and not c_flag and \
+                        arma.dot(node[0], child) is not None:
+                    out = arma.dot(node[0], child)
+                    dim = 0
+                    continue
+
                 out =  "arma::as_scalar(" + out + "*" + "%(" + sVal + ")s" + ")"
                 #pass
                 dim = 0
@@ -623,6 +637,13 @@ def Transpose(node):
     if not node.num:
         return "arma::strans(%(0)s)"
 
+    if arma.lazy(node):
+        if not node[0].dim:
+            return "%(0)s"
+        out = arma.trans(node)
+        if out:
+            return out
+
     """
     # colvec -> rowvec
     if node[0].dim == 1:
@@ -651,6 +672,13 @@ def Ctranspose(node):
     if not node.num:
         return "arma::trans(", "", ")"
 
+    if arma.lazy(node):
+        if not node[0].dim and node[0].mem < 4:
+            return "%(0)s"
+        out = arma.trans(node)
+        if out:
+            return out
+
     """
     # colvec -> rowvec
     if node[0].dim == 1:
@@ -673,7 +701,7 @@ Examples:
     >>> print mc.qscript("a = [1,2,3]; a(1:2:2)")
     sword _a [] = {1, 2, 3} ;
     a = irowvec(_a, 3, false) ;
-    arma::strans(a(m2cpp::span<uvec>(0, 2, 1))) ;
+    m2cpp::strided<irowvec>(a, 0, 2, 1) ;
     """
 
     # context: array argument (must always be uvec)
@@ -25,6 +25,7 @@ Var : Function call hidden as variable
 import matlab2cpp as mc
 
 from function import type_string
+from _structs import soa, alias
 from variables import Get
 from assign import Assign
 
@@ -123,6 +124,10 @@ Examples:
     # fill declares and structs
     for child in node[:]:
 
+        # references are declared where they are assigned
+        if alias(child):
+            continue
+
         type = type_string(child)
         
         if type not in declares:
@@ -152,13 +157,20 @@ Examples:
 
                 structs_ = node.program[3]
                 struct = structs_[structs_.names.index(v.name)]
-                size = struct[struct.names.index("_size")].value
-                out += "[%s]" % size
+                if not soa(struct):
+                    size = struct[struct.names.index("_size")].value
+                    out += "[%s]" % size
 
             out += ", "
 
         out = out[:-2] + " ;"
 
+    # memory mapped files are released with the variables
+    mapped = mc.supplement.dataio.mapped(node.func)
+    if mapped:
+        out += "\nm2cpp::mapping " + \
+                ", ".join(["_" + name + "_map" for name in mapped]) + " ;"
+
     return out[1:]
 
 
@@ -2,6 +2,7 @@ import re
 import matlab2cpp as mc
 import armadillo as arma
 from function import type_string
+from _structs import soa
 
 def add_indenting(text):
     """Add identing to text
@@ -80,6 +81,16 @@ def Project(node):
 
 def Program(node):
     arma.include(node)
+
+    # functions removed by dead function pruning
+    if node.prop.get("pruned"):
+        node.warning("Unreachable functions pruned: " +
+                ", ".join(node.prop["pruned"]))
+
+    # datatypes refined after configuration
+    for refined, msg in node.prop.get("refined") or []:
+        refined.warning(msg)
+
     return ""
 
 def Includes(node):
@@ -91,6 +102,11 @@ def Headers(node):
 
 def Header(node):
     func = node.program[1][node.program[1].names.index(node.name)]
+
+    # specialised overload, see configure.overloads
+    if "overload" in node.prop:
+        func = [func for func in node.program[1] if func.name == node.name
+                and func.prop.get("overload") == node.prop["overload"]][0]
     if func.backend == "func_return":
 
         # if -ref, -reference flag option
@@ -193,10 +209,18 @@ def Struct(node):
     name = "_"+node.name.capitalize()
     out = "struct " + name + "\n{"
 
+    # structure of arrays: every field is a vector
+    layout = soa(node)
+    if node.prop.get("layout") == "soa" and not layout:
+        node.warning("Struct array %(name)s kept as array of structs, "
+                "not all fields are numerical scalars")
+
     declares = {}
     for child in node[:]:
 
         type = child.type
+        if layout and child.cls != "Counter":
+            type = mc.datatype.get_name(1, child.mem)
         if type == "func_lambda":
             type == "std::function"
 
@@ -210,6 +234,13 @@ def Struct(node):
 
     for key, val in declares.items():
         out = out + "\n" + key + " " + ", ".join([str(v) for v in val]) + " ;"
+
+    if layout:
+        size = node[node.names.index("_size")].value
+        out = out + "\n" + name + "() : " + ", ".join(
+            [str(v) + "(" + size + ")" for v in node if v.cls != "Counter"]) +\
+            " {}"
+
     out = out + "\n} ;"
 
     # out = add_indenting(out)
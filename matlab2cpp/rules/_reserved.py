@@ -7,33 +7,14 @@ set of the various reserved words implemented into matlab2cpp.
 
 import matlab2cpp as mc
 
-# List of function names that should be handled by reserved.py:
-reserved = {
-"and", "or", "not", "all", "any", "isequal",
-"false", "true", "pi", "inf", "Inf", "nan", "NaN",
-"eps", "exp", "log", "log2", "log10", "power", "floor", "ceil", "fix",
-"cos", "acos", "cosh", "acosh",
-"sin", "asin", "sinh", "asinh", "mod",
-"eye", "fliplr", "flipud", "length", "max", "min", "size", "chol",
-"trace", "transpose", "ctranspose",
-"abs", "sqrt", "nextpow2", "fft", "ifft", "fft2", "ifft2", "hankel",
-"zeros", "ones", "round", "return", "rand",
-"qr",
-"clear", "close", "clc", "clf", "more", "format",
-"_conv_to", "_reshape", "reshape",
-"interp1", "linspace", "varargin",
-"sum", "cumsum", "conj", "real", "imag",
-"tic", "toc", "diag", "tril", "triu",
-"disp", "fprintf", "error", "convmtx", "conv2",
-"figure", "clf", "cla", "show", "xlabel", "ylabel", "hold", "load",
-"title", "plot", "imshow", "imagesc", "wigb", "colorbar",
-"xlim", "ylim", "caxis", "axis", "grid", "subplot", "colormap",
-"_splot", "logspace", "find", "unique", "intersect", "isempty", "sortrows",
-}
+# List of function names is kept in the rules package to allow lazy loading
+reserved = mc.rules.reserved
 
 # Common attribute
 
 from assign import Assign
+from function import type_string
+import armadillo as arma
 #Assign = "%(0)s = %(1)s ;"
 
 def Var(node):
@@ -514,6 +495,17 @@ def Get_min(node):
     # everything scalar
     if all([(n.dim < 1) for n in node]):
 
+        # compare scalars without wrapping them in matrices
+        if arma.lazy(node) and len(node) == 2:
+            if any([n.mem == 4 for n in node]):
+                node.include("m2cpp")
+                return "m2cpp::cx_min<cx_double>(", ", ", ")"
+            node.include("algorithm")
+            if node[0].mem != node[1].mem:
+                type_ = mc.datatype.get_name(0, max(node[0].mem, node[1].mem))
+                return "std::min<" + type_ + ">(", ", ", ")"
+            return "std::min(", ", ", ")"
+
         if any([n.mem == 4 for n in node]):
             node.include("m2cpp")
             nodes = map(str, node)
@@ -582,6 +574,17 @@ def Get_max(node):
     # everything scalar
     if all([(n.dim<1) for n in node]):
 
+        # compare scalars without wrapping them in matrices
+        if arma.lazy(node) and len(node) == 2:
+            if any([n.mem == 4 for n in node]):
+                node.include("m2cpp")
+                return "m2cpp::cx_max<cx_double>(", ", ", ")"
+            node.include("algorithm")
+            if node[0].mem != node[1].mem:
+                type_ = mc.datatype.get_name(0, max(node[0].mem, node[1].mem))
+                return "std::max<" + type_ + ">(", ", ", ")"
+            return "std::max(", ", ", ")"
+
         if any([n.mem == 4 for n in node]):
             node.include("m2cpp")
             nodes = map(str, node)
@@ -696,6 +699,13 @@ def Get_ones(node):
             if node.parent.cls == "Assign" and node.parent[0] != node:
                 out = "arma::ones<" + node.parent[0].type + ">("
                 return out, ", ", ")"
+
+            # size of the template variable directly, without auxiliary
+            if arma.lazy(node) and len(node[0]) == 1 and node[0][0].num \
+                    and node[0][0].dim:
+                type_ = mc.datatype.get_name(node[0][0].dim, node.mem)
+                return "arma::ones<" + type_ + ">(arma::size(" + \
+                        str(node[0][0]) + "))"
             #return "arma::ones<%(type)s>(", ", ", ")"
 
         #arg input is a scalar
@@ -745,6 +755,13 @@ def Get_zeros(node):
             if node.parent.cls == "Assign" and node.parent[0] != node:
                 out = "arma::zeros<" + node.parent[0].type + ">("
                 return out, ", ", ")"
+
+            # size of the template variable directly, without auxiliary
+            if arma.lazy(node) and len(node[0]) == 1 and node[0][0].num \
+                    and node[0][0].dim:
+                type_ = mc.datatype.get_name(node[0][0].dim, node.mem)
+                return "arma::zeros<" + type_ + ">(arma::size(" + \
+                        str(node[0][0]) + "))"
             #return "arma::zeros<%(type)s>(", ", ", ")"
 
         #arg input is a scalar
@@ -996,7 +1013,16 @@ def Get_sum(node):
     # second argument should be dim, matlab uses dim 1/2, and armadillo 0/1
     if len(node) == 2:
         return "arma::sum(", ", ", "-1)"
-    elif len(node) == 1 and node[0].dim == 2:
+
+    # accumulate directly instead of through a 1x1 temporary
+    if arma.lazy(node) and len(node) == 1:
+        if arg.dim in (1, 2):
+            if arg.backend == "reserved" and arg.name == "sum" and \
+                    len(arg) == 1 and arg[0].dim == 3:
+                return "arma::accu(" + str(arg[0]) + ")"
+            return "arma::accu(%(0)s)"
+
+    if len(node) == 1 and node[0].dim == 2:
         return "arma::as_scalar(arma::sum(%(0)s))"
     elif len(node) == 1 and node[0].dim == 1:
         return "arma::as_scalar(arma::sum(", ", ", "))"
@@ -1052,7 +1078,7 @@ def Get_toc(node):
         return "m2cpp::toc(" + arg + ")"
     
     node.include("iostream")
-    return 'std::cout << "Elapsed time = " << m2cpp::toc(' + arg + ') << std::endl'
+    return 'std::cout << "Elapsed time = " << m2cpp::toc(' + arg + ") << '\\n'"
 
 def Get_diag(node):
     if node.dim == 3:
@@ -1069,30 +1095,95 @@ def Var_disp(node):
     return "// disp"
 
 def Get_disp(node):
+    """
+Display a value.  Lines end with a newline character instead of `std::endl`,
+leaving flushing of the output to the stream buffer and explicit flush points.
+
+Examples:
+    >>> print mc.qscript("disp('hello')")
+    std::cout << "hello" << '\\n' ;
+    >>> print mc.qscript("a = [1, 2] ; disp(a)")
+    sword _a [] = {1, 2} ;
+    a = irowvec(_a, 2, false) ;
+    a.print() ;
+    """
     node.include("iostream")
     
     if len(node) == 1:
         arg = node[0]
         if not arg.num or arg.dim == 0:
-            return "std::cout << %(0)s << std::endl"
+            return "std::cout << %(0)s << '\\n'"
         else:
             return "%(0)s.print()"
     else:
         node.error("disp should take one argument")
-    return "std::cout << ", "<< ", " << std::endl"
+    return "std::cout << ", "<< ", " << '\\n'"
+
+def Get_fopen(node):
+    """
+Open file.  The identifier is an int as in Matlab, referring to a fully
+buffered file handle in the runtime.
+
+Examples:
+    >>> print mc.qscript("fid = fopen('a.txt', 'w') ; fclose(fid)")
+    fid = m2cpp::fopen("a.txt", "w") ;
+    m2cpp::fclose(fid) ;
+    """
+    node.include("m2cpp")
+    return "m2cpp::fopen(", ", ", ")"
+
+def Get_fclose(node):
+    node.include("m2cpp")
+    return "m2cpp::fclose(", ", ", ")"
+
+def Get_fflush(node):
+    node.include("m2cpp")
+    return "m2cpp::fflush(", ", ", ")"
 
 def Get_fprintf(node):
-    """ Matlab's fprintf can write to file and screen... this is translated to printf (so only printing to screen)
-    will give error if trying to write to file.
     """
+Formatted output.  Scalar output to screen is translated to `std::printf`.
+Writing to a file identifier, or formatting strings and arrays, goes through
+the runtime which follows Matlab's semantics: array arguments are flattened
+and the format is recycled until all values are written, producing the whole
+text in a single write.
+
+Examples:
+    >>> print mc.qscript("x = 3 ; fprintf('%d\\\\n', x)")
+    x = 3 ;
+    std::printf("%d\\n", x) ;
+    >>> print mc.qscript("a = [1, 2] ; fprintf('%d %d\\\\n', a)")
+    sword _a [] = {1, 2} ;
+    a = irowvec(_a, 2, false) ;
+    m2cpp::fprintf(1, "%d %d\\n", a) ;
+    >>> print mc.qscript("fid = fopen('a.txt', 'w') ; fprintf(fid, '%f\\\\n', 1.5)")
+    fid = m2cpp::fopen("a.txt", "w") ;
+    m2cpp::fprintf(fid, "%f\\n", 1.5) ;
+    """
+
+    if not len(node):
+        node.error("fprintf should take at least one argument")
+        return "std::printf(", ", ", ")"
+
+    # fprintf(fid, format, ...)
+    if node[0].type in ("int", "uword", "float", "double") and len(node) > 1:
+        node.include("m2cpp")
+        return "m2cpp::fprintf(", ", ", ")"
+
+    # arrays and strings
+    if any([arg.dim or arg.type == "string" for arg in node[1:]]):
+        node.include("m2cpp")
+        return "m2cpp::fprintf(1, ", ", ", ")"
+
     node.include("cstdio")
     return "std::printf(", ", ", ")"
 
 
 def Get_error(node):
+    # std::cerr is tied to std::cout, so writing an error flushes the output
     node.include("iostream")
 
-    return "std::cerr << ", "<< ", " << std::endl"
+    return "std::cerr << ", "<< ", " << '\\n'"
 
 def Get_convmtx(node):
     node.include("m2cpp")
@@ -1131,18 +1222,149 @@ def Get_hold(node):
 def Var_load(node):
     return Get_load(node)
 
+def load(node, name, filename):
+    """
+Load statement for the I/O backend selected for the file in the supplement
+(see :py:mod:`~matlab2cpp.supplement.dataio`).
+
+Args:
+    node (Get): The `load` call
+    name (str): Variable to load into
+    filename (str): Quoted file name
+
+Returns:
+    str: Translation
+
+Examples:
+    >>> print mc.qscript("a = load('data.bin')")
+    a.load("data.bin") ;
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(); a = load('data.bin'); b = load('raw.bin')")
+    >>> builder[0].ftypes = {"f" : {"a" : "mat", "b" : "vec"}}
+    >>> builder[0].iotypes = {"data.bin" : "mmap", "raw.bin" : "raw"}
+    >>> print mc.qscript(builder)
+    void f()
+    {
+      mat a ;
+      vec b ;
+      m2cpp::mapping _a_map ;
+      m2cpp::load_mapped(a, "data.bin", _a_map) ;
+      b.load("raw.bin", raw_binary) ;
+    }
+    >>> builder = mc.Builder()
+    >>> builder.load("g.m", "function a=g(); a = load('data.bin')")
+    >>> builder[0].ftypes = {"g" : {"a" : "mat"}}
+    >>> builder[0].iotypes = {"data.bin" : "mmap"}
+    >>> print mc.qscript(builder)
+    mat g()
+    {
+      mat a ;
+      m2cpp::load_direct(a, "data.bin") ;
+      return a ;
+    }
+    """
+    backend = mc.supplement.dataio.backend(node)
+
+    if backend == "binary":
+        return name + ".load(" + filename + ", arma_binary)"
+
+    if backend == "raw":
+        return name + ".load(" + filename + ", raw_binary)"
+
+    if backend in ("mmap", "direct"):
+        node.include("m2cpp")
+
+        # the mapping is declared with the variable, see Declares
+        if backend == "mmap":
+            target = mc.supplement.dataio.target(node)
+            if target in mc.supplement.dataio.mapped(node.func):
+                return "m2cpp::load_mapped(" + name + ", " + filename + \
+                        ", _" + target + "_map)"
+
+            # return values outlive the function, and the mapping with them
+            if target:
+                node.warning("Return value %s is not memory mapped" % target)
+            else:
+                node.warning("Unknown target is not memory mapped")
+
+        return "m2cpp::load_direct(" + name + ", " + filename + ")"
+
+    return name + ".load(" + filename + ")"
+
 def Get_load(node):
 
     out = "load " + node.code
     if len(node) == 1:
         if node[0].cls == "String":
             name = str(node[0].value).split(".")[0]
-            out = name + ".load(%(0)s)"
+            out = load(node, name, "%(0)s")
         else:
-            out = "%(0)s.load(\"" + node.value + "\")"
+            out = load(node, "%(0)s", "\"" + node.value + "\"")
 
     return out
 
+def Assign_load(node):
+    lhs, rhs = node
+    if len(rhs) != 1:
+        return "%(0)s = %(1)s ;"
+    return load(rhs, "%(0)s", str(rhs[0])) + " ;"
+
+def Get_save(node):
+    """
+Save variables to file.  Armadillo writes one variable per file, so when more
+than one variable is given, the variable name is added to the file name.
+
+Examples:
+    >>> print mc.qscript("a = [1, 2]; save out.bin a")
+    sword _a [] = {1, 2} ;
+    a = irowvec(_a, 2, false) ;
+    a.save("out.bin") ;
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(a, b); save('out.bin', 'a', 'b')")
+    >>> builder[0].ftypes = {"f" : {"a" : "mat", "b" : "vec"}}
+    >>> builder[0].iotypes = {"out.bin" : "mmap"}
+    >>> print mc.qscript(builder)
+    void f(mat a, vec b)
+    {
+      m2cpp::save_aligned(a, "out_a.bin") ;
+      m2cpp::save_aligned(b, "out_b.bin") ;
+    }
+    """
+    filename = mc.supplement.dataio.filename(node)
+    if node.value:
+        names = [str(var) for var in node]
+    else:
+        names = [var.value for var in node[1:] if var.cls == "String"]
+
+    if not filename or not names or len(names) != len(node)-(not node.value):
+        node.error("save only supported with file name and variable names")
+        return "save(", ", ", ")"
+
+    backend = mc.supplement.dataio.backend(node)
+    format = {"binary" : ", arma_binary", "raw" : ", raw_binary",
+            "direct" : ", arma_binary"}.get(backend, "")
+
+    # aligned for load_mapped
+    if backend == "mmap":
+        node.include("m2cpp")
+        save = lambda name, filename: \
+                "m2cpp::save_aligned(" + name + ", \"" + filename + "\")"
+    else:
+        save = lambda name, filename: \
+                name + ".save(\"" + filename + "\"" + format + ")"
+
+    if len(names) == 1:
+        return save(names[0], filename)
+
+    node.warning("One file per variable: " + ", ".join(names))
+    if "." in filename:
+        stem, ext = filename.rsplit(".", 1)
+        ext = "." + ext
+    else:
+        stem, ext = filename, ""
+
+    return " ;\n".join([save(name, stem + "_" + name + ext) for name in names])
+
 def Var_clf(node):
     return Get_clf(node)
 
@@ -1159,6 +1381,12 @@ def Get_cla(node):
 
 def Get_show(node):
     node.plotting()
+
+    # flush point: show blocks until the figures are closed
+    if node.parent.cls == "Statement":
+        node.include("iostream")
+        return "std::cout.flush() ;\n_plot.show(", ", ", ")"
+
     return "_plot.show(", ", ", ")"
 
 def Get_xlabel(node):
@@ -1437,8 +1665,69 @@ def Get_logspace(node):
     return "logspace<%(type)s>(", ", ", ")"
 
 def Get_find(node):
+    """
+Find indices.  Armadillo's indices are zero-based, so one is added, unless the
+result is only used for indexing.  Logical masks used as indices are passed to
+`find` directly.
+
+Examples:
+    >>> print mc.qscript("a = [1; 2]; b = find(a > 1); c = b(1)")
+    sword _a [] = {1, 2} ;
+    a = ivec(_a, 2, false) ;
+    b = find(a>1) + 1 ;
+    c = b(0) ;
+    >>> print mc.qscript("a = [1; 2]; b = find(a > 1); c = a(b)")
+    sword _a [] = {1, 2} ;
+    a = ivec(_a, 2, false) ;
+    b = find(a>1) ;
+    c = a(b) ;
+    >>> print mc.qscript("a = [1, 2]; c = a(find(a > 1)); d = a(a > 1)")
+    sword _a [] = {1, 2} ;
+    a = irowvec(_a, 2, false) ;
+    c = a(find(a>1)) ;
+    d = a(find(a>1)) ;
+    """
+
+    if arma.zero_based(node):
+        return "find(", ", ", ")"
+
+    parent = node.parent
+    if parent.cls == "Assign" and parent[1] is node and \
+            arma.index_only(parent[0]):
+        return "find(", ", ", ")"
+
     return "find(", ", ", ") + 1"
 
+def Get_cell(node):
+    """
+Preallocated cell.  If all elements share a datatype, the cell is an Armadillo
+`field` created with the final size, or a `std::vector` if it might grow.
+
+Examples:
+    >>> print mc.qscript("a = cell(2, 3); a{1} = 4.; a{2} = 5.")
+    a = field<double>(2, 3) ;
+    a(0) = 4. ;
+    a(1) = 5. ;
+    >>> print mc.qscript("a = cell(3); a{1} = 4.")
+    a = field<double>(3, 3) ;
+    a(0) = 4. ;
+    >>> print mc.qscript("a = cell(1, 2); a{5} = 4.")
+    a = std::vector<double>(1*2) ;
+    m2cpp::element(a, 5) = 4. ;
+    """
+    if node.parent.cls == "Assign" and node.parent[0].cls == "Var":
+        type = type_string(node.parent[0])
+        if type[:12] == "std::vector<":
+            if len(node) == 1:
+                return type + "(%(0)s*%(0)s)"
+            return type + "(", "*", ")"
+        if type != "cell":
+            if len(node) == 1:
+                return type + "(%(0)s, %(0)s)"
+            return type + "(", ", ", ")"
+
+    return "cell(", ", ", ")"
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
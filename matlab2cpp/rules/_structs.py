@@ -1,9 +1,126 @@
 #from assign import Assign
 from variables import *
+import variables
 import matlab2cpp as mc
+from function import type_string
 
 Declare = "struct %(name)s"
 
+def soa(struct):
+    """
+Check if a struct array is stored as a structure of arrays, i.e. the
+supplement sets ``"_layout" : "soa"`` for the struct and every field is
+a numerical scalar.  Each field is then stored in an Armadillo vector and
+``[a.val]`` refers to the vector directly.
+
+Args:
+    struct (Struct): Struct declaration in `program[3]`
+
+Returns:
+    bool: True if struct of arrays layout is used
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(); a(1).b = 4.; a(2).b = 5.; c = [a.b]")
+    >>> builder[0].stypes = {"a" : {"_size" : 10, "_layout" : "soa"}}
+    >>> builder.configure(suggest=True)
+    >>> print soa(builder[0][3][0])
+    True
+    >>> print mc.qhpp(builder)
+    #ifndef F_M_HPP
+    #define F_M_HPP
+    <BLANKLINE>
+    #include <armadillo>
+    using namespace arma ;
+    <BLANKLINE>
+    struct _A
+    {
+      vec b ;
+      _A() : b(10) {}
+    } ;
+    <BLANKLINE>
+    void f()
+    {
+      _A a ;
+      a.b(0) = 4. ;
+      a.b(1) = 5. ;
+      const vec& c = a.b ;
+    }
+    #endif
+    """
+    if struct is None or struct.prop.get("layout") != "soa":
+        return False
+    return all([var.num and var.dim == 0 for var in struct
+        if var.cls != "Counter"])
+
+def struct_of(node):
+    "Struct declaration a struct array field node belongs to, if any"
+    declare = node.declare
+    if declare is not node and declare.parent.cls == "Struct":
+        return declare.parent
+    return None
+
+def field_type(node):
+    "Vector type a struct of arrays field is stored in"
+    return mc.datatype.get_name(1, node.declare.mem)
+
+def alias(var):
+    """
+Assignment ``c = [a.val]`` from a struct of arrays field that `c` can refer to
+instead of copying.  This is the case when `c` has the type of the field
+vector, it is the only assignment to `c`, is not nested in a block, and
+neither `c` nor the struct array are changed afterwards.  The variable is then
+declared by the assignment as a `const` reference instead of at the top of the
+function.
+
+Args:
+    var (Node): Variable, or its declaration
+
+Returns:
+    Assign, None: The assignment, or None if `c` must be a copy
+    """
+
+    declare = var.declare
+    if not declare.num or declare.dim not in (1, 2) or not any(
+            [soa(struct) for struct in declare.program[3]]):
+        return None
+
+    func = declare.func
+    if func.cls != "Func" or declare.name in func[1].names or \
+            declare.name in func[2].names:
+        return None
+
+    nodes = func[3].flatten(False, False, False)
+    writes = []
+    for i, node in enumerate(nodes):
+
+        if node.cls in ("Assign", "Assigns"):
+            writes.extend([(i, target) for target in node[:-1]])
+
+        elif node.cls in ("For", "Parfor"):
+            writes.append((i, node[0]))
+
+    assigns = [(i, target.parent) for i, target in writes
+        if target.name == declare.name]
+    if len(assigns) != 1:
+        return None
+
+    position, assign = assigns[0]
+    lhs, rhs = assign[0], assign[-1]
+    if assign.cls != "Assign" or lhs.cls != "Var" or \
+            assign.parent is not func[3] or rhs.cls != "Matrix" or \
+            len(rhs) != 1 or len(rhs[0]) != 1 or rhs[0][0].cls != "Fvar" or \
+            not soa(struct_of(rhs[0][0])) or \
+            type_string(declare) != field_type(rhs[0][0]):
+        return None
+
+    # the reference would see later changes of the struct array
+    if any([i > position and target.name == rhs[0][0].name
+            for i, target in writes]):
+        return None
+
+    return assign
+
 def Counter(node):
     return "%(name)s = %(value)s"
 
@@ -16,6 +133,37 @@ def Fget(node):
 def Fset(node):
     return "%(name)s.%(value)s[", ", ", "-1]"
 
+def Fvar(node):
+
+    if soa(struct_of(node)):
+
+        # [a.val] is the field vector itself
+        if node.parent.cls == "Vector":
+            if len(node.parent) == 1 and len(node.parent.parent) == 1:
+                return "%(name)s.%(value)s"
+        return "%(name)s.%(value)s(0)"
+
+    return variables.Fvar(node)
+
+def Sset(node):
+
+    if soa(struct_of(node)):
+        node.pointer = 0
+        if len(node) == 1 and node[0].cls == "Int":
+            return "%(name)s.%(value)s(" + str(int(node[0].value)-1) + ")"
+        return "%(name)s.%(value)s(", ", ", "-1)"
+
+    return variables.Sset(node)
+
+def Sget(node):
+
+    if soa(struct_of(node)):
+        if len(node) == 1 and node[0].cls == "Int":
+            return "%(name)s.%(value)s(" + str(int(node[0].value)-1) + ")"
+        return "%(name)s.%(value)s(", ", ", "-1)"
+
+    return variables.Sget(node)
+
 def Matrix(node):
     if node.backend == "structs":
         if node[0].cls == "Vector":
@@ -23,30 +171,45 @@ def Matrix(node):
                 return "%(0)s"
     return "[", ", ", "]"
 
-"""def Assign(node):
+def Assign(node):
+    """
+Assignment from a struct array, e.g. ``b = [a.val]``.  With the default array
+of structs layout the field is copied element by element.  With the struct of
+arrays layout it is the field vector, referred to if possible (see
+:py:func:`alias`).  Targets of another type than the field vector, like
+a `rowvec`, are copied element by element as well.
+
+Example:
+    >>> print mc.qscript("a(1).b = 4.; a(2).b = 5.; c = [a.b]")
+    a[0].b = 4. ;
+    a[1].b = 5. ;
+    c.set_size(100) ;
+    for (int _i=0; _i<100; _i++)
+    {
+      c(_i) = a[_i].b ;
+    }
+    """
     lhs, rhs = node
-    print 'here'
-    # assign a my_var = [a.val], a is a structs, my_var should be a vec
-    if node[1].cls == "Matrix" and node[1].backend == "structs":
+
+    if rhs.cls == "Matrix" and len(rhs) == 1 and len(rhs[0]) == 1:
+
         element = rhs[0][0]
-        if element.backend == "structs":
-            size = rhs.str
-            var = lhs.name
-            name = element.name
-            value = element.value
-
-            declares = node.func[0]
-            if "_i" not in declares:
-                declare = mc.collection.Var(declares, "_i")
-                declare.type = "int"
-                declare.backend = "int"
-                declares.translate()
-            
-            string = var + ".resize(" + size + ") ;\n" +\
-                "for (_i=0; _i<" + size + "; ++_i)\n  "+\
-                var + "[_i] = " + name + "[_i]." + value + " ;"
-
-            return string
-
-    return "%(0)s = %(1)s"""""
+        struct = struct_of(element)
+
+        if element.cls == "Fvar" and struct is not None and (not soa(struct)
+                or type_string(lhs) != field_type(element)):
+
+            if soa(struct):
+                value = element.name + "." + element.value + "(_i)"
+            else:
+                value = element.name + "[_i]." + element.value
+
+            size = struct[struct.names.index("_size")].value
+            return "%(0)s.set_size(" + size + ") ;\n" +\
+                "for (int _i=0; _i<" + size + "; _i++)\n{\n" +\
+                "%(0)s(_i) = " + value + " ;\n}"
+
+        if alias(lhs) is node:
+            return "const " + type_string(lhs) + "& %(0)s = %(1)s ;"
 
+    return "%(0)s = %(1)s ;"
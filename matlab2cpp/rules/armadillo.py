@@ -4,6 +4,132 @@ filler for Armadillo
 
 import matlab2cpp as mc
 
+# relational and logical operators
+relational = ("Gt", "Ge", "Lt", "Le", "Eq", "Ne")
+logical = ("Band", "Bor", "Land", "Lor")
+
+
+def mask(node):
+    """
+Check if node is a logical array, like `a > t`, that can be used as an index.
+
+Args:
+    node (Node): Index argument
+
+Returns:
+    bool: True if relational or logical expression involving arrays
+
+Examples:
+    >>> tree = mc.build("a = [1, 2]; a(a > 1)", retall=False)
+    >>> x = [node for node in tree.flatten() if node.cls == "Gt"][0]
+    >>> print mask(x)
+    True
+    >>> print mask(x[1])
+    False
+    """
+
+    if node.cls in ("Paren", "Not"):
+        return mask(node[0])
+
+    if node.cls in logical:
+        return any([mask(n) for n in node])
+
+    if node.cls in relational:
+        return any([n.num and n.dim > 0 for n in node])
+
+    return False
+
+
+def indexes(node):
+    """
+Check if a node indexes a declared array variable, like `x(k)`, and not a
+call to a builtin or user function with the same syntax, like `cumsum(k)`.
+
+Args:
+    node (Node): Parent of an index argument
+
+Returns:
+    bool: True if array indexing
+    """
+
+    if node.cls not in ("Get", "Set") or node.backend in \
+            ("reserved", "func_return", "func_returns", "func_lambda"):
+        return False
+
+    declare = node.declare
+    return declare is not node and \
+            declare.parent.cls in ("Declares", "Params") and \
+            declare.num and declare.dim > 0
+
+
+def index_only(node):
+    """
+Check if a variable holds `find` results, which are only used as indices.
+Such variables keep the zero-based indices from Armadillo.
+
+Args:
+    node (Var): Index argument
+
+Returns:
+    bool: True if all assignments are `find` calls and all uses are indices
+    """
+
+    if node.cls != "Var" or node.type != "uvec":
+        return False
+
+    declare = node.declare
+    if declare is node or declare.parent.cls != "Declares":
+        return False
+
+    func = node.func
+    if declare.name in func[1].names:
+        return False
+
+    for var in func.flatten(False, False, False):
+
+        if var.name != declare.name or var is declare:
+            continue
+
+        # b(1), b.n_elem, ...
+        if var.cls != "Var":
+            return False
+
+        parent = var.parent
+
+        # k = find(...)
+        if parent.cls == "Assign" and parent[0] is var:
+            rhs = parent[1]
+            if rhs.cls != "Get" or rhs.name != "find" or len(rhs) != 1:
+                return False
+
+        # x(k)
+        elif len(parent) == 1 and indexes(parent):
+            pass
+
+        else:
+            return False
+
+    return True
+
+
+def zero_based(node):
+    """
+Check if an index argument is already zero-based.
+
+Args:
+    node (Node): Index argument
+
+Returns:
+    bool: True for `find` used directly as an index and for variables
+    satisfying :py:func:`index_only`.
+    """
+
+    if node.cls == "Get" and node.name == "find" and len(node) == 1:
+        return indexes(node.parent)
+
+    return index_only(node)
+
+
 def configure_arg(node, index):
     """
 Configure an argument of an vector, matrix or cube.
@@ -69,6 +195,10 @@ Examples:
 
         return "span(0, " + arg + "-1)", 1
 
+    # logical mask, x(a > t)
+    elif mask(node):
+        return "find(" + out + ")", 1
+
     # undefined type
     elif node.type == "TYPE":
         return out, -1
@@ -106,15 +236,262 @@ Examples:
 
         if len(node) > 0 and node[0].cls == "Paren":
             pass
+        elif zero_based(node):
+            pass
         elif node.cls not in ["Colon", "Paren"]:
             out = out + "-1"
 
     return out, dim
 
 
+def zero_index(node):
+    """Zero-based index from a one-based scalar index expression."""
+
+    if node.cls == "Int":
+        return str(int(node.value)-1)
+    if node.mem > 1 and node.dim == 0:
+        return "(uword) " + node.str + "-1"
+    return node.str + "-1"
+
+
+def range_arg(node):
+    """
+Zero-based bounds of an index argument that is a range with a constant
+positive step, like `a:b` or `a:2:b`.  Such ranges can be indexed as views into
+the array instead of through an index vector.
+
+Args:
+    node (Node): Index argument
+
+Returns:
+    tuple, None: First index, step and last index as strings, with step None
+    for unit step.  None if the argument is not such a range.
+
+Examples:
+    >>> tree = mc.build("a = zeros(9, 1); n = 4; a(2:n); a(1:2:9); a(9:-1:1)",
+    ...     retall=False)
+    >>> tree.translate()
+    >>> for node in tree.flatten():
+    ...     if node.cls == "Colon":
+    ...         print range_arg(node)
+    ('1', None, 'n-1')
+    ('0', '2', '8')
+    None
+    """
+
+    if node.cls != "Colon" or len(node) not in (2, 3):
+        return None
+
+    for bound in node:
+        if not bound.num or bound.dim != 0:
+            return None
+
+    if len(node) == 2:
+        return zero_index(node[0]), None, zero_index(node[1])
+
+    step = node[1]
+    if step.cls != "Int" or int(step.value) < 1:
+        return None
+
+    step = str(int(step.value))
+    if step == "1":
+        step = None
+
+    return zero_index(node[0]), step, zero_index(node[2])
+
+
+def index_kind(node, index):
+    """
+Classify an index argument for views into arrays.
+
+Args:
+    node (Node): Index argument
+    index (int): Argument index (starting from 0)
+
+Returns:
+    tuple, None: ``("all",)``, ``("scalar", index)``, ``("span", first,
+    last)`` or ``("stride", first, step, last)``.  None for index vectors and
+    unknown datatypes.
+    """
+
+    if node.cls == "All":
+        return ("all",)
+
+    range_ = range_arg(node)
+    if range_:
+        first, step, last = range_
+        if step is None:
+            return ("span", first, last)
+        return ("stride", first, step, last)
+
+    arg, dim = configure_arg(node, index)
+    if dim == 0:
+        return ("scalar", arg)
+
+    return None
+
+
+def span(kind):
+    """Armadillo span of a scalar, all or span index kind."""
+    if kind[0] == "all":
+        return "arma::span::all"
+    if kind[0] == "scalar":
+        return "arma::span(" + kind[1] + ")"
+    return "arma::span(" + kind[1] + ", " + kind[2] + ")"
+
+
+def strided(node, array, kind, dim):
+    """
+Strided elements of a vector, a matrix in linear order, or a row or column of
+a matrix, through `m2cpp::strided` when reading and `m2cpp::strided_view`
+when writing.
+
+Args:
+    node (Get, Set): The indexing node
+    array (str): The indexed array, vector, row or column
+    kind (tuple): The stride index kind from :py:func:`index_kind`
+    dim (int): Dimension of the result, 1 (colvec) or 2 (rowvec)
+
+Returns:
+    str: Translation of the index
+    """
+
+    node.include("m2cpp")
+    bounds = ", ".join(kind[1:])
+
+    if node.cls == "Set":
+        return "m2cpp::strided_view(" + array + ", " + bounds + ")"
+
+    mem = mc.datatype.get_mem(node.backend)
+    return "m2cpp::strided<" + mc.datatype.get_name(dim, mem) + ">(" + \
+            array + ", " + bounds + ")"
+
+
+def submatrix(node, name="%(name)s"):
+    """
+Index a matrix with two arguments as a view when both are scalars, all (`:`)
+or ranges, instead of gathering through index vectors.
+
+Args:
+    node (Get, Set): Matrix indexed with two arguments
+    name (str): The indexed matrix
+
+Returns:
+    str, None: Translation of the index, or None if index vectors are needed.
+
+Examples:
+    >>> print mc.qscript("A = zeros(4, 5); n = 4; b = A(3, 2:n); A(:, 1:2) = 1")
+    A = arma::zeros<mat>(4, 5) ;
+    n = 4 ;
+    b = A(2, arma::span(1, n-1)) ;
+    A.cols(0, 1).fill(1) ;
+    >>> print mc.qscript("A = zeros(4, 5); b = A(1:2:4, 2); A(1:2:4, 2) = 0")
+    A = arma::zeros<mat>(4, 5) ;
+    b = m2cpp::strided<vec>(A.col(1), 0, 2, 3) ;
+    m2cpp::strided_view(A.col(1), 0, 2, 3).fill(0) ;
+    """
+
+    kind0 = index_kind(node[0], 0)
+    kind1 = index_kind(node[1], 1)
+
+    if kind0 is None or kind1 is None:
+        return None
+
+    kinds = kind0[0], kind1[0]
+
+    if kinds == ("all", "all"):
+        return name
+    if kinds == ("all", "scalar"):
+        return name + ".col(" + kind1[1] + ")"
+    if kinds == ("scalar", "all"):
+        return name + ".row(" + kind0[1] + ")"
+    if kinds == ("all", "span"):
+        return name + ".cols(" + kind1[1] + ", " + kind1[2] + ")"
+    if kinds == ("span", "all"):
+        return name + ".rows(" + kind0[1] + ", " + kind0[2] + ")"
+    if kinds == ("scalar", "scalar"):
+        return name + "(" + kind0[1] + ", " + kind1[1] + ")"
+    if kinds == ("scalar", "span"):
+        return name + "(" + kind0[1] + ", " + span(kind1) + ")"
+    if kinds == ("span", "scalar"):
+        return name + "(" + span(kind0) + ", " + kind1[1] + ")"
+    if kinds == ("span", "span"):
+        return name + "(" + span(kind0) + ", " + span(kind1) + ")"
+
+    # strided row or column
+    if kinds == ("scalar", "stride"):
+        return strided(node, name + ".row(" + kind0[1] + ")", kind1, 2)
+    if kinds == ("stride", "scalar"):
+        return strided(node, name + ".col(" + kind1[1] + ")", kind0, 1)
+
+    return None
+
+
+def subcube(node, name="%(name)s"):
+    """
+Index a cube with three arguments as a view when all are scalars, all (`:`) or
+ranges.  A scalar slice reduces to indexing the matrix `slice(k)`.
+
+Args:
+    node (Get, Set): Cube indexed with three arguments
+    name (str): The indexed cube
+
+Returns:
+    str, None: Translation of the index, or None if index vectors are needed
+    or all indices are scalar.
+
+Examples:
+    >>> print mc.qscript("C = zeros(3, 3, 3); b = C(:, :, 2); c = C(1, 2, :)")
+    C = arma::zeros<cube>(3, 3, 3) ;
+    b = C.slice(1) ;
+    c = C.tube(0, 1) ;
+    >>> print mc.qscript("C = zeros(3, 3, 3); C(:, :, 1:2) = 0")
+    C = arma::zeros<cube>(3, 3, 3) ;
+    C.slices(0, 1).fill(0) ;
+    """
+
+    kinds = [index_kind(node[i], i) for i in (0, 1, 2)]
+
+    if None in kinds:
+        return None
+
+    names = tuple([kind[0] for kind in kinds])
+
+    if names == ("scalar", "scalar", "scalar"):
+        return None
+
+    if names[2] == "scalar":
+        return submatrix(node, name + ".slice(" + kinds[2][1] + ")")
+
+    if names == ("all", "all", "span"):
+        return name + ".slices(" + kinds[2][1] + ", " + kinds[2][2] + ")"
+
+    if names == ("scalar", "scalar", "all"):
+        return name + ".tube(" + kinds[0][1] + ", " + kinds[1][1] + ")"
+
+    if "stride" in names:
+        return None
+
+    return name + "(" + ", ".join([span(kind) for kind in kinds]) + ")"
+
+
 def scalar_assign(node):
     """
 convert scalar to various array types
+
+Masked assignment is done in place without creating an index vector, using
+`replace` when the mask compares the array itself to a scalar.
+
+Examples:
+    >>> print mc.qscript("a = [1., 2.]; a(a == 2) = 3")
+    double _a [] = {1., 2.} ;
+    a = rowvec(_a, 2, false) ;
+    a.replace(2, 3) ;
+    >>> print mc.qscript("a = [1., 2.]; b = a; a(b > 1) = 0")
+    double _a [] = {1., 2.} ;
+    a = rowvec(_a, 2, false) ;
+    b = a ;
+    m2cpp::mask_fill(a, b>1, 0) ;
     """
 
     # left-hand-side and right-hand-side
@@ -130,6 +507,28 @@ convert scalar to various array types
     else:
         rhs = "%(1)s"
 
+    # x(mask) = scalar, x(find(mask)) = scalar
+    index = lhs.cls == "Set" and len(lhs) == 1 and lhs[0]
+    if index and index.cls == "Get" and index.name == "find" and len(index) == 1:
+        index = index[0]
+
+    if index and mask(index):
+
+        while index.cls == "Paren":
+            index = index[0]
+
+        # x(x == a) = b
+        if index.cls == "Eq":
+            for i in (0, 1):
+                var, value = index[i], index[1-i]
+                if var.cls == "Var" and var.name == lhs.name and \
+                        value.num and value.dim == 0:
+                    return lhs.name + ".replace(" + value.str + ", " + rhs + ") ;"
+
+        node.include("m2cpp")
+        return "m2cpp::mask_fill(" + lhs.name + ", " + index.str + ", " + \
+                rhs + ") ;"
+
     if lhs.cls == "Set":
         return "%(0)s.fill(" + rhs + ") ;"
 
@@ -163,6 +562,132 @@ convert scalar to various array types
     return "%(0)s = " + rhs + " ;"
 
 
+def lazy(node):
+    """
+Check if expressions should be kept as Armadillo delayed-evaluation objects.
+
+With the `lazy` option of :py:class:`~matlab2cpp.Builder` (`m2cpp --lazy`),
+rules prefer `accu`, `dot`, `.t()` and scalar functions over forms that force
+a temporary, like `as_scalar(sum(...))`, `as_scalar(a*b)` and `strans(...)`.
+
+Args:
+    node (Node): Location in tree
+
+Returns:
+    bool: True if lazy forms are preferred
+    """
+    return node.project.builder.lazy
+
+
+def transposed(node):
+    """
+Operand of a transpose, looking through parenthesis.
+
+Args:
+    node (Node): Expression
+
+Returns:
+    Node: The transposed operand, or None if `node` is not a transpose.
+    """
+
+    while node.cls == "Paren":
+        node = node[0]
+
+    if node.cls in ("Transpose", "Ctranspose") and node[0].num:
+        return node[0]
+    return None
+
+
+def trans(node):
+    """
+Transpose as `.t()`, which Armadillo folds into products and assignments.
+`.st()` is used for simple transposes of complex values.
+
+Args:
+    node (Transpose, Ctranspose): The transpose
+
+Returns:
+    str: Translation, or None if the operand is not an array
+
+Examples:
+    >>> print mc.qscript("A = rand(3,3); x = [1.;2.;3.]; y = A.'*x", lazy=True)
+    A = arma::randu<mat>(3, 3) ;
+    double _x [] = {1., 2., 3.} ;
+    x = vec(_x, 3, false) ;
+    y = A.t()*x ;
+    >>> print mc.qscript("x = [1.;2.;3.]; z = x*1i; y = (z').'", lazy=True)
+    double _x [] = {1., 2., 3.} ;
+    x = vec(_x, 3, false) ;
+    z = x*cx_double(0, 1) ;
+    y = arma::conj(z) ;
+    """
+
+    operand = node[0]
+    if not operand.num or not operand.dim:
+        return None
+
+    # double transpose cancels out
+    inner = transposed(operand)
+    if inner is not None and inner.dim:
+        if node.cls == transposed_cls(operand) or inner.mem < 4:
+            return str(inner)
+        return "arma::conj(" + str(inner) + ")"
+
+    text = str(operand)
+    if operand.cls not in ("Var", "Get", "Paren"):
+        text = "(" + text + ")"
+
+    if node.cls == "Transpose" and operand.mem == 4:
+        return text + ".st()"
+    return text + ".t()"
+
+
+def transposed_cls(node):
+    """Class of the transpose below parenthesis."""
+    while node.cls == "Paren":
+        node = node[0]
+    return node.cls
+
+
+def dot(left, right):
+    """
+Inner product of a row vector and a column vector as `dot` (or `cdot` if the
+row vector is a complex conjugate transpose), without the 1x1 temporary of
+`as_scalar(a*b)`.  Products of complex and real vectors are left to
+`as_scalar`, as `cdot` needs two complex operands.
+
+Args:
+    left (Node): Row vector operand
+    right (Node): Column vector operand
+
+Returns:
+    str, None: Translation of the product, or None if not supported
+
+Examples:
+    >>> print mc.qscript("x = [1.;2.;3.]; s = x'*x", lazy=True)
+    double _x [] = {1., 2., 3.} ;
+    x = vec(_x, 3, false) ;
+    s = arma::dot(x, x) ;
+    >>> print mc.qscript("z = [1.+1i;2.]; w = [1.;2.]; s = z'*w", lazy=True)
+    cx_double _z [] = {cx_double(1., 0)+cx_double(0, 1), 2.} ;
+    z = cx_vec(_z, 2, false) ;
+    double _w [] = {1., 2.} ;
+    w = vec(_w, 2, false) ;
+    s = arma::as_scalar(z.t()*w) ;
+    """
+
+    if left.mem != right.mem and 4 in (left.mem, right.mem):
+        return None
+
+    inner = transposed(left)
+    if inner is not None and inner.dim == 1:
+        if transposed_cls(left) == "Ctranspose" and inner.mem == 4:
+            return "arma::cdot(" + str(inner) + ", " + str(right) + ")"
+        return "arma::dot(" + str(inner) + ", " + str(right) + ")"
+
+    return "arma::dot(" + str(left) + ", " + str(right) + ")"
+
+
 def include(node):
     """Add armadillo to header"""
 
@@ -67,6 +67,11 @@ def Get(node):
         if -1 in (dim0, dim1, dim2):
             return "%(name)s(", "-1, ", "-1)"
 
+        # slices, tubes and ranges as views
+        view = arma.subcube(node)
+        if view is not None:
+            return view
+
         # Configure dimensions
         #if dim0:
         #    if dim1:
@@ -159,6 +164,11 @@ def Set(node):
         if -1 in (dim0, dim1, dim2):
             return "%(name)s(", ", ", ")"
 
+        # slices, tubes and ranges as views
+        view = arma.subcube(node)
+        if view is not None:
+            return view
+
         # Configure dimensions
         #if dim0:
         #    if dim1:
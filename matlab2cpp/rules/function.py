@@ -19,6 +19,13 @@ equivalent C++ declarations.
 +-----------------+-----------------------+
 | string          | std::string           |
 +-----------------+-----------------------+
+| cell            | field<...> or         |
+|                 | std::vector<...> if   |
+|                 | elements share a type |
++-----------------+-----------------------+
+| constant shape  | mat::fixed<3,3>,      |
+|                 | vec::fixed<4>, ...    |
++-----------------+-----------------------+
 
 Args:
     node (Node): location in tree
@@ -71,6 +78,20 @@ Returns:
     elif node.type == "string":
         return "std::string"
 
+    # cell with common element type, growing cells in a vector
+    elif node.type == "cell":
+        type = mc.configure.datatypes.cell_element(node)
+        if type == "string":
+            type = "std::string"
+        if type and mc.configure.datatypes.cell_fixed(node):
+            return "field<" + type + ">"
+        if type:
+            return "std::vector<" + type + ">"
+
+    # vector or matrix of constant size
+    elif node.num and node.shape:
+        return mc.datatype.fixed_type(node.type, node.shape)
+
     return node.type
 
 if __name__ == "__main__":
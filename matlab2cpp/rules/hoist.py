@@ -0,0 +1,236 @@
+"""
+Hoisting of loop bounds and loop-invariant expressions out of for-loops.
+
+Matlab evaluates the range of a for-loop once, before the first iteration,
+while the condition of a C++ for-loop is evaluated on every iteration.  Bounds
+that call functions, or refer to variables that the loop body changes, are
+therefore bound to `const` locals in a scope around the loop.  In the same
+scope, scalar expressions in the body that only call side-effect free library
+functions on variables the loop never writes are computed once.
+
+Example:
+    >>> print mc.qscript("x = [1., 2.]; for i=1:length(x); y = x(i)/sum(x); end")
+    double _x [] = {1., 2.} ;
+    x = rowvec(_x, 2, false) ;
+    {
+      const uword _i_stop = m2cpp::length(x) ;
+      const double _i_inv1 = arma::as_scalar(arma::sum(x)) ;
+      for (i=1; i<=_i_stop; i++)
+      {
+        y = x(i-1)/_i_inv1 ;
+      }
+    }
+"""
+
+import matlab2cpp as mc
+
+# library functions without side effects, safe to call before the loop
+PURE = {"numel", "length", "size", "sum", "prod", "mean", "norm", "sqrt",
+        "exp", "log", "log2", "log10", "abs", "floor", "ceil", "round", "fix",
+        "sin", "cos", "tan", "atan2", "power", "mod", "rem"}
+
+# nodes allowed in a hoisted expression
+EXPRESSIONS = {"Int", "Float", "Var", "Get", "Paren", "Neg", "Plus", "Minus",
+        "Mul", "Elmul", "Div", "Eldiv", "Exp", "Elexp"}
+
+# backends of variables that are function calls
+CALLS = {"reserved", "func_return", "func_returns", "func_lambda"}
+
+# writes to a variable
+TARGETS = {"Var", "Set", "Cset", "Fset", "Sset", "Nset", "Cvar", "Fvar"}
+
+
+def written(node):
+    """
+Names of the variables assigned anywhere below a node, including loop
+variables.
+
+Args:
+    node (Node): Loop or block
+
+Returns:
+    set: Variable names
+    """
+
+    names = set()
+    for child in node.flatten(False, False, False):
+
+        if child.cls == "Assign" and child[0].cls in TARGETS:
+            names.add(child[0].name)
+
+        elif child.cls == "Assigns":
+            for target in child[:-1]:
+                if target.cls in TARGETS:
+                    names.add(target.name)
+
+        elif child.cls in ("For", "Parfor"):
+            names.add(child[0].name)
+
+    return names
+
+
+def invariant(node, names):
+    """
+Check if an expression has the same value in every iteration of a loop.
+
+Args:
+    node (Node): Expression in the loop
+    names (set): Variables written in the loop, see :py:func:`written`
+
+Returns:
+    bool: True if the expression only consists of literals, variables not
+    in `names`, arithmetic and calls to functions in `PURE`.
+    """
+
+    for child in node.flatten(False, False, False):
+
+        if child.cls not in EXPRESSIONS:
+            return False
+
+        if child.cls == "Var" and (child.name in names or not child.num):
+            return False
+
+        # function calls without parenthesis
+        if child.cls == "Var" and child.backend in CALLS:
+            return False
+
+        if child.cls == "Get" and (child.backend != "reserved" or
+                child.name not in PURE):
+            return False
+
+    return True
+
+
+def bound(node, expr, role, names):
+    """
+Bind a loop bound to a `const` local if it might change or is costly to
+evaluate.  Literals, variables the loop does not write and arithmetic on them
+are left in the loop condition.
+
+Args:
+    node (For): The loop
+    expr (Node): Step or stop of the loop range
+    role (str): ``"step"`` or ``"stop"``
+    names (set): Variables written in the loop
+
+Returns:
+    tuple: The bound as it is used in the loop condition, and its declaration
+    (None if not hoisted).
+
+Example:
+    >>> print mc.qscript("for i=1:n-1; a; end")
+    for (i=1; i<=n-1; i++)
+    {
+      a ;
+    }
+    """
+
+    text = str(expr)
+
+    for child in expr.flatten(False, False, False):
+
+        # function calls and indexing
+        if child.cls not in EXPRESSIONS or child.cls == "Get":
+            break
+
+        if child.cls == "Var" and (child.name in names or
+                child.backend in CALLS):
+            break
+
+    else:
+        return text, None
+
+    name = "_" + node[0].name + "_" + role
+    return name, "const " + declared(expr) + " " + name + " = " + text + " ;"
+
+
+def declared(node):
+    """Datatype of a hoisted scalar."""
+    if node.num and node.dim == 0 and node.type != "TYPE":
+        return node.type
+    return "auto"
+
+
+def body(node, names):
+    """
+Bind loop-invariant scalar expressions in a loop body to `const` locals.  The
+translation of each hoisted expression is replaced by its local, and the
+statements containing it are translated again.  Nested for-loops hoist their
+own expressions.
+
+Args:
+    node (For): The loop
+    names (set): Variables written in the loop
+
+Returns:
+    list: Declarations of the hoisted expressions
+    """
+
+    block = node[-1]
+    hoisted = []
+    stack = list(reversed(block.children))
+
+    while stack:
+        child = stack.pop()
+
+        if child.cls in ("For", "Parfor"):
+            continue
+
+        text = child.str
+        if child.cls in EXPRESSIONS and child.num and child.dim == 0 and \
+                "(" in text and "%" not in text and \
+                child.cls not in ("Int", "Float", "Var") and \
+                invariant(child, names) and \
+                any([n.cls == "Get" for n in child.flatten(False, False, False)]):
+
+            # assignment targets are not values
+            if not (child.parent.cls == "Assign" and child.parent[0] is child):
+                hoisted.append((declared(child), text, child))
+                continue
+
+        stack.extend(reversed(child.children))
+
+    declarations = []
+    local = {}
+    parents = []
+    for type_, text, child in hoisted:
+
+        if text not in local:
+            local[text] = "_" + node[0].name + "_inv" + str(len(local)+1)
+            declarations.append("const " + type_ + " " + local[text] +
+                    " = " + text + " ;")
+        child.str = local[text]
+
+        # statements containing the expression
+        parent = child.parent
+        while parent is not node:
+            if not any([parent is other for other in parents]):
+                parents.append(parent)
+            parent = parent.parent
+
+    # every node is translated again after its children
+    parents.sort(key=depth, reverse=True)
+    for parent in parents:
+        parent.translate(only=True)
+
+    return declarations
+
+
+def depth(node):
+    """Number of ancestors of a node."""
+    count = 0
+    while node.parent is not node and node.cls != "Project":
+        node, count = node.parent, count+1
+    return count
+
+
+def scope(declarations, loop):
+    """Loop with its hoisted declarations in an enclosing scope."""
+    if not declarations:
+        return loop
+    return "{\n" + "\n".join(declarations) + "\n" + loop + "\n}"
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
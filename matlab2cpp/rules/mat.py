@@ -33,6 +33,11 @@ def Get(node):
         if dim == -1:
             return "%(name)s(%(0)s-1)"
 
+        # a(1:2:n), linear order
+        range_ = arma.range_arg(node[0])
+        if range_ and range_[1]:
+            return arma.strided(node, "%(name)s", ("stride",)+range_, 2)
+
         # scalar begets scalar
         #if dim == 0:
         #    node.dim = 0
@@ -49,6 +54,11 @@ def Get(node):
         if -1 in (dim0, dim1):
             return "%(name)s(", "-1, ", "-1)"
 
+        # scalars, all and ranges as views
+        view = arma.submatrix(node)
+        if view is not None:
+            return view
+
         # Configure dimensions
         #if dim0:
         #    if dim1:
@@ -140,6 +150,11 @@ def Set(node):
         if dim == -1:
             return "%(name)s(", "-1, ", "-1)"
 
+        # a(1:2:n) = ..., linear order
+        range_ = arma.range_arg(node[0])
+        if range_ and range_[1]:
+            return arma.strided(node, "%(name)s", ("stride",)+range_, 2)
+
         return "%(name)s(" + arg + ")"
 
 
@@ -153,6 +168,11 @@ def Set(node):
         if -1 in (dim0, dim1):
             return "%(name)s(", "-1, ", "-1)"
 
+        # scalars, all and ranges as views
+        view = arma.submatrix(node)
+        if view is not None:
+            return view
+
         # Configure dimensions
         #if dim0:
         #    if dim1:
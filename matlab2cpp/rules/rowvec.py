@@ -42,6 +42,11 @@ def Get(node):
     #if dim == 0:
     #    node.dim = 0
 
+    # a(1:2:n)
+    range_ = arma.range_arg(node_)
+    if range_ and range_[1]:
+        return arma.strided(node, "%(name)s", ("stride",)+range_, 2)
+
     # a(uvec array) or a(1:2:5)
     if (node[0].type == "uvec" and node[0].cls == "Var") or \
         node[0].cls == "Colon" and len(node[0]) == 3:
@@ -75,4 +80,9 @@ def Set(node):
     if dim == -1:
         return "%(name)s(", "-1, ", "-1)"
 
+    # a(1:2:n) = ...
+    range_ = arma.range_arg(node_)
+    if range_ and range_[1]:
+        return arma.strided(node, "%(name)s", ("stride",)+range_, 2)
+
     return "%(name)s(" + arg + ")"
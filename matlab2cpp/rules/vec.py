@@ -40,6 +40,11 @@ def Get(node):
     #if dim == 0:
     #    node.dim = 0
 
+    # a(1:2:n)
+    range_ = arma.range_arg(node[0])
+    if range_ and range_[1]:
+        return arma.strided(node, "%(name)s", ("stride",)+range_, 1)
+
     return "%(name)s(" + arg + ")"
     """
     elif len(node) == 2:
@@ -80,4 +85,9 @@ def Set(node):
     #if dim == 0:
     #    node.dim = 0
 
+    # a(1:2:n) = ...
+    range_ = arma.range_arg(node[0])
+    if range_ and range_[1]:
+        return arma.strided(node, "%(name)s", ("stride",)+range_, 1)
+
     return "%(name)s(" + arg + ")"
@@ -0,0 +1,246 @@
+"""
+Long running translation server for build system integration.
+
+Started through ``m2cpp --serve``.  The server reads requests from `stdin` and
+writes responses to `stdout`, one JSON object per line.  Since the interpreter,
+the imported rule modules and the content of already read Matlab files are kept
+in memory between requests, each translation only pays for the work specific
+to it.
+
+Requests:
+
++--------------------------------------------+--------------------------------+
+| Request                                    | Description                    |
++============================================+================================+
+| ``{"id": 1, "filename": "f.m"}``           | Translate file and the files   |
+|                                            | it depends on                  |
++--------------------------------------------+--------------------------------+
+| ``{"id": 2, "code": "a = 1"}``             | Translate code string          |
++--------------------------------------------+--------------------------------+
+| ``{"id": 3, "command": "stats"}``          | Request latency metrics        |
++--------------------------------------------+--------------------------------+
+| ``{"id": 4, "command": "shutdown"}``       | Stop the server                |
++--------------------------------------------+--------------------------------+
+
+Translate requests accept an optional ``"options"`` object with the long names
+of the `m2cpp` flags, e.g. ``{"suggest": true, "reference": true}``.  Options
+not given are taken from the command line the server was started with.
+
+A translate response contains the content of the files `m2cpp` would have
+written, without writing them::
+
+    {"id": 1, "time": 12.5, "files": {"f.m": {"cpp": "...", "hpp": "...",
+     "py": "...", "log": "..."}}}
+
+Failing requests are answered with ``{"id": 1, "error": "..."}``.
+"""
+
+import os
+import sys
+import copy
+import argparse
+import json
+import time
+import traceback
+
+import matlab2cpp as mc
+
+# flags that can be set per request and their defaults
+OPTIONS = mc.OPTIONS
+
+
+class Server(object):
+    """
+Translation server keeping state between requests.
+
+Example:
+    >>> server = Server()
+    >>> response = server.handle({"id": 1, "code": "a = 4",
+    ...     "options": {"suggest": True}})
+    >>> print response["files"]["unnamed"]["cpp"].split("\\n", 2)[-1]
+    #include <armadillo>
+    using namespace arma ;
+    <BLANKLINE>
+    int main(int argc, char** argv)
+    {
+      int a ;
+      a = 4 ;
+      return 0 ;
+    }
+    >>> print server.handle({"id": 2, "code": "a**b"})["error"].split("\\n")[0]
+    SyntaxError: File: unnamed, line 1 in Matlab code:
+    >>> print server.handle({"id": 3, "command": "stats"})["requests"]
+    2
+    """
+
+    def __init__(self, args=None):
+        """
+Args:
+    args (ArgumentParser, optional): Default arguments parsed through m2cpp
+        """
+        self.args = argparse.Namespace(disp=False, **OPTIONS)
+        if args is not None:
+            self.args.__dict__.update(vars(args))
+        self.sources = {}
+        self.latencies = []
+        self.errors = 0
+        self.running = True
+
+    def read(self, filename):
+        """
+Read Matlab file through cache.  The content is reused as long as the
+modification time of the file is unchanged.
+        """
+        mtime = os.path.getmtime(filename)
+        if filename in self.sources and self.sources[filename][0] == mtime:
+            return self.sources[filename][1]
+
+        code = mc.read_file(filename)
+        self.sources[filename] = (mtime, code)
+        return code
+
+    def options(self, request):
+        """Combine server arguments with request options."""
+        args = copy.copy(self.args)
+        args.disp = False
+        for key, value in request.get("options", {}).items():
+            if key not in OPTIONS:
+                raise KeyError("unknown option '%s'" % key)
+            setattr(args, key, value)
+        return args
+
+    def translate(self, request):
+        """Perform a translation request and return the file contents."""
+
+        args = self.options(request)
+
+        builder = mc.Builder(disp=False, comments=args.comments,
+                original=args.original, enable_omp=args.enable_omp,
+                enable_tbb=args.enable_tbb, reference=args.reference,
+                instrument=args.instrument, lazy=args.lazy,
+                fixed_size=args.fixed_size, specialise=args.specialise)
+
+        if "filename" in request:
+            args.filename = os.path.abspath(request["filename"])
+            if not os.path.isfile(args.filename):
+                raise IOError("File '" + request["filename"] + "' not found")
+            mc.load(builder, args, read=self.read)
+        else:
+            builder.load(request.get("name", "unnamed"), request["code"])
+
+        builder = mc.convert(builder, args)
+
+        files = {}
+        for name, content in mc.generate(builder, reset=args.reset):
+            files[os.path.basename(name)] = dict(
+                    (ext[1:], text) for ext, text in content.items())
+        return {"files": files}
+
+    def stats(self):
+        """Latency metrics over all translation requests (in milliseconds)."""
+        latencies = sorted(self.latencies)
+        n = len(latencies)
+        out = {"requests": n, "errors": self.errors,
+                "cached_files": len(self.sources)}
+        if n:
+            out.update({
+                "total": sum(latencies),
+                "mean": sum(latencies)/n,
+                "min": latencies[0],
+                "median": latencies[n//2],
+                "p95": latencies[min(n-1, int(n*.95))],
+                "max": latencies[-1],
+            })
+        return out
+
+    def handle(self, request):
+        """
+Handle a single request.
+
+Args:
+    request (dict): Decoded request
+
+Returns:
+    dict: Response to be encoded
+        """
+        request = mc.supplement.loader.encode(request)
+        command = request.get("command", "translate")
+
+        if command == "stats":
+            response = self.stats()
+
+        elif command == "shutdown":
+            self.running = False
+            response = {}
+
+        elif command == "translate":
+
+            start = time.time()
+            try:
+                response = self.translate(request)
+            except Exception as err:
+                self.errors += 1
+                mc.node.backend.mid_translation[0] = 0
+                response = {"error": "%s: %s" % (err.__class__.__name__, err)}
+                if self.args.disp:
+                    traceback.print_exc(file=sys.stderr)
+
+            elapsed = (time.time()-start)*1000
+            self.latencies.append(elapsed)
+            response["time"] = elapsed
+
+        else:
+            response = {"error": "unknown command '%s'" % command}
+
+        if "id" in request:
+            response["id"] = request["id"]
+
+        return response
+
+
+def serve(args, stdin=None, stdout=None):
+    """
+Run server loop until shutdown is requested or input is closed.
+
+Args:
+    args (ArgumentParser): Default arguments parsed through m2cpp
+    stdin (file): Request stream. Defaults to `sys.stdin`.
+    stdout (file): Response stream. Defaults to `sys.stdout`.
+    """
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+
+    server = Server(args)
+
+    # anything printed during translation must not corrupt the protocol
+    sys_stdout, sys.stdout = sys.stdout, sys.stderr
+
+    try:
+        while server.running:
+
+            line = stdin.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError as err:
+                response = {"error": "invalid request: %s" % err}
+            else:
+                response = server.handle(request)
+
+            stdout.write(json.dumps(response) + "\n")
+            stdout.flush()
+
+    finally:
+        sys.stdout = sys_stdout
+
+    return server
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -58,3 +58,35 @@ def multiple_folder_paths(setpath_file):
     folder_paths = [path.rstrip(os.path.sep) for path in folder_paths]
     return folder_paths
 
+
+def index_folders(folder_paths):
+    """
+Create an index of the Matlab files in a list of folders.  The folders are
+listed once, so looking up a name afterwards does not touch the filesystem.
+Like in Matlab, the first folder in the list containing a file takes
+precedence.
+
+Args:
+    folder_paths (list): Folders in order of precedence
+
+Returns:
+    dict: Mapping from name (without `.m`) to absolute path of file
+    """
+    index = {}
+
+    for path in folder_paths:
+
+        try:
+            names = os.listdir(path)
+        except OSError:
+            continue
+
+        for name in names:
+            if name[-2:] != ".m" or name[:-2] in index:
+                continue
+            filename = os.path.abspath(os.path.join(path, name))
+            if os.path.isfile(filename):
+                index[name[:-2]] = filename
+
+    return index
+
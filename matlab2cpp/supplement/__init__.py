@@ -14,6 +14,8 @@ PREFIX = """# encoding: utf-8
 # ucube   icube   fcube   cube   cx_cube
 #
 # char    string  struct  structs func_lambda
+#
+# Vectors and matrices of fixed size: vec3, rowvec4, mat33, cx_mat4x4, ...
 """
 
 import functions
@@ -21,18 +23,21 @@ import suggests
 import structs
 import includes
 import verbatim
+import dataio
+import loader
 
 from functions import Ftypes
 from suggests import  Sstypes
 from structs import Stypes
 from includes import Itypes
 from verbatim import Vtypes
+from dataio import Iotypes
 
 import matlab2cpp as mc
 
 
 def str_variables(types_f={}, types_s={}, types_i=[],
-        suggest={}, prefix=True, types_v={}):
+        suggest={}, prefix=True, types_v={}, types_io={}):
     """
 Convert a nested dictionary for types, suggestions and structs and use them to
 create a suppliment text ready to be saved.
@@ -42,6 +47,7 @@ Kwargs:
     types_s (dict): Struct variables datatypes
     types_i (list): Includes in header
     types_v (dict): Verbatim translations
+    types_io (dict): I/O backend per loaded or saved file
     suggest (dict): Suggested datatypes for types_f and types_s
     prefix (bool): True if the type explaination should be included
 
@@ -93,7 +99,7 @@ Example:
             out += '  "%s" : {\n' % (name)
             types = types_f[name]
 
-            keys2 = types.keys()
+            keys2 = [key for key in types if key != "_overloads"]
             keys2.sort()
             l = max([len(k) for k in keys2]+[0])+4
 
@@ -113,6 +119,14 @@ Example:
                 else:
                     out += " "*(l-len(key)) + '"%s" : "",\n' % (key)
 
+            # argument types of specialised overloads
+            if types.get("_overloads"):
+                out += '    "_overloads" : [\n'
+                for overload in types["_overloads"]:
+                    out += "      {" + ", ".join(['"%s" : "%s"' % item
+                        for item in sorted(overload.items())]) + "},\n"
+                out += "    ],\n"
+
             out += "  },\n"
 
         out += "}"
@@ -190,6 +204,22 @@ Example:
 
         out += "}"
 
+    if types_io:
+
+        if types_f or prefix or types_s or types_i or types_v:
+            out += "\n"
+
+        out += "io = {\n"
+
+        keys = types_io.keys()
+        keys.sort()
+        l = max([len(k) for k in keys])+4
+
+        for key in keys:
+            out += " "*(l-len(key)) + '"%s" : "%s",\n' % (key, types_io[key])
+
+        out += "}"
+
     return out
 
 
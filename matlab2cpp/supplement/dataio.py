@@ -0,0 +1,159 @@
+"""
+Data I/O backend per `load`/`save` call site.
+
+The supplement section ``io`` maps the file name used in the Matlab code to the
+way the generated code reads or writes it:
+
++-------------+---------------------------------------------------------------+
+| Backend     | Description                                                   |
++=============+===============================================================+
+| ``""``      | Armadillo `load`/`save` with automatic format detection       |
++-------------+---------------------------------------------------------------+
+| ``binary``  | Armadillo `arma_binary` format, no format detection           |
++-------------+---------------------------------------------------------------+
+| ``raw``     | Raw binary data without header (column vector on load)        |
++-------------+---------------------------------------------------------------+
+| ``mmap``    | `arma_binary` file memory mapped, the matrix uses the mapped  |
+|             | memory directly (``m2cpp::load_mapped`` in `mconvert.h`).     |
+|             | Return values are read with ``direct`` instead.  Saved with   |
+|             | an aligned header (``m2cpp::save_aligned``).                  |
++-------------+---------------------------------------------------------------+
+| ``direct``  | `arma_binary` file read straight into the matrix, without     |
+|             | temporary copies (``m2cpp::load_direct`` in `mconvert.h`)     |
++-------------+---------------------------------------------------------------+
+
+Files saved with any of the binary backends are written in `arma_binary`
+format, so they can be read back with all of them.  The elements can only be
+mapped when the header length is a multiple of the element size.  Armadillo's
+own header rarely is, so such files are read with ``direct`` instead; files
+saved with the ``mmap`` backend have their header padded to 16 bytes.
+
+The mapping lives as long as the variable: every variable loaded with ``mmap``
+gets a `m2cpp::mapping` declared next to it, that releases the mapping when the
+function returns.
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "a = load('data.bin'); save out.bin a")
+    >>> print sorted(builder[0].iotypes.items())
+    [('data.bin', ''), ('out.bin', '')]
+    >>> builder[0].iotypes = {"data.bin" : "mmap"}
+    >>> print sorted(builder[0].iotypes.items())
+    [('data.bin', 'mmap'), ('out.bin', '')]
+"""
+
+import matlab2cpp as mc
+
+backends = ("", "text", "binary", "raw", "mmap", "direct")
+
+
+def filename(node):
+    """
+File name of a `load` or `save` call.
+
+Args:
+    node (Get): The call
+
+Returns:
+    str, None: File name, or None if not a literal
+    """
+    if node.value:
+        return node.value.strip("'\"")
+    if len(node) and node[0].cls == "String":
+        return node[0].value
+    return None
+
+
+def backend(node):
+    "I/O backend selected for a `load` or `save` call"
+    return node.program.prop.get("io", {}).get(filename(node), "")
+
+
+def target(node):
+    """
+Variable a `load` call reads into.
+
+Args:
+    node (Get): The call
+
+Returns:
+    str, None: Variable name, or None if not known
+    """
+    if node.parent.cls == "Assign" and len(node.parent) == 2:
+        return node.parent[0].name
+    if node.value and len(node) == 1:
+        return node[0].name
+    if len(node) == 1 and node[0].cls == "String":
+        return str(node[0].value).split(".")[0]
+    return None
+
+
+def mapped(func):
+    """
+Variables a function memory maps files into.  These are the targets of `load`
+calls with the ``mmap`` backend, except return values, as the mapping is
+released when the function returns.
+
+Args:
+    func (Func): The function
+
+Returns:
+    list: Variable names, sorted
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function c=f(); a = load('x.bin'); c = load('x.bin')")
+    >>> builder[0].iotypes = {"x.bin" : "mmap"}
+    >>> print mapped(builder[0][1][0])
+    ['a']
+    """
+    if func.cls != "Func":
+        return []
+
+    names = []
+    for node in func[3].flatten(False, False, False):
+        if node.cls == "Get" and node.name == "load" and \
+                backend(node) == "mmap":
+            name = target(node)
+            if name and name not in func[1].names and name not in names:
+                names.append(name)
+
+    return sorted(names)
+
+
+def set(node, types):
+
+    io = node.program.prop.setdefault("io", {})
+
+    for name, value in types.items():
+        if value not in backends:
+            raise ValueError("unknown io backend '%s' for file '%s'" %
+                    (value, name))
+        io[name] = value
+
+
+def get(node):
+
+    io = node.program.prop.get("io", {})
+    types = {}
+
+    for node in node.program.flatten(False, False, False):
+        if node.cls == "Get" and node.name in ("load", "save"):
+            name = filename(node)
+            if name:
+                types[name] = io.get(name, "")
+
+    return types
+
+
+class Iotypes(object):
+
+    def __get__(self, instance, owner):
+        return get(instance)
+
+    def __set__(self, instance, value):
+        set(instance, value)
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -18,7 +18,11 @@ def set(node, types):
 
             for key in types_.keys():
 
-                if key in declares.names:
+                # argument types of specialised overloads
+                if key == "_overloads":
+                    func.prop["overloads"] = types_[key]
+
+                elif key in declares.names:
 
                     if key in returns.names:
                         var = returns[returns.names.index(key)]
@@ -39,6 +43,10 @@ def get(node):
 
     for func in funcs:
 
+        # specialised overloads are listed with the general version
+        if "overload" in func.prop:
+            continue
+
         types[func.name] = types_ = {}
 
         declares, params = func[0], func[2]
@@ -47,6 +55,8 @@ def get(node):
             type = var.type
             if type == "TYPE":
                 type = ""
+            elif var.prop.get("shape") and not var.prop.get("inferred"):
+                type = mc.datatype.shape_name(type, var.prop["shape"])
             types_[var.name] = type
 
             if not type:
@@ -55,6 +65,12 @@ def get(node):
                 if type == "TYPE":
                     type = ""
 
+        overloads = [[(var.name, var.type) for var in overload[2]]
+            for overload in funcs if overload.name == func.name and
+            "overload" in overload.prop]
+        if overloads:
+            types_["_overloads"] = map(dict, overloads)
+
     return types
 
 
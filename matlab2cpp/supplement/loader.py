@@ -0,0 +1,311 @@
+"""
+Reading supplement files from disk.
+
+Two formats are supported side by side:
+
++--------------------+-------------------------------------------------------+
+| File               | Description                                           |
++====================+=======================================================+
+| ``<file>.m.py``    | Legacy Python supplement, executed with ``imp``       |
++--------------------+-------------------------------------------------------+
+| ``<file>.m.json``  | Declarative supplement, parsed without executing code |
++--------------------+-------------------------------------------------------+
+
+In addition a whole project can be described in one consolidated JSON file,
+where each top level key is the basename of a Matlab file::
+
+    {
+      "main.m" : {"functions" : {"main" : {"a" : "int"}}},
+      "f.m"    : {"functions" : {"f" : {"x" : "vec"}},
+                  "includes" : ["#include <armadillo>"]}
+    }
+
+All readers return the same plain dictionary with the (optional) keys
+``functions``, ``structs``, ``includes``, ``verbatims`` and ``io``.
+"""
+
+import os
+import imp
+import json
+
+import matlab2cpp as mc
+
+KEYS = ("functions", "structs", "includes", "verbatims", "io")
+
+
+def encode(obj):
+    """
+Recursively convert unicode strings (as returned by :py:mod:`json`) to `str`.
+
+Example:
+    >>> print repr(encode({u"f": {u"a": [u"int", 1]}}))
+    {'f': {'a': ['int', 1]}}
+    """
+    if isinstance(obj, unicode):
+        return obj.encode("utf-8")
+    if isinstance(obj, dict):
+        return dict((encode(k), encode(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return [encode(v) for v in obj]
+    return obj
+
+
+def clean(types):
+    """
+Strip a supplement dictionary down to the recognized keys.
+    """
+    return dict((key, types[key]) for key in KEYS if types.get(key))
+
+
+def read_json(filename):
+    """
+Read a declarative supplement file.
+
+Args:
+    filename (str): Path to ``.json`` supplement
+
+Returns:
+    dict: Supplement content
+
+Raises:
+    ValueError: If the content is not valid JSON
+    """
+    with open(filename, "r") as f:
+        return parse_json(f.read(), filename)
+
+
+def parse_json(text, filename="<string>"):
+    """
+Parse the content of a declarative supplement.
+
+Args:
+    text (str): Content of ``.json`` supplement
+    filename (str): Name used in error messages
+
+Returns:
+    dict: Supplement content
+
+Raises:
+    ValueError: If the content is not valid JSON
+
+Example:
+    >>> print parse_json('{"functions": {"f": {"x": "int"}}, "other": 1}')
+    {'functions': {'f': {'x': 'int'}}}
+    """
+    try:
+        types = encode(json.loads(text))
+    except ValueError as err:
+        raise ValueError("""Supplement file:
+    %s
+    is formated incorrectly (%s). Change the format or convert with '-r'
+    option to create a new file.""" % (filename, err))
+
+    if not isinstance(types, dict):
+        raise ValueError("Supplement file %s must contain an object" % filename)
+
+    return clean(types)
+
+
+def read_py(filename):
+    """
+Read a legacy Python supplement file.
+
+Args:
+    filename (str): Path to ``.py`` supplement
+
+Returns:
+    dict: Supplement content
+
+Raises:
+    ImportError: If the supplement file can not be executed
+    """
+    try:
+        cfg = imp.load_source("cfg", filename)
+
+    except:
+        raise ImportError("""Supplement file:
+    %s
+    is formated incorrectly. Change the format or convert with '-r' option to create
+    a new file.""" % filename)
+
+    return clean(cfg.__dict__)
+
+
+def parse_py(text, filename="<string>"):
+    """
+Execute the content of a legacy Python supplement.
+
+Args:
+    text (str): Content of ``.py`` supplement
+    filename (str): Name used in error messages
+
+Returns:
+    dict: Supplement content
+
+Raises:
+    ImportError: If the supplement can not be executed
+    """
+    cfg = {}
+    try:
+        exec compile(text, filename, "exec") in cfg
+
+    except:
+        raise ImportError("""Supplement file:
+    %s
+    is formated incorrectly. Change the format or convert with '-r' option to create
+    a new file.""" % filename)
+
+    return clean(cfg)
+
+
+def read(name):
+    """
+Read the supplement belonging to a Matlab file.  The declarative ``.json``
+format is preferred over the ``.py`` format if both are present.
+
+Args:
+    name (str): Path to Matlab file (without supplement extension)
+
+Returns:
+    dict, None: Supplement content, or None if no supplement file exists
+    """
+    if os.path.isfile(name + ".json"):
+        return read_json(name + ".json")
+
+    if os.path.isfile(name + ".py"):
+        return read_py(name + ".py")
+
+    return None
+
+
+def read_project(filename):
+    """
+Read a consolidated project supplement in a single pass.
+
+Args:
+    filename (str): Path to consolidated ``.json`` supplement
+
+Returns:
+    dict: Mapping from Matlab file basename to supplement content
+
+Raises:
+    IOError: If file does not exist
+    """
+    if not os.path.isfile(filename):
+        raise IOError("File '" + filename + "' not found")
+
+    with open(filename, "r") as f:
+        try:
+            project = encode(json.load(f))
+        except ValueError as err:
+            raise ValueError("Supplement file %s is formated incorrectly (%s)"
+                    % (filename, err))
+
+    return dict((name, clean(types)) for name, types in project.items()
+            if isinstance(types, dict))
+
+
+def merge(*supplements):
+    """
+Merge supplements where later arguments take precedence.
+
+Example:
+    >>> a = {"functions": {"f": {"x": "int", "y": "vec"}}, "includes": ["a"]}
+    >>> b = {"functions": {"f": {"x": "double"}}, "includes": ["b"]}
+    >>> out = merge(a, None, b)
+    >>> print sorted(out["functions"]["f"].items())
+    [('x', 'double'), ('y', 'vec')]
+    >>> print out["includes"]
+    ['a', 'b']
+    """
+    out = {}
+    for types in supplements:
+
+        if not types:
+            continue
+
+        for key in ("functions", "structs"):
+            for name, values in types.get(key, {}).items():
+                out.setdefault(key, {}).setdefault(name, {}).update(values)
+
+        for include in types.get("includes", []):
+            includes = out.setdefault("includes", [])
+            if include not in includes:
+                includes.append(include)
+
+        for key in ("verbatims", "io"):
+            if key in types:
+                out.setdefault(key, {}).update(types[key])
+
+    return out
+
+
+def apply(program, types):
+    """
+Apply supplement content to a loaded program in bulk.
+
+Args:
+    program (Program): Program node created by :py:class:`~matlab2cpp.Builder`
+    types (dict): Supplement content
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function f(a)")
+    >>> apply(builder[0], {"functions": {"f": {"a": "int"}}})
+    >>> print builder[0].ftypes
+    {'f': {'a': 'int'}}
+    """
+    if types.get("functions"):
+        program.ftypes = types["functions"]
+
+    if types.get("structs"):
+        program.stypes = types["structs"]
+
+    if types.get("includes"):
+        includes = [i for i in types["includes"]
+                if mc.supplement.includes.write_to_includes(i)]
+        program.itypes = includes
+
+    if types.get("io"):
+        program.iotypes = types["io"]
+
+
+def str_json(types_f={}, types_s={}, types_i=[], types_v={}, types_io={}):
+    """
+Create declarative supplement text, the counterpart of
+:py:func:`~matlab2cpp.supplement.str_variables`.
+
+Example:
+    >>> print str_json({"f": {"a": "int", "b": ""}}, types_i=["#include <armadillo>"])
+    {
+      "functions": {
+        "f": {
+          "a": "int",
+          "b": ""
+        }
+      },
+      "includes": [
+        "#include <armadillo>"
+      ]
+    }
+    """
+    types = {}
+    if types_f:
+        types["functions"] = dict((name, dict((k, v) for k, v in vals.items()
+            if k[:1] != "_" or k == "_overloads"))
+            for name, vals in types_f.items())
+    if types_s:
+        types["structs"] = types_s
+    if types_i:
+        types["includes"] = [i for i in types_i if i]
+    if types_v:
+        types["verbatims"] = types_v
+    if types_io:
+        types["io"] = types_io
+
+    return json.dumps(types, indent=2, sort_keys=True, separators=(",", ": "))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -16,7 +16,11 @@ def set(node, types):
 
             for key in types_.keys():
 
-                if key in struct.names:
+                # memory layout of struct array
+                if key == "_layout":
+                    struct.prop["layout"] = types_[key]
+
+                elif key in struct.names:
 
                     var = struct[struct.names.index(key)]
 
@@ -49,6 +53,9 @@ def get(node):
 
             types[var.name] = type
 
+        if "layout" in struct.prop:
+            types["_layout"] = struct.prop["layout"]
+
     return types_s
 
 
@@ -10,6 +10,9 @@ def get(node):
 
     for func in funcs:
 
+        if "overload" in func.prop:
+            continue
+
         suggest[func.name] = suggest_ = {}
 
         declares, params = func[0], func[2]
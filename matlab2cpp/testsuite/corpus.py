@@ -0,0 +1,148 @@
+"""Generated Matlab corpus for translation benchmarks
+
+The corpus imitates larger code bases: a script calling a deep chain of
+functions spread over several files, each file with a few local functions,
+long functions of matrix arithmetic, long matrix literals, struct arrays, cells
+and nested loops.  The content is determined by the size parameters and the
+seed, so that timings from different runs are comparable.
+
+Example:
+    >>> files = generate("tiny")
+    >>> print sorted(files)
+    ['bench.m', 'lib0.m', 'lib1.m']
+    >>> print files["bench.m"]
+    x = 3.5 ;
+    y = lib0(x) ;
+    disp(y)
+"""
+import random
+
+# name: files in call chain, local functions per file, statements per
+# function, matrix literal size, struct fields, nested loop depth
+SIZES = {
+    "tiny": dict(files=2, locals=1, statements=2, literal=3, fields=2, depth=1),
+    "small": dict(files=4, locals=2, statements=10, literal=10, fields=4, depth=2),
+    "medium": dict(files=8, locals=3, statements=25, literal=30, fields=6, depth=3),
+    "large": dict(files=16, locals=4, statements=60, literal=60, fields=8, depth=3),
+}
+
+MAIN = "bench.m"
+
+
+def literal(name, rows, cols, rand):
+    """Matrix literal with `rows` x `cols` floats."""
+    lines = []
+    for i in xrange(rows):
+        lines.append(", ".join(["%.3f" % rand.uniform(-10, 10)
+                for j in xrange(cols)]))
+    return name + " = [" + " ;\n    ".join(lines) + "] ;"
+
+
+def statements(n, rand):
+    """Block of matrix and scalar arithmetic on `A`, `v` and `s`."""
+    templates = [
+        "v = A*v + %(c)s ;",
+        "s = s + sum(v)/%(n)d ;",
+        "A = A + %(c)s*eye(size(A, 1)) ;",
+        "v = v.*v - %(c)s ;",
+        "s = max(s, v(%(i)d)) ;",
+        "B = A' ;",
+        "A = (A + B)/2 ;",
+        "v(%(i)d) = s*%(c)s ;",
+    ]
+    out = []
+    for k in xrange(n):
+        out.append(rand.choice(templates) % {
+            "c": "%.2f" % rand.uniform(0.1, 2), "n": k+2,
+            "i": rand.randint(1, 3)})
+    return out
+
+
+def loops(depth, rand):
+    """Nested loops filling `C`."""
+    names = "ijk"[:depth]
+    out = ["C = zeros(%d, %d) ;" % (4, 4)]
+    for level, name in enumerate(names):
+        out.append("  "*level + "for %s = 1:%d" % (name, rand.randint(3, 4)))
+    index = ", ".join(names[:2]) if depth > 1 else names[0] + ", 1"
+    out.append("  "*depth + "C(%s) = C(%s) + %s*s ;" % (
+        index, index, "*".join(names)))
+    for level in xrange(depth-1, -1, -1):
+        out.append("  "*level + "end")
+    return out
+
+
+def structs(fields, rand):
+    """Struct array and cell usage."""
+    out = []
+    for k in xrange(1, 4):
+        for field in xrange(fields):
+            out.append("p(%d).f%d = %.2f ;" % (k, field, rand.uniform(0, 1)))
+    out.append("q = p(2).f0 + p(3).f%d ;" % (fields-1))
+    out.append("c = {1.5, 2.5, 3.5} ;")
+    out.append("s = s + c{2} + q ;")
+    return out
+
+
+def function(name, callee, size, rand, local=False):
+    """Function of `size` with an optional call to `callee`."""
+    out = ["function y = %s(x)" % name]
+    out.append(literal("A", 3, 3, rand))
+    out.append("v = [1.0; 2.0; 3.0]*x ;")
+    out.append("s = x ;")
+    out.extend(statements(size["statements"], rand))
+    if not local:
+        out.append(literal("L", size["literal"], size["literal"], rand))
+        out.append("s = s + sum(sum(L)) ;")
+        out.extend(structs(size["fields"], rand))
+        out.extend(loops(size["depth"], rand))
+        out.append("s = s + sum(sum(C)) ;")
+    if callee:
+        out.append("s = s + %s(s) ;" % callee)
+    out.append("y = s + sum(v) ;")
+    out.append("end")
+    return "\n".join(out)
+
+
+def generate(size="small", seed=0):
+    """
+Generate corpus.
+
+Args:
+    size (str): Key in `SIZES`
+    seed (int): Random seed
+
+Returns:
+    dict: File name to Matlab code, with the script in `MAIN`
+    """
+    size = SIZES[size]
+    rand = random.Random(seed)
+
+    files = {MAIN: "x = 3.5 ;\ny = lib0(x) ;\ndisp(y)"}
+
+    for index in xrange(size["files"]):
+
+        name = "lib%d" % index
+        callee = "lib%d" % (index+1) if index+1 < size["files"] else None
+        local_names = ["%s_local%d" % (name, k) for k in xrange(size["locals"])]
+
+        # main function calls the chain of local functions, then next file
+        funcs = [function(name, local_names and local_names[0] or callee,
+                size, rand)]
+        for k, local_name in enumerate(local_names):
+            next_name = local_names[k+1] if k+1 < len(local_names) else callee
+            funcs.append(function(local_name, next_name, size, rand, local=True))
+
+        files[name + ".m"] = "\n\n".join(funcs) + "\n"
+
+    return files
+
+
+def lines(files):
+    """Number of lines in corpus."""
+    return sum([code.count("\n")+1 for code in files.values()])
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,132 @@
+"""Benchmark of translations with and without `--lazy`
+
+Translates a set of small Matlab kernels twice, once as before and once with
+the `lazy` option, and writes a single C++ file with the two translations in
+the namespaces `eager` and `lazy`, and a `main` timing both on the same input::
+
+    python -m matlab2cpp.testsuite.lazy_benchmark lazy_benchmark.cpp
+    g++ -O2 -std=c++11 lazy_benchmark.cpp -o lazy_benchmark -larmadillo
+    ./lazy_benchmark [size] [repeats]
+
+The file `mconvert.h` is written next to the C++ file.  Each line of output
+holds a kernel, the best time of each translation in milliseconds, and the
+speedup.  Both results are compared, so the benchmark also checks that the
+translations agree.
+"""
+import os
+import sys
+
+import matlab2cpp
+from matlab2cpp import m2cpp
+
+# name: (code, datatypes, call, result) with arguments `A` and `x`
+KERNELS = [
+    ("energy", "function s=energy(x)\ns = x'*x;",
+        {"x": "vec", "s": "double"}, "energy(x)", "double"),
+    ("total", "function s=total(A)\ns = sum(sum(A));",
+        {"A": "mat", "s": "double"}, "total(A)", "double"),
+    ("mean_abs", "function s=mean_abs(x)\ns = sum(abs(x))/length(x);",
+        {"x": "vec", "s": "double"}, "mean_abs(x)", "double"),
+    ("weighted", "function s=weighted(x, w)\ns = sum(x.*w);",
+        {"x": "vec", "w": "vec", "s": "double"}, "weighted(x, x)", "double"),
+    ("project", "function y=project(A, x)\ny = A.'*x;",
+        {"A": "mat", "x": "vec", "y": "vec"}, "project(A, x)", "vec"),
+]
+
+MAIN = """
+template <class F>
+double best(int repeats, F f)
+{
+  double best = -1 ;
+  for (int i = 0; i < repeats; i++)
+  {
+    auto begin = std::chrono::steady_clock::now() ;
+    f() ;
+    double ms = std::chrono::duration<double, std::milli>(
+        std::chrono::steady_clock::now() - begin).count() ;
+    if (best < 0 || ms < best)
+      best = ms ;
+  }
+  return best ;
+}
+
+double norm_of(double a) { return std::abs(a) ; }
+template <class T> double norm_of(const T& a) { return arma::norm(arma::vectorise(a), 1) ; }
+
+int main(int argc, char** argv)
+{
+  int n = argc > 1 ? std::atoi(argv[1]) : 1000 ;
+  int repeats = argc > 2 ? std::atoi(argv[2]) : 20 ;
+  arma::arma_rng::set_seed(0) ;
+  mat A = arma::randu<mat>(n, n) ;
+  vec x = arma::randu<vec>(n) ;
+
+  std::printf("# kernel  eager [ms]  lazy [ms]  speedup\\n") ;
+%s
+  return 0 ;
+}
+"""
+
+CASE = """
+  {
+    %(result)s a = eager::%(call)s, b = lazy::%(call)s ;
+    if (norm_of(a - b) > 1e-8*(1 + norm_of(a)))
+      std::printf("# %(name)s: translations disagree\\n") ;
+    double t0 = best(repeats, [&]() { %(result)s r = eager::%(call)s ; }) ;
+    double t1 = best(repeats, [&]() { %(result)s r = lazy::%(call)s ; }) ;
+    std::printf("%(name)s  %%.3f  %%.3f  %%.2f\\n", t0, t1, t0/t1) ;
+  }"""
+
+
+def translate(name, code, types, lazy):
+    """Function definition translated from a kernel."""
+
+    sources = {name + ".m": code,
+            name + ".m.py": "functions = %r\n" % {name: types}}
+    files = matlab2cpp.translate_sources(sources, name + ".m", lazy=lazy)
+    hpp = files[name + ".m.hpp"]
+
+    # function body between the includes and the header guard end
+    start = hpp.index("using namespace arma ;") + len("using namespace arma ;")
+    stop = hpp.rindex("#endif")
+    return hpp[start:stop].strip()
+
+
+def generate():
+    """C++ source of the benchmark."""
+
+    lines = ["// generated by matlab2cpp.testsuite.lazy_benchmark",
+        "#include <armadillo>", "#include <algorithm>", "#include <chrono>",
+        "#include <cstdio>", "#include <cstdlib>", '#include "mconvert.h"',
+        "using namespace arma ;", ""]
+
+    for namespace, lazy in (("eager", False), ("lazy", True)):
+        lines.append("namespace %s {" % namespace)
+        for name, code, types, call, result in KERNELS:
+            lines.append(translate(name, code, types, lazy))
+            lines.append("")
+        lines.append("}")
+        lines.append("")
+
+    cases = "".join(CASE % {"name": name, "call": call, "result": result}
+            for name, code, types, call, result in KERNELS)
+    return "\n".join(lines) + MAIN % cases
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    output = argv and argv[0] or "lazy_benchmark.cpp"
+
+    f = open(output, "w")
+    f.write(generate())
+    f.close()
+
+    f = open(os.path.join(os.path.dirname(os.path.abspath(output)),
+        "mconvert.h"), "w")
+    f.write(m2cpp.code)
+    f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+/*
+ * Benchmark of handing Armadillo arrays to matplotlib through SPlot.h.
+ *
+ * Times the conversion of a series to a NumPy array for named vectors
+ * (copied once, or borrowed with borrow_arrays), temporaries and subviews, the
+ * element by element copy through std::vector that SPlot.h used to do, and
+ * complete plot() calls, run directly or queued for the rendering thread.
+ * Build and run from a folder with SPlot.h, which m2cpp writes next to
+ * translated code using plot:
+ *
+ *   python -c "from matlab2cpp import pyplot; open('SPlot.h', 'w').write(pyplot.code)"
+ *   g++ -O2 -std=c++11 splot_benchmark.cpp -o splot_benchmark \
+ *       $(python-config --includes) \
+ *       -I$(python -c "import numpy; print(numpy.get_include())") \
+ *       $(python-config --ldflags) -larmadillo -pthread
+ *   MPLBACKEND=Agg ./splot_benchmark [points] [repeats]
+ */
+
+#include <armadillo>
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+#include <sstream>
+#include <vector>
+
+#include "SPlot.h"
+
+typedef PyEngine::py_obj py_obj;
+typedef PyEngine::arma_vec<double> arma_vec;
+
+// best time of repeated runs, in milliseconds
+template <class F>
+double best(int repeats, F f)
+{
+	double best = -1;
+	for (int i = 0; i < repeats; i++)
+	{
+		auto begin = std::chrono::steady_clock::now();
+		f();
+		std::chrono::duration<double, std::milli> time = std::chrono::steady_clock::now() - begin;
+		if (best < 0 || time.count() < best)
+			best = time.count();
+	}
+	return best;
+}
+
+int main(int argc, char** argv)
+{
+	const arma::uword n = argc > 1 ? std::atol(argv[1]) : 1000000;
+	const int repeats = argc > 2 ? std::atoi(argv[2]) : 10;
+
+	SPlot splot;
+	arma::vec x = arma::linspace<arma::vec>(0, 1, n);
+	arma::vec y = arma::sin(x*100.0);
+
+	std::printf("points: %llu, best of %d [ms]\n", (unsigned long long)n, repeats);
+
+	std::printf("%-32s %10.3f\n", "std::vector copy (previous)", best(repeats, [&]() {
+		std::vector<double> v(y.begin(), y.end());
+		py_obj obj(v);
+	}));
+
+	std::printf("%-32s %10.3f\n", "named vector, copied once", best(repeats, [&]() {
+		py_obj obj{arma_vec(y)};
+	}));
+
+	PyEngine::borrow_arrays(true);
+	std::printf("%-32s %10.3f\n", "named vector, borrowed", best(repeats, [&]() {
+		py_obj obj{arma_vec(y)};
+	}));
+	PyEngine::borrow_arrays(false);
+
+	std::printf("%-32s %10.3f\n", "expression, evaluated once", best(repeats, [&]() {
+		py_obj obj{arma_vec(y*2.0)};
+	}));
+
+	std::printf("%-32s %10.3f\n", "subview, evaluated once", best(repeats, [&]() {
+		py_obj obj{arma_vec(y.subvec(0, n/2))};
+	}));
+
+	std::printf("%-32s %10.3f\n", "plot(x, y)", best(repeats, [&]() {
+		splot.clf();
+		splot.plot(x, y);
+	}));
+
+	std::printf("%-32s %10.3f\n", "plot(x, 2*y)", best(repeats, [&]() {
+		splot.clf();
+		splot.plot(x, y*2.0);
+	}));
+
+	// time spent by the computing thread, and until the figures are drawn
+	SPlot queued(SPlot::queued);
+	std::printf("%-32s %10.3f\n", "plot(x, y), queued", best(repeats, [&]() {
+		queued.clf();
+		queued.plot(x, y);
+	}));
+	std::printf("%-32s %10.3f\n", "queued plots drawn", best(1, [&]() {
+		queued.flush();
+	}));
+
+	return 0;
+}
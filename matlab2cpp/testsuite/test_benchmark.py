@@ -0,0 +1,234 @@
+"""Translation benchmarks against stored baselines
+
+Every corpus size from :py:mod:`~matlab2cpp.testsuite.corpus` is translated in
+a fresh interpreter, measuring the time spent parsing (``discover``, ``read``
+and ``load``), configuring and translating (``preorder``, ``translate`` and
+``postorder``), together with the peak memory used by the translation.  Times
+are divided by the time of a fixed calibration workload run in the same
+process, so that baselines can be compared between machines.
+
+A size fails if any cost exceeds its baseline by more than the tolerance
+factor.  Sizes without a baseline are only reported.  Environment variables:
+
+* ``M2CPP_BENCH_SIZES``: comma separated sizes to run, default ``small``.
+* ``M2CPP_BENCH_TOLERANCE``: allowed slowdown factor, default 2.5.
+
+Store new baselines after intended changes with::
+
+    python -m matlab2cpp.testsuite.test_benchmark --update small medium
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+from subprocess import Popen, PIPE
+from timeit import default_timer as timer
+
+import matlab2cpp
+
+from matlab2cpp.testsuite import corpus
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(matlab2cpp.__file__)))
+baseline_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "benchmark_baseline.json")
+
+PHASES = {
+    "parse": ("discover", "read", "load"),
+    "configure": ("configure",),
+    "translate": ("preorder", "translate", "postorder"),
+}
+
+# memory grows with the corpus, allow some slack for small sizes [MB]
+MEMORY_SLACK = 5.
+
+
+def calibrate(repeat=5):
+    """Time of a fixed workload of dictionary, list and string operations."""
+    best = None
+    for _ in xrange(repeat):
+        start = timer()
+        table = {}
+        for i in xrange(100000):
+            key = "key%d" % (i % 1000)
+            table[key] = table.get(key, []) + [i] if i % 7 else []
+        seconds = timer() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def peak_memory():
+    """Peak resident memory of this process in MB."""
+    # VmHWM starts over on exec, unlike ru_maxrss on Linux
+    if os.path.isfile("/proc/self/status"):
+        f = open("/proc/self/status", "r")
+        for line in f:
+            if line.startswith("VmHWM:"):
+                f.close()
+                return int(line.split()[1]) / 1024.
+        f.close()
+
+    import resource
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on OS X
+    return memory / (1024.**2 if sys.platform == "darwin" else 1024.)
+
+
+def measure(size, repeat=3):
+    """
+Translate a corpus size in this process.
+
+Returns:
+    dict: Lines and nodes in the corpus, seconds and calibrated cost per
+    phase (best of `repeat`), and peak memory of the translation in MB.
+    """
+    import matlab2cpp.profiler as profiler
+
+    files = corpus.generate(size)
+    path = tempfile.mkdtemp()
+    curdir = os.path.abspath(os.path.curdir)
+
+    try:
+        os.chdir(path)
+        for name, code in files.items():
+            f = open(name, "w")
+            f.write(code)
+            f.close()
+
+        calibration = calibrate()
+        memory = peak_memory()
+
+        seconds = dict((phase, None) for phase in PHASES)
+        for _ in xrange(repeat):
+
+            args = argparse.Namespace(disp=False, line=None,
+                    **matlab2cpp.OPTIONS)
+            args.filename = os.path.join(path, corpus.MAIN)
+            args.suggest = True
+            args.reset = True
+
+            profiler.start()
+            builder = matlab2cpp.Builder(comments=False)
+            matlab2cpp.load(builder, args)
+            matlab2cpp.convert(builder, args)
+            report = profiler.stop()
+
+            phases = dict((phase["name"], phase) for phase in report["phases"])
+            for phase, names in PHASES.items():
+                total = sum([phases[name]["seconds"]
+                    for name in names if name in phases])
+                if seconds[phase] is None or total < seconds[phase]:
+                    seconds[phase] = total
+
+        memory = peak_memory() - memory
+
+        # the first calibration might run before the processor is up to speed
+        calibration = min(calibration, calibrate())
+
+    finally:
+        os.chdir(curdir)
+        shutil.rmtree(path)
+
+    return {"lines": corpus.lines(files),
+            "nodes": phases["translate"]["nodes"],
+            "seconds": seconds,
+            "cost": dict((phase, seconds[phase]/calibration)
+                for phase in seconds),
+            "memory": memory}
+
+
+def run(size):
+    """Measure a corpus size in a fresh interpreter."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+
+    # outside the source tree, so the package is imported with absolute paths
+    proc = Popen([sys.executable, "-m", "matlab2cpp.testsuite.test_benchmark",
+        "--measure", size], stdout=PIPE, env=env, cwd=tempfile.gettempdir())
+    out, _ = proc.communicate()
+    assert proc.returncode == 0
+    return json.loads(out.strip().split("\n")[-1])
+
+
+def load_baselines():
+    if not os.path.isfile(baseline_file):
+        return {}
+    f = open(baseline_file, "r")
+    baselines = json.load(f)
+    f.close()
+    return baselines
+
+
+def compare(result, baseline, tolerance):
+    """List of regressions of a result compared to its baseline."""
+    failures = []
+    for phase in PHASES:
+        if result["cost"][phase] > tolerance*baseline["cost"][phase]:
+            failures.append("%s: cost %.2f, baseline %.2f" % (
+                phase, result["cost"][phase], baseline["cost"][phase]))
+    limit = tolerance*baseline["memory"] + MEMORY_SLACK
+    if result["memory"] > limit:
+        failures.append("memory: %.1f MB, baseline %.1f MB" % (
+            result["memory"], baseline["memory"]))
+    return failures
+
+
+def test_translation_benchmark():
+    """Compare translation throughput and memory with the stored baselines
+    """
+
+    sizes = os.environ.get("M2CPP_BENCH_SIZES", "small").split(",")
+    tolerance = float(os.environ.get("M2CPP_BENCH_TOLERANCE", 2.5))
+    baselines = load_baselines()
+
+    print
+    print "benchmark: size   | lines |  nodes | parse [s] | configure [s] | translate [s] | memory [MB]"
+
+    failures = []
+    for size in sizes:
+
+        result = run(size)
+        seconds = result["seconds"]
+        print "benchmark: %-6s | %5d | %6d | %9.3f | %13.3f | %13.3f | %11.1f" % (
+                size, result["lines"], result["nodes"], seconds["parse"],
+                seconds["configure"], seconds["translate"], result["memory"])
+
+        if size in baselines:
+            failures.extend([size + " " + failure for failure in
+                compare(result, baselines[size], tolerance)])
+
+    assert not failures, "\n".join(failures)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+            description="Translation benchmarks for matlab2cpp")
+    parser.add_argument("--measure", metavar="SIZE",
+            help="measure a single size in this process, print as JSON")
+    parser.add_argument("--update", nargs="+", metavar="SIZE",
+            help="store new baselines for the given sizes")
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print json.dumps(measure(args.measure))
+
+    elif args.update:
+        baselines = load_baselines()
+        for size in args.update:
+            result = run(size)
+            baselines[size] = {"lines": result["lines"],
+                    "nodes": result["nodes"],
+                    "cost": result["cost"], "memory": result["memory"]}
+            print size, json.dumps(baselines[size], sort_keys=True)
+
+        f = open(baseline_file, "w")
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+        f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
+"""
+Translation tests.  Most cases run in-process through
+:py:func:`~matlab2cpp.translate_sources` and share no files or working
+directory, so the suite can be run in parallel, for example with
+``py.test -n auto`` from pytest-xdist.  Tests of the command line, the server
+and search paths run in-process as well, on files in a temporary folder.
+"""
 import matlab2cpp
+import matlab2cpp.server
 import tempfile
 import os
+import sys
 import shutil
+import json
+import argparse
+import pytest
 from shutil import copy
+from StringIO import StringIO
 
 from subprocess import Popen, PIPE
 
@@ -17,16 +30,77 @@ def teardown_module(module):
     """Remove temporary folder after job is complete
     """
 
+    os.chdir(module.curdir)
     shutil.rmtree(module.path)
 
 
+def translate(code, filename="test.m", **options):
+    """Translate Matlab code in-process, return files without header stamp."""
+
+    sources = options.pop("sources", {})
+    sources[filename] = code
+
+    files = matlab2cpp.translate_sources(sources, filename, **options)
+    for name in files:
+        if name[-4:] in (".cpp", ".hpp"):
+            files[name] = "\n".join(files[name].split("\n")[2:])
+    return files
+
+
+def run_main(filename, **options):
+    """Run m2cpp in-process on a file in the current folder, return its output."""
+
+    args = dict(matlab2cpp.OPTIONS, filename=filename, disp=False, tree=False,
+            tree_full=False, line=None, profile=None, profile_top=25)
+    args.update(options)
+
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+        matlab2cpp.main(argparse.Namespace(**args))
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+
+def run_cpp(files, main, flags=(), run=True):
+    """Compile and run translated files with a main program, return its output.
+Skipped if no C++ compiler or a header is not available."""
+
+    folder = tempfile.mkdtemp()
+    try:
+        for name, code in files.items():
+            with open(os.path.join(folder, name), "w") as f:
+                f.write(code)
+        with open(os.path.join(folder, "main.cpp"), "w") as f:
+            f.write(main)
+
+        try:
+            proc = Popen(["g++", "-std=c++11", "main.cpp", "-o", "main",
+                "-larmadillo"] + list(flags), cwd=folder, stdout=PIPE,
+                stderr=PIPE)
+        except OSError:
+            pytest.skip("no C++ compiler")
+        _, err = proc.communicate()
+        if "fatal error" in err and "No such file" in err:
+            pytest.skip(err.split("fatal error:")[1].splitlines()[0].strip())
+        assert proc.returncode == 0, err
+
+        if not run:
+            return ""
+
+        proc = Popen(["./main"], cwd=folder, stdout=PIPE, stderr=PIPE)
+        out, err = proc.communicate()
+        assert proc.returncode == 0, err
+        return out
+
+    finally:
+        shutil.rmtree(folder)
+
+
 def test_variable_suggest():
     """Test basic variable types
     """
 
-    # change to temporary dir
-    os.chdir(path)
-
     m_code = """
 a = 1
 b = 2.
@@ -35,18 +109,7 @@ d = [4, 5]
 e = [6; 7]
     """
 
-    f = open("test.m", "w")
-    f.write(m_code)
-    f.close()
-
-    os.system("m2cpp test.m -rs > /dev/null")
-
-    f = open("test.m.cpp", "r")
-    converted_code = f.read()
-    f.close()
-
-    # strip header
-    converted_code = "\n".join(converted_code.split("\n")[2:])
+    converted_code = translate(m_code, reset=True, suggest=True)["test.m.cpp"]
 
     reference_code = """#include <armadillo>
 using namespace arma ;
@@ -76,9 +139,6 @@ def test_function_suggestion():
     """Test suggestion for function with single return
     """
 
-    # change to temporary dir
-    os.chdir(path)
-
     m_code = """
 function y=f(x)
     y = x+2
@@ -89,18 +149,7 @@ function g()
 end
     """
 
-    f = open("test.m", "w")
-    f.write(m_code)
-    f.close()
-
-    os.system("m2cpp test.m -rs > /dev/null")
-
-    f = open("test.m.hpp", "r")
-    converted_code = f.read()
-    f.close()
-
-    # strip header
-    converted_code = "\n".join(converted_code.split("\n")[2:])
+    converted_code = translate(m_code, reset=True, suggest=True)["test.m.hpp"]
 
     reference_code = """#ifndef F_M_HPP
 #define F_M_HPP
@@ -135,9 +184,6 @@ def test_functions_suggestion():
     """Test suggestion for function with multiple returns
     """
 
-    # change to temporary dir
-    os.chdir(path)
-
     m_code = """
 function [y,z]=f(a,b)
     y = a+2
@@ -150,18 +196,7 @@ function g()
 end
     """
 
-    f = open("test.m", "w")
-    f.write(m_code)
-    f.close()
-
-    os.system("m2cpp test.m -rs > /dev/null")
-
-    f = open("test.m.hpp", "r")
-    converted_code = f.read()
-    f.close()
-
-    # strip header
-    converted_code = "\n".join(converted_code.split("\n")[2:])
+    converted_code = translate(m_code, reset=True, suggest=True)["test.m.hpp"]
 
     reference_code = """#ifndef F_M_HPP
 #define F_M_HPP
@@ -197,8 +232,6 @@ void g()
 
 def test_fx_decon():
 
-    os.chdir(path)
-
     m_code = """
 function [DATA_f] = fx_decon(DATA,dt,lf,mu,flow,fhigh);
  [nt,ntraces] = size(DATA);
@@ -320,8 +353,9 @@ mat fx_decon(mat DATA, double dt, int lf, double mu, double flow, int fhigh)
   cx_vec aux_in, aux_out_b, aux_out_f ;
   int ihigh, ilow, k, nf, nt, ntraces ;
   mat DATA_b, DATA_f ;
-  nt = DATA.n_rows ;
-  ntraces = DATA.n_cols ;
+  nt = DATA.n_rows;
+  ntraces = DATA.n_cols;
+  
   nf = pow(2, m2cpp::nextpow2(nt)) ;
   DATA_FX_f = arma::zeros<cx_mat>(nf, ntraces) ;
   DATA_FX_b = arma::zeros<cx_mat>(nf, ntraces) ;
@@ -348,12 +382,12 @@ mat fx_decon(mat DATA, double dt, int lf, double mu, double flow, int fhigh)
     DATA_FX_f.row(k-1) = arma::conj(DATA_FX_f.row(nf-k+1)) ;
     DATA_FX_b.row(k-1) = arma::conj(DATA_FX_b.row(nf-k+1)) ;
   }
-  DATA_f = arma::real(m2cpp::ifft<cx_mat>(DATA_FX_f, 1)) ;
-  DATA_f = DATA_f.rows(arma::span(0, nt-1)) ;
-  DATA_b = arma::real(m2cpp::ifft<cx_mat>(DATA_FX_b, 1)) ;
-  DATA_b = DATA_b.rows(arma::span(0, nt-1)) ;
+  DATA_f = arma::real(m2cpp::ifft(DATA_FX_f, 1)) ;
+  DATA_f = DATA_f.rows(0, nt-1) ;
+  DATA_b = arma::real(m2cpp::ifft(DATA_FX_b, 1)) ;
+  DATA_b = DATA_b.rows(0, nt-1) ;
   DATA_f = (DATA_f+DATA_b) ;
-  DATA_f.cols(arma::span(lf, ntraces-lf-1)) = DATA_f.cols(arma::span(lf, ntraces-lf-1))/2.0 ;
+  DATA_f.cols(lf, ntraces-lf-1) = DATA_f.cols(lf, ntraces-lf-1)/2.0 ;
   return DATA_f ;
 }
 
@@ -369,7 +403,7 @@ void ar_modeling(cx_vec x, int lf, double mu, cx_vec& yf, cx_vec& yb)
   R = x(arma::span(nx-lf, nx-1)) ;
   M = m2cpp::hankel(C, R) ;
   B = arma::trans(M)*M ;
-  beta = B(0, 0)*mu/100.0 ;
+  beta = B(0, 0)*(cx_double) mu/100.0 ;
   ab = arma::solve((B+beta*arma::eye<cx_mat>(lf, lf)), arma::trans(M), solve_opts::fast)*y ;
   temp = M*ab ;
   temp = arma::join_cols(temp, arma::zeros<cx_mat>(lf, 1)) ;
@@ -379,7 +413,7 @@ void ar_modeling(cx_vec x, int lf, double mu, cx_vec& yf, cx_vec& yb)
   R = arma::flipud(x(arma::span(0, lf-1))) ;
   M = toeplitz(C, R) ;
   B = arma::trans(M)*M ;
-  beta = B(0, 0)*mu/100.0 ;
+  beta = B(0, 0)*(cx_double) mu/100.0 ;
   af = arma::solve((B+beta*arma::eye<cx_mat>(lf, lf)), arma::trans(M), solve_opts::fast)*y ;
   temp = M*af ;
   temp = arma::join_cols(arma::zeros<cx_mat>(lf, 1), temp) ;
@@ -389,25 +423,651 @@ void ar_modeling(cx_vec x, int lf, double mu, cx_vec& yf, cx_vec& yb)
 #endif
     """
 
-    f = open("fx_decon.m", "w")
-    f.write(m_code)
+    converted_code = translate(m_code, "fx_decon.m", suggest=True,
+            sources={"fx_decon.m.py": py_file})["fx_decon.m.hpp"].strip()
+
+    reference_code = reference_code.strip()
+
+    assert converted_code == reference_code
+
+
+def test_json_supplement():
+    """Test declarative and consolidated supplement files
+    """
+
+    m_code = """
+function y=f(x)
+    y = x+2
+end
+    """
+
+    supplement = '{"functions": {"f": {"x": "vec", "y": "vec"}}}'
+    files = translate(m_code, sources={"test.m.json": supplement})
+    assert "vec f(vec x)" in files["test.m.hpp"]
+
+    project = {"test.m": {"functions": {"f": {"x": "int", "y": "int"}}}}
+    files = translate(m_code, reset=True, supplement=project)
+    assert "int f(int x)" in files["test.m.hpp"]
+
+
+def test_serve():
+    """Test translation server protocol
+    """
+
+    os.chdir(path)
+
+    f = open("test.m", "w")
+    f.write("function y=f(x)\n    y = x+2\nend\nfunction g()\n    f(3)\nend\n")
     f.close()
 
-    f = open("fx_decon.m.py", "w")
-    f.write(py_file)
+    if os.path.isfile("test.m.hpp"):
+        os.remove("test.m.hpp")
+
+    requests = '{"id": 1, "filename": "test.m", "options": {"suggest": true}}\n' +\
+        '{"id": 2, "code": "a = 1"}\n' +\
+        '{"id": 3, "command": "stats"}\n'
+
+    out = StringIO()
+    matlab2cpp.server.serve(argparse.Namespace(reset=True),
+            stdin=StringIO(requests), stdout=out)
+    responses = [json.loads(line)
+        for line in out.getvalue().strip().split("\n")]
+
+    assert [r["id"] for r in responses] == [1, 2, 3]
+    assert "int f(int x)" in responses[0]["files"]["test.m"]["hpp"]
+    assert "a = 1 ;" in responses[1]["files"]["unnamed"]["cpp"]
+    assert responses[2]["requests"] == 2
+    assert not os.path.isfile("test.m.hpp")
+
+
+def test_dependency_paths():
+    """Test dependency discovery through search paths with precedence
+    """
+
+    os.chdir(path)
+
+    for folder in ["lib1", "lib2"]:
+        if not os.path.isdir(folder):
+            os.mkdir(folder)
+
+    f = open("lib1" + os.sep + "g.m", "w")
+    f.write("function y=g(x)\n    y = h(x)\nend\n")
     f.close()
 
-    os.system("m2cpp fx_decon.m -s > /dev/null")
+    f = open("lib2" + os.sep + "g.m", "w")
+    f.write("function y=g(x)\n    y = x\nend\n")
+    f.close()
 
-    f = open("fx_decon.m.hpp", "r")
-    converted_code = "\n".join(f.read().split("\n")[2:]).strip()
+    f = open("lib2" + os.sep + "h.m", "w")
+    f.write("function y=h(x)\n    y = x\nend\n")
     f.close()
 
-    reference_code = reference_code.strip()
+    f = open("paths.m", "w")
+    f.write("path(path, '%s');\npath(path, '%s');\n" % (
+        os.path.join(path, "lib1"), os.path.join(path, "lib2")))
+    f.close()
+
+    f = open("deps.m", "w")
+    f.write("a = g(4)\n")
+    f.close()
+
+    run_main("deps.m", reset=True, suggest=True, paths_file="paths.m")
+
+    f = open("deps.m.cpp", "r")
+    converted_code = f.read()
+    f.close()
+    assert '#include "g.m.hpp"' in converted_code
+
+    f = open("g.m.hpp", "r")
+    converted_code = f.read()
+    f.close()
+    assert '#include "h.m.hpp"' in converted_code
+    assert os.path.isfile("h.m.hpp")
+
+
+def test_prune():
+    """Test removal of functions not reachable from the main file
+    """
+
+    util = """function y=util(x)
+    y = used(x)
+end
+function y=used(x)
+    y = x
+end
+function y=unused(x)
+    y = dead(x)
+end
+"""
+    dead = "function y=dead(x)\n    y = x\nend\n"
+
+    files = translate("a = util(4)\n", "prune.m", reset=True, suggest=True,
+            prune=True, sources={"util.m": util, "dead.m": dead})
+
+    assert "used(" in files["util.m.hpp"]
+    assert "unused" not in files["util.m.hpp"]
+    assert "dead.m.hpp" not in files
+
+    assert "Unreachable functions pruned: unused" in files["util.m.log"]
+    assert "Unreachable functions pruned: dead.m" in files["prune.m.log"]
 
-    assert converted_code == reference_code
 
+def test_io_supplement():
+    """Test I/O backend selection per file through the supplement
+    """
+
+    m_code = """function io()
+    a = load('big.bin')
+    save('out.bin', 'a')
+end
+"""
+    supplement = json.dumps({"functions": {"io": {"a": "mat"}},
+        "io": {"big.bin": "mmap", "out.bin": "binary"}})
+
+    files = translate(m_code, "io.m", sources={"io.m.json": supplement})
+    converted_code = files["io.m.hpp"]
+
+    assert '#include "mconvert.h"' in converted_code
+    assert "m2cpp::mapping _a_map ;" in converted_code
+    assert 'm2cpp::load_mapped(a, "big.bin", _a_map) ;' in converted_code
+    assert 'a.save("out.bin", arma_binary) ;' in converted_code
+    assert "load_mapped" in files["mconvert.h"]
+
+    assert json.loads(files["io.m.json"])["io"] == \
+            {"big.bin": "mmap", "out.bin": "binary"}
+
+    # mapped memory must not outlive the function
+    m_code = "function a=io()\na = load('big.bin');\n"
+    files = translate(m_code, "io.m", sources={"io.m.json": supplement})
+    assert 'm2cpp::load_direct(a, "big.bin") ;' in files["io.m.hpp"]
+    assert "m2cpp::mapping" not in files["io.m.hpp"]
+
+    # saved with a header that keeps the data aligned for mapping
+    m_code = "function io(a)\nsave('big.bin', 'a');\n"
+    files = translate(m_code, "io.m", sources={"io.m.json": supplement})
+    assert 'm2cpp::save_aligned(a, "big.bin") ;' in files["io.m.hpp"]
+
+    m_code = "function s=io()\na = load('big.bin');\ns = sum(sum(a));\n"
+    files = translate(m_code, "io.m", sources={"io.m.json": json.dumps(
+        {"functions": {"io": {"a": "mat", "s": "double"}},
+        "io": {"big.bin": "mmap"}})})
+    assert 'm2cpp::load_mapped(a, "big.bin", _a_map) ;' in files["io.m.hpp"]
+
+    main = """#include "io.m.hpp"
+
+// mappings of big.bin in this process
+int mapped_files() {
+  std::ifstream maps("/proc/self/maps") ;
+  std::string line ;
+  int n = 0 ;
+  while (std::getline(maps, line))
+    n += line.find("big.bin") != std::string::npos ;
+  return n ;
+}
+
+int main() {
+  mat x = arma::ones<mat>(100, 100) ;
+  {
+    mat a ;
+    m2cpp::mapping m ;
+
+    // Armadillo's header leaves the data unaligned, it is read instead
+    x.save("big.bin", arma_binary) ;
+    m2cpp::load_mapped(a, "big.bin", m) ;
+    std::printf("%d %g ", int(m.mapped()), arma::accu(a)) ;
+
+    m2cpp::save_aligned(x, "big.bin") ;
+    m2cpp::load_mapped(a, "big.bin", m) ;
+    std::printf("%d %d %d ", int(m.mapped()), int(a.mem_state), mapped_files()) ;
+
+    // still an arma_binary file
+    mat b ;
+    b.load("big.bin") ;
+    std::printf("%d ", int(arma::approx_equal(a, b, "absdiff", 0))) ;
+  }
+
+  double s = 0 ;
+  for (int k=0; k<10000; k++)
+    s += io() ;
+  std::printf("%g %d", s, mapped_files()) ;
+  return 0 ;
+}
+"""
+    assert run_cpp(files, main) == "0 10000 1 1 1 1 1e+08 0"
+
+
+def test_fprintf_file():
+    """Test buffered formatted output to files and standard output
+    """
+
+    out = os.path.join(path, "fprintf.txt")
+    m_code = """function p(x)
+    fid = fopen('%s', 'w');
+    fprintf(fid, '%%d %%5.2f\\n', x);
+    fprintf('%%s=%%g\\n', 'a', 2.5);
+    fclose(fid);
+end
+""" % out
+
+    files = translate(m_code, "p.m", sources={"p.m.py": "functions = %r\n" %
+        {"p": {"x": "vec", "fid": "int"}}})
+    assert "fid = m2cpp::fopen(" in files["p.m.hpp"]
+    assert 'm2cpp::fprintf(fid, "%d %5.2f\\n", x) ;' in files["p.m.hpp"]
+
+    main = """#include "p.m.hpp"
+int main() {
+  p(arma::linspace<vec>(1, 4, 4)) ;
+  return 0 ;
+}
+"""
+    assert run_cpp(files, main) == "a=2.5\n"
+
+    f = open(out, "r")
+    assert f.read() == "1  2.00\n3  4.00\n"
+    f.close()
+
+
+def test_instrument():
+    """Test scoped timers around functions and top-level loops
+    """
+
+    m_code = """function y=instrument(x)
+    y = 0
+    for i=1:x
+        y = y + i
+    end
+end
+"""
+
+    files = translate(m_code, "instrument.m", reset=True, instrument="loops")
+    converted_code = files["instrument.m.hpp"]
+
+    assert '#include "mconvert.h"' in converted_code
+    assert 'static m2cpp::timing _timing_("instrument.m", 1, "instrument") ;' \
+            in converted_code
+    assert 'static m2cpp::timing _timing_("instrument.m", 3, "for i") ;' \
+            in converted_code
+    assert converted_code.count("m2cpp::scope_timer _timer_(_timing_) ;") == 2
+
+    files = translate(m_code, "instrument.m", instrument="loops",
+            sources={"instrument.m.py": "functions = %r\n" %
+                {"instrument": {"x": "int", "y": "int", "i": "int"}}})
+
+    report = os.path.join(path, "instrument.txt")
+    os.environ["M2CPP_PROFILE"] = report
+    try:
+        out = run_cpp(files, '#include "instrument.m.hpp"\n'
+                'int main() { std::printf("%d", instrument(4)); return 0; }\n')
+    finally:
+        del os.environ["M2CPP_PROFILE"]
+    assert out == "10"
+
+    f = open(report, "r")
+    lines = f.read().splitlines()
+    f.close()
+    assert lines[0] == "# file\tline\tname\tcalls\tseconds\tseconds/call"
+    assert sorted([line.split("\t")[:4] for line in lines[1:]]) == [
+        ["instrument.m", "1", "instrument", "1"],
+        ["instrument.m", "3", "for i", "1"]]
+
+
+def test_profile():
+    """Test JSON report of translator phases and rules
+    """
+
+    os.chdir(path)
+
+    f = open("profiled.m", "w")
+    f.write("a = [1, 2, 3]\nb = a(2)\n")
+    f.close()
+
+    run_main("profiled.m", reset=True, profile="profiled.json", profile_top=3)
+
+    f = open("profiled.json", "r")
+    report = json.load(f)
+    f.close()
+
+    phases = [phase["name"] for phase in report["phases"]]
+    assert phases == ["discover", "read", "load", "configure", "preorder",
+            "translate", "postorder", "write"]
+    assert report["phases"][3]["nodes"] > 0
+    assert len(report["rules"]) == 3
+    assert report["rules_by_calls"][0]["calls"] >= report["rules_by_calls"][1]["calls"]
+
+
+def test_lazy():
+    """Test expression template friendly forms with the lazy option
+    """
+
+    m_code = """function [s, t, y, c, B] = lazy(A, x, a, z)
+s = x'*x
+t = sum(sum(A)) + sum(x)
+y = A.'*x
+c = max(a, 2.5) + min(z, 1)
+B = A + zeros(size(A))
+end
+"""
+    supplement = {"lazy": {"A": "mat", "x": "vec", "a": "int",
+        "z": "cx_double", "s": "double", "t": "double", "y": "vec",
+        "c": "cx_double", "B": "mat"}}
+    sources = {"lazy.m.py": "functions = %r\n" % supplement}
+
+    eager = translate(m_code, "lazy.m",
+            sources=dict(sources))["lazy.m.hpp"]
+    assert "s = arma::as_scalar(arma::trans(x)*x) ;" in eager
+
+    files = translate(m_code, "lazy.m", lazy=True,
+            sources=dict(sources))
+    converted_code = files["lazy.m.hpp"]
+
+    assert "s = arma::dot(x, x) ;" in converted_code
+    assert "t = arma::accu(A)+arma::accu(x) ;" in converted_code
+    assert "y = A.t()*x ;" in converted_code
+    assert "c = std::max<double>(a, 2.5)+m2cpp::cx_min<cx_double>(z, 1) ;" \
+            in converted_code
+    assert "B = A+arma::zeros<mat>(arma::size(A)) ;" in converted_code
+    assert "cx_min" in files["mconvert.h"]
+
+    # cdot only for two complex vectors
+    m_code = "function [s, t] = lazy(z, w, x)\ns = z'*w;\nt = z'*x;\n"
+    supplement = {"lazy": {"z": "cx_vec", "w": "cx_vec", "x": "vec",
+        "s": "cx_double", "t": "cx_double"}}
+    converted_code = translate(m_code, "lazy.m", lazy=True, sources={
+        "lazy.m.py": "functions = %r\n" % supplement})["lazy.m.hpp"]
+    assert "s = arma::cdot(z, w) ;" in converted_code
+    assert "t = arma::as_scalar(z.t()*x) ;" in converted_code
+
+
+def test_fixed_size():
+    """Test fixed size types from constant shapes and annotations
+    """
+
+    m_code = """function y = rotate(q, x)
+R = eye(3);
+t = [q(1); q(2); q(3)];
+for k=1:3
+    R = R*R;
+end
+y = R*x + t;
+[s, v] = size(R);
+A = zeros(3, 3);
+A = zeros(3, 4);
+"""
+    supplement = {"rotate": {"q": "vec4", "x": "vec", "y": "vec", "k": "int",
+        "t": "vec", "s": "int", "v": "int"}}
+    sources = {"rotate.m.py": "functions = %r\n" % supplement}
+
+    files = translate(m_code, "rotate.m", fixed_size=True, suggest=True,
+            sources=dict(sources))
+    converted_code = files["rotate.m.hpp"]
+
+    assert "vec rotate(vec::fixed<4> q, vec x)" in converted_code
+    assert "mat::fixed<3,3> R ;" in converted_code
+    assert "vec::fixed<3> t ;" in converted_code
+    assert "mat A ;" in converted_code
+    assert "vec y ;" in converted_code
+
+    types = {}
+    exec files["rotate.m.py"] in types
+    assert types["functions"]["rotate"]["R"] == "mat"
+    assert types["functions"]["rotate"]["q"] == "vec4"
+
+    # without the option only annotated variables are fixed
+    converted_code = translate(m_code, "rotate.m", suggest=True,
+            sources=dict(sources))["rotate.m.hpp"]
+    assert "vec rotate(vec::fixed<4> q, vec x)" in converted_code
+    assert "mat A, R ;" in converted_code
+
+    # inferred shapes follow changes to the code
+    m_code = m_code.replace("y = R", "if q(1)>1\n    R = eye(4);\nend\ny = R")
+    converted_code = translate(m_code, "rotate.m", fixed_size=True,
+            suggest=True, sources={"rotate.m.py": files["rotate.m.py"]}
+            )["rotate.m.hpp"]
+    assert "mat A, R ;" in converted_code
+    assert "vec::fixed<3> t ;" in converted_code
+
+
+def test_refine():
+    """Test scalar 1x1 arrays and unsigned loop counters
+    """
+
+    m_code = """function y = trace2(A)
+y = 0.;
+for k=1:size(A, 1)
+    t = [A(k,k)];
+    y = y + t*t;
+end
+for j=0:2:10
+    y = y - j;
+end
+"""
+    sources = {"trace2.m.py": "functions = %r\n" % {"trace2": {"A": "mat"}}}
 
+    files = translate(m_code, "trace2.m", suggest=True, sources=sources)
+    converted_code = files["trace2.m.hpp"]
+
+    assert "double t, y ;" in converted_code
+    assert "t = A(k-1, k-1) ;" in converted_code
+    assert "uword k ;" in converted_code
+    assert "int j ;" in converted_code
+
+    log = files["trace2.m.log"]
+    assert "Variable t is always 1x1" in log
+    assert "Loop counter k only used for indexing" in log
+
+
+def test_specialise():
+    """Test overloads specialised by the argument types of the calls
+    """
+
+    m_code = """function f(x, r, A)
+s = first(x) + first(A) + first(r);
+function s=first(y)
+z = y.*y;
+s = z(1);
+"""
+    sources = {"f.m.py": "functions = %r\n" % {"f": {"x": "vec",
+        "r": "rowvec", "A": "mat"}}}
+
+    files = translate(m_code, "f.m", suggest=True, specialise=4,
+            sources=dict(sources))
+    converted_code = files["f.m.hpp"]
+
+    assert "double first(vec y) ;" in converted_code
+    assert "double first(mat y) ;" in converted_code
+    assert "double first(rowvec y) ;" in converted_code
+    assert "rowvec z ;" in converted_code
+
+    types = {}
+    exec files["f.m.py"] in types
+    assert types["functions"]["first"]["y"] == "vec"
+    assert types["functions"]["first"]["_overloads"] == [{"y": "mat"},
+            {"y": "rowvec"}]
+
+    # the supplement file brings the overloads back
+    assert translate(m_code, "f.m", suggest=True,
+            sources={"f.m.py": files["f.m.py"]})["f.m.hpp"] == converted_code
+
+    # unless the code has changed so they are no longer safe
+    changed = translate(m_code.replace("z = y", "y = y(:);\nz = y"), "f.m",
+            suggest=True, sources={"f.m.py": files["f.m.py"]})["f.m.hpp"]
+    assert "first(mat y)" not in changed
+    assert "first(rowvec y)" not in changed
+
+    # too many overloads, only the general version
+    converted_code = translate(m_code, "f.m", suggest=True, specialise=1,
+            sources=dict(sources))["f.m.hpp"]
+    assert converted_code.count("first(") == 5
+
+    # expressions could call either overload
+    m_code = m_code.replace("first(r)", "first(A')")
+    converted_code = translate(m_code, "f.m", suggest=True, specialise=4,
+            sources=dict(sources))["f.m.hpp"]
+    assert converted_code.count("first(") == 5
+
+
+def test_promote_find_complex():
+    """Test that find and complex promotion of the same variable terminate
+    """
+
+    m_code = "a=[1,2,3]; b=find(a>1); b=fft(a); c=b(1)"
+    converted_code = translate(m_code, suggest=True)["test.m.cpp"]
+
+    assert "cx_vec b ;" in converted_code or "cx_vec b," in converted_code
+    assert "b = arma::fft(a) ;" in converted_code
+
+
+def test_find_in_builtins():
+    """Test that find results passed to functions stay one-based
+    """
+
+    converted_code = translate("a=[1,2,3]; k=find(a>1); c=cumsum(k)",
+            suggest=True)["test.m.cpp"]
+    assert "k = find(a>1) + 1 ;" in converted_code
+
+    converted_code = translate("a=[1,2,3]; c=cumsum(find(a>1))",
+            suggest=True)["test.m.cpp"]
+    assert "cumsum(find(a>1) + 1)" in converted_code
+
+    converted_code = translate("a=[1,2,3]; k=find(a>1); c=abs(k)",
+            suggest=True)["test.m.cpp"]
+    assert "k = find(a>1) + 1 ;" in converted_code
+
+    # indices of an array are kept zero-based
+    converted_code = translate("a=[1,2,3]; k=find(a>1); c=a(k)",
+            suggest=True)["test.m.cpp"]
+    assert "k = find(a>1) ;" in converted_code
+
+
+def test_hoist_invariant():
+    """Test that hoisted expressions replace only their own nodes
+    """
+
+    m_code = "n=2.; nn=1.; for i=1:2; nn=nn+1.; z=n*sqrt(n); y=nn*sqrt(n); end"
+    converted_code = translate(m_code, suggest=True)["test.m.cpp"]
+
+    assert "const double _i_inv1 = n*sqrt(n) ;" in converted_code
+    assert "const double _i_inv2 = sqrt(n) ;" in converted_code
+    assert "z = _i_inv1 ;" in converted_code
+    assert "y = nn*_i_inv2 ;" in converted_code
+
+    # functions called without parenthesis are not invariant
+    m_code = "for i=1:2; y = rand*2; end"
+    converted_code = translate(m_code, suggest=True)["test.m.cpp"]
+    assert "_i_inv1" not in converted_code
+
+
+def test_hoist_bounds():
+    """Test that only bounds with calls, or written in the loop, are hoisted
+    """
+
+    m_code = "function f(n, x)\nfor i=1:n; a=i; end\nfor j=2:2:n-1; a=j; end"
+    converted_code = translate(m_code)["test.m.hpp"]
+    assert "for (i=1; i<=n; i++)" in converted_code
+    assert "for (j=2; j<=n-1; j+=2)" in converted_code
+    assert "_stop" not in converted_code
+    assert "{\n  {" not in converted_code
+
+    m_code = "function f(n, x)\nfor i=1:numel(x); a=i; end\nfor j=1:n; n=n-1; end"
+    converted_code = translate(m_code)["test.m.hpp"]
+    assert "const auto _i_stop = numel(x) ;" in converted_code
+    assert "const auto _j_stop = n ;" in converted_code
+
+
+def test_growing_cells():
+    """Test that cells written outside their known size can grow
+    """
+
+    m_code = "function f(n)\na={}; for k=1:n; a{k}=k*2.5; end"
+    converted_code = translate(m_code, suggest=True)["test.m.hpp"]
+    assert "std::vector<double> a ;" in converted_code
+    assert "m2cpp::element(a, k) = k*2.5 ;" in converted_code
+
+    m_code = "function f()\nb=cell(1,2); b{5}=1.5;"
+    converted_code = translate(m_code, suggest=True)["test.m.hpp"]
+    assert "b = std::vector<double>(1*2) ;" in converted_code
+    assert "m2cpp::element(b, 5) = 1.5 ;" in converted_code
+
+    m_code = "function f()\nc={1,2}; c{end+1}=3;"
+    converted_code = translate(m_code, suggest=True)["test.m.hpp"]
+    assert "std::vector<int> c ;" in converted_code
+    assert "m2cpp::element(c, c.size()+1) = 3 ;" in converted_code
+
+    # indices inside the known size keep the field
+    m_code = "function f()\nb=cell(1,2); b{2}=1.5;"
+    converted_code = translate(m_code, suggest=True)["test.m.hpp"]
+    assert "field<double> b ;" in converted_code
+    assert "b(1) = 1.5 ;" in converted_code
+
+
+def test_strided_empty():
+    """Test that an empty stepped range selects nothing
+    """
+
+    m_code = "function y=f(x, n)\ny = x(1:2:n);\nx(1:2:n) = 0;"
+    files = translate(m_code, "f.m", sources={"f.m.py": "functions = %r\n" %
+        {"f": {"x": "vec", "n": "int", "y": "vec"}}})
+    assert "y = m2cpp::strided<vec>(x, 0, 2, n-1) ;" in files["f.m.hpp"]
+    assert "m2cpp::strided_view(x, 0, 2, n-1).fill(0) ;" in files["f.m.hpp"]
+
+    main = """#include "f.m.hpp"
+int main() {
+  vec x = arma::ones<vec>(3) ;
+  vec y = f(x, 0) ;
+  std::printf("%d %d", int(y.n_elem), int(arma::sum(x))) ;
+  return 0 ;
+}
+"""
+    assert run_cpp(files, main) == "0 3"
+
+
+def test_splot_header():
+    """Test that the plotting header compiles, and draws without GUI when queued
+    """
+
+    files = translate("function p(x)\nplot(x, x);\n", "p.m",
+            sources={"p.m.py": "functions = %r\n" % {"p": {"x": "vec"}}})
+    assert "mpl.use('agg')" in files["SPlot.h"]
+    assert 'py_put_variable("_splot_gui", mode != queued);' in files["SPlot.h"]
+
+    import sysconfig
+    try:
+        import numpy
+    except ImportError:
+        pytest.skip("NumPy not installed")
+
+    flags = ["-pthread", "-fsyntax-only", "-I" + sysconfig.get_paths()["include"],
+            "-I" + numpy.get_include()]
+    run_cpp(files, '#include "p.m.hpp"\nint main() { return 0; }\n', flags,
+            run=False)
+
+
+def test_soa_reference():
+    """Test that fields of struct of arrays are referred to, not copied
+    """
 
-if __name__ == "__main__":
-    os.system("py.test --tb short")
+    supplement = {"functions": {"f": {"c": "vec", "d": "double"}},
+        "structs": {"a": {"b": "double", "_size": 10, "_layout": "soa"}}}
+    sources = {"f.m.json": json.dumps(supplement)}
+
+    m_code = "function f()\na(1).b = 4.; a(2).b = 5.; c = [a.b]; d = c(1);"
+    converted_code = translate(m_code, "f.m", sources=dict(sources))["f.m.hpp"]
+    assert "const vec& c = a.b ;" in converted_code
+    assert "vec c ;" not in converted_code
+
+    # changed afterwards, c is a copy
+    m_code = "function f()\na(1).b = 4.; c = [a.b]; a(1).b = 3.; d = c(1);"
+    converted_code = translate(m_code, "f.m", sources=dict(sources))["f.m.hpp"]
+    assert "vec c ;" in converted_code
+    assert "  c = a.b ;" in converted_code
+
+    # other vector types are copied element by element
+    supplement["functions"]["f"]["c"] = "rowvec"
+    m_code = "function d=f()\na(1).b = 4.; a(2).b = 5.; c = [a.b]; d = c(2);"
+    files = translate(m_code, "f.m", sources={"f.m.json": json.dumps(supplement)})
+    assert "rowvec c ;" in files["f.m.hpp"]
+    assert "c(_i) = a.b(_i) ;" in files["f.m.hpp"]
+    assert "const" not in files["f.m.hpp"]
+
+    main = '#include "f.m.hpp"\nint main() { std::printf("%g", f()); return 0; }\n'
+    assert run_cpp(files, main) == "5"
@@ -0,0 +1,98 @@
+"""Startup benchmark for the matlab2cpp package
+
+Runs ``import matlab2cpp`` in a fresh interpreter with a timing import hook and
+reports a ``python -X importtime`` style breakdown (run pytest with ``-s`` to
+see it).  Rule modules and the embedded C++ headers are loaded on first use, so
+they must not show up in the import of the package itself.
+"""
+import os
+import sys
+import json
+from subprocess import Popen, PIPE
+
+import matlab2cpp
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(matlab2cpp.__file__)))
+
+importtime = r"""
+import sys, time, json, __builtin__
+
+_import = __builtin__.__import__
+stack = []
+times = []
+recorded = set()
+
+def timed_import(name, *args, **kws):
+    before = set(sys.modules)
+    stack.append(0.)
+    start = time.time()
+    try:
+        return _import(name, *args, **kws)
+    finally:
+        cumulative = time.time() - start
+        child = stack.pop()
+        if stack:
+            stack[-1] += cumulative
+        for module in set(sys.modules) - before - recorded:
+            recorded.add(module)
+            if sys.modules[module] is not None:
+                times.append((module, cumulative-child, cumulative))
+
+__builtin__.__import__ = timed_import
+start = time.time()
+%s
+total = time.time() - start
+__builtin__.__import__ = _import
+
+modules = sorted(m for m in sys.modules
+        if m.startswith("matlab2cpp") and sys.modules[m] is not None)
+print json.dumps({"total": total, "times": times, "modules": modules})
+"""
+
+lazy = ["matlab2cpp.pyplot", "matlab2cpp.m2cpp", "matlab2cpp.manual",
+        "matlab2cpp.server", "matlab2cpp.typetrace",
+        "matlab2cpp.rules._reserved", "matlab2cpp.configure.reserved",
+        "matlab2cpp.rules._mat", "matlab2cpp.rules._cx_cube"]
+
+
+def run(code):
+    """Run code in a fresh interpreter and return the import breakdown
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    proc = Popen([sys.executable, "-c", importtime % code],
+            stdout=PIPE, env=env, cwd=root)
+    out, _ = proc.communicate()
+    assert proc.returncode == 0
+    return json.loads(out.strip().split("\n")[-1])
+
+
+def test_import_breakdown():
+    """Report import time per module and verify lazy modules are not loaded
+    """
+
+    result = run("import matlab2cpp")
+
+    print
+    print "import time: self [us] | cumulative | imported package"
+    times = sorted(result["times"], key=lambda x: -x[1])
+    for name, self_, cumulative in times[:20]:
+        print "import time: %9d | %10d | %s" % (
+                self_*1e6, cumulative*1e6, name)
+    print "import time total: %.1f ms" % (result["total"]*1e3)
+
+    for name in lazy:
+        assert name not in result["modules"]
+
+
+def test_rules_loaded_on_use():
+    """Translation triggers import of the needed rule modules only
+    """
+
+    result = run("import matlab2cpp; matlab2cpp.qscript('a = zeros(3, 3)')")
+
+    modules = result["modules"]
+    assert "matlab2cpp.rules._reserved" in modules
+    assert "matlab2cpp.configure.reserved" in modules
+    assert "matlab2cpp.rules._cx_cube" not in modules
+    assert "matlab2cpp.pyplot" not in modules
@@ -0,0 +1,59 @@
+"""Datatypes from recorded type traces
+
+The folder `traces` holds observations of `kernel.m` and `main.m` recorded in
+three runs: two compact traces, and `whos_f` logs from running the copy
+instrumented by `m2cpp -S`.
+"""
+import os
+import tempfile
+import shutil
+
+import matlab2cpp
+from matlab2cpp import typetrace
+
+traces = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+
+sources = {
+    "main.m": "x = [1 2 3];\ny = kernel(x', 4);",
+    "kernel.m": "function y = kernel(x, n)\ns = x*2;\ny = s + n;",
+}
+
+merged = {
+    "kernel.m": {"kernel": {"x": "vec", "n": "double", "s": "cx_vec",
+        "y": "cx_vec"}},
+    "main.m": {"main": {"x": "rowvec", "y": "cx_vec"}},
+}
+
+
+def test_merge_runs():
+    """Observations from all runs keep the widest dim and mem
+    """
+    assert typetrace.read(traces) == merged
+
+    # merging is independent of the order of the runs
+    names = sorted(os.listdir(traces), reverse=True)
+    assert typetrace.read([os.path.join(traces, name)
+        for name in names]) == merged
+
+
+def test_write_roundtrip():
+    """Merged traces written as a single trace read back the same
+    """
+    path = tempfile.mkdtemp()
+    try:
+        output = os.path.join(path, "merged.trace")
+        typetrace.main([output, traces])
+        assert typetrace.read(output) == merged
+    finally:
+        shutil.rmtree(path)
+
+
+def test_translate_with_traces():
+    """Traced datatypes are used for translation without Matlab
+    """
+    files = matlab2cpp.translate_sources(dict(sources), "main.m",
+            type_trace=typetrace.read(traces))
+
+    assert "cx_vec kernel(vec x, double n)" in files["kernel.m.hpp"]
+    assert "cx_vec s, y ;" in files["kernel.m.hpp"]
+    assert "rowvec x ;" in files["main.m.cpp"]
@@ -58,13 +58,26 @@ code through the front end functions in :py:mod:`matlab2cpp.qfunctions`::
     """
 
     def __init__(self, disp=False, comments=True, original=False, enable_omp=False, enable_tbb=False,
-                 reference=False, **kws):
+                 reference=False, instrument=None, lazy=False, fixed_size=False,
+                 specialise=0, **kws):
         """
 Args:
     disp (bool):
         Verbose output while loading code
     comments (bool):
         Include comments in the code interpretation
+    instrument (str):
+        Add scoped timers to functions ("func") or functions and top-level
+        loops ("loops")
+    lazy (bool):
+        Prefer forms that Armadillo evaluates without temporaries, like
+        `accu`, `dot` and `.t()`, see :py:func:`~matlab2cpp.rules.armadillo.lazy`
+    fixed_size (bool):
+        Declare small arrays of constant size with fixed size types, see
+        :py:mod:`~matlab2cpp.configure.shapes`
+    specialise (int):
+        Largest number of overloads specialised for the argument types at the
+        call sites of a function, see :py:mod:`~matlab2cpp.configure.overloads`
     **kws: 
         Optional arguments are passed to :py:mod:`matlab2cpp.rules`
         """
@@ -78,8 +91,18 @@ Args:
         self.enable_omp = enable_omp
         self.enable_tbb = enable_tbb
         self.reference = reference
+        self.instrument = instrument
+        self.lazy = lazy
+        self.fixed_size = fixed_size
+        self.specialise = specialise
         self.configured = False
 
+        # Matlab code by file name, for translation without file system
+        self.sources = {}
+
+        # generated headers by file name, or None to write them to disk
+        self.headers = None
+
 
     def __getitem__(self, index):
         """
@@ -192,7 +215,7 @@ Example::
         reserved = set([])
         for i in xrange(len(unassigned)-1, -1, -1):
 
-            if unassigned[i] in mc.rules._reserved.reserved:
+            if unassigned[i] in mc.rules.reserved:
                 reserved.add(unassigned.pop(i))
 
         for node in nodes[::-1]:
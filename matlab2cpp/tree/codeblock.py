@@ -162,6 +162,10 @@ Example:
             self.code[cur+4] not in c.letters+c.digits+"_":
             cur = self.create_reserved(block, cur)
 
+        elif self.code[cur:cur+4] == "save" and \
+            self.code[cur+4] not in c.letters+c.digits+"_":
+            cur = self.create_reserved(block, cur)
+
         elif self.code[cur:cur+4] == "disp" and \
             self.code[cur+4] not in c.letters+c.digits+"_":
             cur = self.create_reserved(block, cur)
@@ -479,7 +479,7 @@ Example:
     >>> print mc.qtree(builder, core=True) # doctest: +NORMALIZE_WHITESPACE
     1 1Block      code_block   TYPE
     1 1| Statement  code_block   TYPE
-    1 1| | Cell       cell         TYPE
+    1 1| | Cell       cell         cell
     1 2| | | Int        int          int
     1 5| | | Int        int          int
     """
@@ -497,7 +497,9 @@ Example:
         L = iterate.space_list(self, cur)
     else:
         L = iterate.comma_list(self, cur)
-    cell = mc.collection.Cell(node, cur=cur, code=self.code[cur:end+1])
+    # number of rows is kept for preallocation
+    cell = mc.collection.Cell(node, cur=cur, code=self.code[cur:end+1],
+            value=str(len([array for array in L if array]) or 1))
 
     for array in L:
 
@@ -602,6 +604,30 @@ def reserved(self, node, start):
 
         return k
     
+    if self.code[k:k+4] == "save":
+
+        statement = mc.collection.Statement(node, cur=start,
+                                            code=self.code[start:newline])
+
+        l = k+4
+        while self.code[l] in " \t":
+            l += 1
+
+        if self.code[l] == "(":
+            return expression.create(self, statement, k)
+
+        # save filename var1 var2 ...
+        names = self.code[l:newline].replace("'", "").split()
+        if not names:
+            self.syntaxerror(l, "save filename")
+
+        get = mc.collection.Get(statement, name="save", cur=start,
+                value=names[0])
+        for name in names[1:]:
+            mc.collection.Var(get, name)
+
+        return newline
+
     if self.code[k:k+4] == "hold":
 
         statement = mc.collection.Statement(node, cur=start,
@@ -111,7 +111,7 @@ Example:
             num = 0
             while self.code[k] == "{":
 
-                cur = findend.cell(self, k)
+                cur = cell_arg(self, node, k)
                 #cur = self.iterate_cell(node, k)
 
                 #print node.code
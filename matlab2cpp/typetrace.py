@@ -0,0 +1,388 @@
+"""
+Datatypes from variables observed while running the Matlab code.
+
+With `m2cpp -S` the project is copied to `m2cpp_data_type_temp`, instrumented
+with calls to `whos_f`, and run through the Matlab engine.  The logs can as
+well be collected on another machine by running the instrumented copy there,
+possibly several times with different input.  This module reads such logs and
+compact traces, merges them, and applies the result to the loaded programs
+without Matlab::
+
+    m2cpp main.m --type-trace logs/ run2.trace
+
+A trace is a text file with one observed variable per line, with tab separated
+columns::
+
+    # m2cpp type trace
+    <file>  <function>  <variable>  <size>  <class>  <flags>
+
++--------------+-------------------------------------------------------------+
+| Column       | Description                                                 |
++==============+=============================================================+
+| `file`       | Basename of the Matlab file, like ``lib.m``                 |
++--------------+-------------------------------------------------------------+
+| `function`   | Function name, ``main`` for scripts                         |
++--------------+-------------------------------------------------------------+
+| `size`       | Dimensions as in `whos`, like ``3x1`` or ``2x2x4``          |
++--------------+-------------------------------------------------------------+
+| `class`      | Matlab class, like ``double``, ``single`` or ``int32``      |
++--------------+-------------------------------------------------------------+
+| `flags`      | ``c`` if complex, ``i`` if all values are integers, or      |
+|              | ``-`` for neither                                           |
++--------------+-------------------------------------------------------------+
+
+Lines starting with ``#`` are comments.  The logs written by `whos_f` (files
+named ``<file>.txt``) are read as well, and :py:func:`write` converts any of
+them to a trace.  A variable observed with different types gets the widest
+dimension and memory type, so a value seen both as a scalar and a vector is a
+vector, as a column and a row vector a matrix, and once complex always
+complex.
+
+Example:
+    >>> traces = parse("lib.m\\tf\\tx\\t1x1\\tdouble\\ti")
+    >>> traces = parse("lib.m\\tf\\tx\\t3x1\\tdouble\\tc", traces)
+    >>> print traces
+    {'lib.m': {'f': {'x': 'cx_vec'}}}
+"""
+
+import os
+
+import matlab2cpp as mc
+from matlab2cpp.datatype import get_dim, get_mem, get_name
+
+HEADER = "# m2cpp type trace"
+
+# Matlab classes by memory type, see :py:class:`~matlab2cpp.datatype.Mem`
+CLASSES = {
+    "logical": 0, "uint8": 0, "uint16": 0, "uint32": 0, "uint64": 0,
+    "int8": 1, "int16": 1, "int32": 1, "int64": 1,
+    "single": 2, "double": 3,
+}
+
+# non-numerical Matlab classes
+OTHERS = {"char": "string", "struct": "struct", "cell": "cell",
+        "function_handle": "func_lambda"}
+
+
+def datatype(size, class_, complex_=False, integer=False):
+    """
+Datatype of an observed value.
+
+Args:
+    size (str): Dimensions, like ``3x1``
+    class_ (str): Matlab class
+    complex_ (bool): Value is complex
+    integer (bool): All values are integers
+
+Returns:
+    str: Datatype name, or an empty string if unknown
+
+Example:
+    >>> print datatype("1x1", "double", integer=True)
+    int
+    >>> print datatype("1x4", "single")
+    frowvec
+    >>> print datatype("0x0", "double", complex_=True)
+    cx_mat
+    >>> print datatype("2x2x3", "uint8")
+    ucube
+    """
+
+    if class_ in OTHERS:
+        if class_ == "struct" and size != "1x1":
+            return "structs"
+        return OTHERS[class_]
+
+    if class_ not in CLASSES:
+        return ""
+
+    shape = [int(n) for n in size.split("x")]
+    pages = 1
+    for n in shape[2:]:
+        pages *= n
+    rows, cols = shape[:2]
+
+    if pages > 1:
+        dim = 4
+    elif rows == 1 and cols == 1:
+        dim = 0
+    elif cols == 1 and rows > 1:
+        dim = 1
+    elif rows == 1 and cols > 1:
+        dim = 2
+    else:
+        dim = 3
+
+    mem = CLASSES[class_]
+    if complex_:
+        mem = 4
+    elif dim == 0 and mem == 3 and integer:
+        mem = 1
+
+    return get_name(dim, mem)
+
+
+def widen(old, new):
+    """
+Common datatype of two observations of the same variable.
+
+Example:
+    >>> print widen("int", "vec"), widen("vec", "rowvec"), widen("mat", "cx_double")
+    vec mat cx_mat
+    >>> print widen("string", "double")
+    TYPE
+    """
+
+    if not old or old == new:
+        return new
+    if not new:
+        return old
+
+    dims = get_dim(old), get_dim(new)
+    mems = get_mem(old), get_mem(new)
+    if None in dims or None in mems:
+        return "TYPE"
+
+    if 0 in dims:
+        dim = max(dims)
+    elif set(dims) == {1, 2}:
+        dim = 3
+    else:
+        dim = max(dims)
+
+    return get_name(dim, max(mems))
+
+
+def add(traces, filename, func, name, type_):
+    """Merge a single observation into `traces`."""
+    variables = traces.setdefault(filename, {}).setdefault(func, {})
+    variables[name] = widen(variables.get(name, ""), type_)
+
+
+def parse(text, traces=None):
+    """
+Parse and merge a trace.
+
+Args:
+    text (str): Content of a trace file
+    traces (dict, optional): Earlier traces, updated in place
+
+Returns:
+    dict: Datatypes by file, function and variable name
+    """
+
+    if traces is None:
+        traces = {}
+
+    # the same observations repeat in loops and across runs
+    types = {}
+
+    for line in text.splitlines():
+
+        if not line or line[0] == "#":
+            continue
+
+        cols = line.split("\t")
+        if len(cols) != 6:
+            raise ValueError("malformed type trace line: %r" % line)
+
+        key = cols[3], cols[4], cols[5]
+        if key not in types:
+            types[key] = datatype(cols[3], cols[4], "c" in cols[5],
+                    "i" in cols[5])
+
+        add(traces, cols[0], cols[1], cols[2], types[key])
+
+    return traces
+
+
+def parse_whos(text, filename, traces=None):
+    """
+Parse and merge a log written by the Matlab function `whos_f`.
+
+Args:
+    text (str): Content of the log
+    filename (str): The Matlab file the log belongs to
+    traces (dict, optional): Earlier traces, updated in place
+
+Returns:
+    dict: Datatypes by file, function and variable name
+
+Example:
+    >>> log = '''
+    ... #function_name: f
+    ... #name, size, class, complex, integer
+    ... a, 1x1, double, 0, 1
+    ... b, 3x1, double, 1, 0
+    ...
+    ... #function_name: script, main
+    ... #name, size, class, complex, integer
+    ... c, 1x3, double, 0, 0'''
+    >>> print parse_whos(log, "f.m")
+    {'f.m': {'main': {'c': 'rowvec'}, 'f': {'a': 'int', 'b': 'cx_vec'}}}
+    """
+
+    if traces is None:
+        traces = {}
+
+    func = None
+    for line in text.splitlines():
+
+        if line.startswith("#function_name:"):
+            names = [n.strip() for n in line.split(":", 1)[1].split(",")]
+            func = "main" if names[-1] == "main" and len(names) == 2 \
+                    else names[0]
+
+        elif not line or line[0] == "#" or func is None:
+            continue
+
+        else:
+            cols = line.split(", ")
+            add(traces, filename, func, cols[0], datatype(cols[1], cols[2],
+                int(cols[3]) == 1, int(cols[4]) == 1))
+
+    return traces
+
+
+def read(paths, traces=None):
+    """
+Read and merge traces and `whos_f` logs.
+
+Args:
+    paths (list): Files, or folders to search for ``*.trace`` files and
+        ``*.m.txt`` logs
+    traces (dict, optional): Earlier traces, updated in place
+
+Returns:
+    dict: Datatypes by file, function and variable name
+    """
+
+    if traces is None:
+        traces = {}
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    for path in paths:
+
+        if os.path.isdir(path):
+            read([os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith((".trace", ".m.txt"))], traces)
+            continue
+
+        f = open(path, "r")
+        text = f.read()
+        f.close()
+
+        if path.endswith(".m.txt"):
+            parse_whos(text, os.path.basename(path)[:-4], traces)
+        else:
+            parse(text, traces)
+
+    return traces
+
+
+def write(traces):
+    """
+Trace text of merged datatypes, with one line per variable.  Sizes are
+representative values for the datatype.
+
+Example:
+    >>> print write({"lib.m": {"f": {"x": "cx_vec", "n": "int"}}}).replace("\\t", "  ")
+    # m2cpp type trace
+    lib.m  f  n  1x1  double  i
+    lib.m  f  x  2x1  double  c
+    """
+
+    sizes = ["1x1", "2x1", "1x2", "2x2", "2x2x2"]
+    classes = ["uint64", "int32", "single", "double", "double"]
+    others = dict((type_, class_) for class_, type_ in OTHERS.items())
+
+    lines = [HEADER]
+    for filename in sorted(traces):
+        for func in sorted(traces[filename]):
+            for name, type_ in sorted(traces[filename][func].items()):
+
+                if type_ in ("", "TYPE"):
+                    continue
+
+                if type_ in others:
+                    size, class_, flags = "1x1", others[type_], "-"
+                elif type_ == "structs":
+                    size, class_, flags = "1x2", "struct", "-"
+                else:
+                    dim, mem = get_dim(type_), get_mem(type_)
+                    size, class_ = sizes[dim], classes[mem]
+                    flags = mem == 4 and "c" or "-"
+
+                    # integer scalars are integer valued doubles in Matlab
+                    if mem == 1 and dim == 0:
+                        class_, flags = "double", "i"
+
+                lines.append("\t".join([filename, func, name, size, class_,
+                    flags]))
+
+    return "\n".join(lines)
+
+
+def apply(project, traces):
+    """
+Set the datatypes of traced variables in the loaded programs.  Variables
+that are not declared in the program, and variables with conflicting
+non-numerical observations are left alone.
+
+Args:
+    project (Project): Root of the node tree
+    traces (dict): Datatypes by file, function and variable name
+
+Returns:
+    int: Number of variables set
+
+Example:
+    >>> builder = mc.Builder()
+    >>> builder.load("f.m", "function y=f(x)\\ny = x*2")
+    >>> print apply(builder.project, {"f.m": {"f": {"x": "vec", "z": "int"}}})
+    1
+    >>> print builder[0].ftypes["f"]["x"]
+    vec
+    """
+
+    count = 0
+    for program in project:
+
+        types = traces.get(os.path.basename(program.name))
+        if not types:
+            continue
+
+        funcs = program.ftypes
+        for func, variables in types.items():
+            if func not in funcs:
+                continue
+            for name, type_ in variables.items():
+                if type_ not in ("", "TYPE") and name in funcs[func]:
+                    funcs[func][name] = type_
+                    count += 1
+
+        program.ftypes = funcs
+
+    return count
+
+
+def main(argv=None):
+    """Merge traces and logs into a single trace file."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description="Merge Matlab type traces and whos_f logs")
+    parser.add_argument("output", help="trace file to write")
+    parser.add_argument("paths", nargs="+",
+            help="traces, logs, or folders containing them")
+    args = parser.parse_args(argv)
+
+    f = open(args.output, "w")
+    f.write(write(read(args.paths)) + "\n")
+    f.close()
+
+
+if __name__ == "__main__":
+    main()